@@ -14,14 +14,45 @@ import regression_models as rm
 import numpy as np
 import nonlinear_regression as nr
 import timeseries_regression_RNN as RNN
+import cv_cache as cc
+
+def _checkpoint(checkpoint, resume, parts, state):
+    '''Restore state (np_array/dict updated in place by the search) from the checkpoint file if resume and it was saved by the same search (hash of parts),
+    return save(force = False) from cv_cache.checkpoint_saver, a no-op without checkpoint'''
+    if checkpoint is None:
+        return lambda force = False: None
+    key = cc.cache_key(*parts)
+    saved = cc.checkpoint_load(checkpoint, key) if resume else None
+    if saved is not None:
+        for value, saved_value in zip(state, saved):
+            if isinstance(value, dict):
+                value.update(saved_value)
+            else:
+                value[...] = saved_value
+        print('Resumed from the checkpoint ' + checkpoint)
+    return cc.checkpoint_saver(checkpoint, key, state)
+
+
 
-def IC_mse(model_name, X, y, X_test, y_test, X_val =None, y_val = None, cv_type = None, alpha_num =50, eps = 1e-4, round_number = '', **kwargs):
+def IC_mse(model_name, X, y, X_test, y_test, X_val =None, y_val = None, cv_type = None, alpha_num =50, eps = 1e-4, round_number = '',
+           checkpoint = None, resume = True, path = False, **kwargs):
     '''This function determines the best hyper_parameter using mse based on AIC/AICc
     Input:
     model_name: str, indicating which model to use
     X: independent variables of size N x m np_array
     y: dependent variable of size N x 1 np_array
     cv_type: 'BIC', 'AIC' or 'AICc', if not specified use the 40 rule of thumb for 'AIC'
+    checkpoint: str, default None, file name where the completed part of the grid ((degree, lag) blocks for DALVEN, architectures for RNN)
+                is saved during the search, at most every cv_cache.checkpoint_interval seconds and when it ends or is interrupted;
+                for DALVEN, lag expansion round r is saved to checkpoint.lag_r under the hash of its appended lags and of all the lags,
+                the files are kept after the search, a later call with other lags or expansion settings does not resume from them
+    resume: bool, default True, with checkpoint, the part saved by an interrupted call with the same data and settings is skipped,
+            otherwise the file is overwritten
+    path: bool, default False, for DALVEN, the alpha grid of each (degree, lag, l1_ratio) is solved in one warm-started path (rm.DALVEN_IC_path)
+          and AIC/AICc/BIC are computed from its training mse and nonzero counts, instead of one DALVEN fit per alpha;
+          the criteria agree with the single fits up to the solver tolerance
+    lag: for DALVEN, list of lags, default None, the short ranked list of rm.DALVEN_lag_candidates with n_lag (kwargs, default 5) lags
+         up to max_lag (kwargs, default 40), extended while the best lag is the largest one if lag_expand (kwargs, default True for the generated list)
     
     **kwargs: hyper-parameters for model fitting, if None, using default range or settings
     
@@ -46,8 +77,15 @@ def IC_mse(model_name, X, y, X_test, y_test, X_val =None, y_val = None, cv_type
         if 'degree' not in kwargs:
             kwargs['degree'] = [1,2,3]
             
-        if 'lag' not in kwargs:
-            kwargs['lag'] =  [i+1 for i in range(40)]
+        if 'max_lag' not in kwargs:
+            kwargs['max_lag'] = 40
+        if 'n_lag' not in kwargs:
+            kwargs['n_lag'] = 5
+        if 'lag_expand' not in kwargs:
+            kwargs['lag_expand'] = kwargs.get('lag') is None
+        if kwargs.get('lag') is None:
+            kwargs['lag'] = rm.DALVEN_lag_candidates(X, y, max_lag = kwargs['max_lag'], n_lag = kwargs['n_lag'])
+            print('Lags considered in ' + model_name + ': ' + str(kwargs['lag']))
         
         if 'label_name' not in kwargs:
             kwargs['label_name'] = False
@@ -70,24 +108,63 @@ def IC_mse(model_name, X, y, X_test, y_test, X_val =None, y_val = None, cv_type
         #check if the data is zscored, score back:
         #########################to be continue###################################
         
-        for k in range(len(kwargs['degree'])):
-            for j in range(len(kwargs['l1_ratio'])):
-                for i in range(alpha_num):
+        #the lag tensor is built once per degree up to the max lag, the design of each lag is sliced from it and shared by all l1_ratio and alpha
+        done = np.zeros((len(kwargs['degree']), len(kwargs['lag'])), dtype = bool)
+        save = _checkpoint(checkpoint, resume, (model_name, X, y, X_test, y_test, cv_type, alpha_num, eps, kwargs), (IC_result, done))
+        r = 0
+        while True:
+            try:
+                for k in range(len(kwargs['degree'])):
+                    if done[k].all():
+                        continue
+                    tensor = rm.DALVEN_tensor(X, y, X_test, y_test, kwargs['degree'][k], max(kwargs['lag']), trans_type = kwargs['trans_type'], full_nonlinear = False)
                     for t in range(len(kwargs['lag'])):
-#                        print(k,j,i,t)
-                        _, _, _, _, _, _ , _, _, (AIC,AICc,BIC)= DALVEN(X, y, X_test, y_test, alpha = i, l1_ratio = kwargs['l1_ratio'][j],
-                                                      degree = kwargs['degree'][k], lag = kwargs['lag'][t], tol = eps , alpha_num = alpha_num, cv = True,
-                                                      selection = 'p_value', select_value = kwargs['select_pvalue'], trans_type = kwargs['trans_type'])
-                        if cv_type == 'AICc':
-                            IC_result[k,i,j,t] += AICc
-                        elif cv_type == 'BIC':
-                            IC_result[k,i,j,t] += BIC
-                        else:
-                            IC_result[k,i,j,t] += AIC
-
+                        if done[k,t]:
+                            continue
+                        #a block interrupted midway is computed again from zero
+                        IC_result[k,:,:,t] = 0
+                        design = rm.DALVEN_design(X, y, X_test, y_test, kwargs['degree'][k], kwargs['lag'][t], tol = eps, selection = 'p_value',
+                                                  select_value = kwargs['select_pvalue'], trans_type = kwargs['trans_type'], full_nonlinear = False, tensor = tensor)
+                        for j in range(len(kwargs['l1_ratio'])):
+                            if path:
+                                IC_path = dict(zip(('AIC', 'AICc', 'BIC'), rm.DALVEN_IC_path(X, y, X_test, y_test, kwargs['l1_ratio'][j], kwargs['degree'][k], kwargs['lag'][t],
+                                                                                             alpha_num, tol = eps, selection = 'p_value', select_value = kwargs['select_pvalue'],
+                                                                                             trans_type = kwargs['trans_type'], full_nonlinear = model_name == 'DALVEN_full_nonlinear',
+                                                                                             design = design)))
+                                IC_result[k,:,j,t] += IC_path[cv_type] if cv_type in IC_path else IC_path['AIC']
+                                continue
+                            for i in range(alpha_num):
+#                            print(k,j,i,t)
+                                _, _, _, _, _, _ , _, _, (AIC,AICc,BIC)= DALVEN(X, y, X_test, y_test, alpha = i, l1_ratio = kwargs['l1_ratio'][j],
+                                                              degree = kwargs['degree'][k], lag = kwargs['lag'][t], tol = eps , alpha_num = alpha_num, cv = True,
+                                                              selection = 'p_value', select_value = kwargs['select_pvalue'], trans_type = kwargs['trans_type'], design = design)
+                                if cv_type == 'AICc':
+                                    IC_result[k,i,j,t] += AICc
+                                elif cv_type == 'BIC':
+                                    IC_result[k,i,j,t] += BIC
+                                else:
+                                    IC_result[k,i,j,t] += AIC
+                        done[k,t] = True
+                        save()
+            finally:
+                #the blocks completed before an interruption are kept
+                save(force = True)
             
-        #find the min value, if there is a tie, only the first occurence is returned, and fit the final model
-        ind = np.unravel_index(np.argmin(IC_result, axis=None), IC_result.shape)
+            #find the min value, if there is a tie, only the first occurence is returned, and fit the final model
+            ind = np.unravel_index(np.argmin(IC_result, axis=None), IC_result.shape)
+            
+            #while the best lag is the largest one, the lags of rm.DALVEN_lag_expand are appended and only their blocks are computed
+            lag = rm.DALVEN_lag_expand(X, y, kwargs['lag'], kwargs['lag'][ind[3]], max_lag = kwargs['max_lag'], n_lag = kwargs['n_lag']) if kwargs['lag_expand'] else []
+            if not lag:
+                break
+            print('Best lag ' + str(max(kwargs['lag'])) + ' at the boundary, lags ' + str(lag) + ' added')
+            kwargs['lag'] = kwargs['lag'] + lag
+            IC_result = np.concatenate((IC_result, np.zeros(IC_result.shape[:3] + (len(lag),))), axis = 3)
+            done = np.concatenate((done, np.zeros((done.shape[0], len(lag)), dtype = bool)), axis = 1)
+            r += 1
+            save = _checkpoint(None if checkpoint is None else checkpoint + '.lag_' + str(r), resume,
+                               (model_name, X, y, X_test, y_test, cv_type, alpha_num, eps, kwargs, r, lag), (IC_result, done))
+        
         degree = kwargs['degree'][ind[0]]
         l1_ratio = kwargs['l1_ratio'][ind[2]]
         lag = kwargs['lag'][ind[3]]
@@ -259,8 +336,15 @@ def IC_mse(model_name, X, y, X_test, y_test, X_val =None, y_val = None, cv_type
         if 'degree' not in kwargs:
             kwargs['degree'] = [1,2] #,3]
             
-        if 'lag' not in kwargs:
-            kwargs['lag'] =  [i+1 for i in range(40)]
+        if 'max_lag' not in kwargs:
+            kwargs['max_lag'] = 40
+        if 'n_lag' not in kwargs:
+            kwargs['n_lag'] = 5
+        if 'lag_expand' not in kwargs:
+            kwargs['lag_expand'] = kwargs.get('lag') is None
+        if kwargs.get('lag') is None:
+            kwargs['lag'] = rm.DALVEN_lag_candidates(X, y, max_lag = kwargs['max_lag'], n_lag = kwargs['n_lag'])
+            print('Lags considered in ' + model_name + ': ' + str(kwargs['lag']))
         
         if 'label_name' not in kwargs:
             kwargs['label_name'] = False
@@ -276,24 +360,63 @@ def IC_mse(model_name, X, y, X_test, y_test, X_val =None, y_val = None, cv_type
     
         #check if the data is zscored, score back:
         #########################to be continue###################################
-        for k in range(len(kwargs['degree'])):
-            for j in range(len(kwargs['l1_ratio'])):
-                for i in range(alpha_num):
+        #the lag tensor is built once per degree up to the max lag, the design of each lag is sliced from it and shared by all l1_ratio and alpha
+        done = np.zeros((len(kwargs['degree']), len(kwargs['lag'])), dtype = bool)
+        save = _checkpoint(checkpoint, resume, (model_name, X, y, X_test, y_test, cv_type, alpha_num, eps, kwargs), (IC_result, done))
+        r = 0
+        while True:
+            try:
+                for k in range(len(kwargs['degree'])):
+                    if done[k].all():
+                        continue
+                    tensor = rm.DALVEN_tensor(X, y, X_test, y_test, kwargs['degree'][k], max(kwargs['lag']), trans_type = kwargs['trans_type'], full_nonlinear = True)
                     for t in range(len(kwargs['lag'])):
-#                        print(k,j,i,t)
-                        _, _, _, _, _, _ , _, _, (AIC,AICc,BIC)= DALVEN(X, y, X_test, y_test, alpha = i, l1_ratio = kwargs['l1_ratio'][j],
-                                                      degree = kwargs['degree'][k], lag = kwargs['lag'][t], tol = eps , alpha_num = alpha_num, cv = True,
-                                                      selection = 'p_value', select_value = kwargs['select_pvalue'], trans_type = kwargs['trans_type'])
-                        if cv_type == 'AICc':
-                            IC_result[k,i,j,t] += AICc
-                        elif cv_type == 'BIC':
-                            IC_result[k,i,j,t] += BIC
-                        else:
-                            IC_result[k,i,j,t] += AIC
-
+                        if done[k,t]:
+                            continue
+                        #a block interrupted midway is computed again from zero
+                        IC_result[k,:,:,t] = 0
+                        design = rm.DALVEN_design(X, y, X_test, y_test, kwargs['degree'][k], kwargs['lag'][t], tol = eps, selection = 'p_value',
+                                                  select_value = kwargs['select_pvalue'], trans_type = kwargs['trans_type'], full_nonlinear = True, tensor = tensor)
+                        for j in range(len(kwargs['l1_ratio'])):
+                            if path:
+                                IC_path = dict(zip(('AIC', 'AICc', 'BIC'), rm.DALVEN_IC_path(X, y, X_test, y_test, kwargs['l1_ratio'][j], kwargs['degree'][k], kwargs['lag'][t],
+                                                                                             alpha_num, tol = eps, selection = 'p_value', select_value = kwargs['select_pvalue'],
+                                                                                             trans_type = kwargs['trans_type'], full_nonlinear = model_name == 'DALVEN_full_nonlinear',
+                                                                                             design = design)))
+                                IC_result[k,:,j,t] += IC_path[cv_type] if cv_type in IC_path else IC_path['AIC']
+                                continue
+                            for i in range(alpha_num):
+#                            print(k,j,i,t)
+                                _, _, _, _, _, _ , _, _, (AIC,AICc,BIC)= DALVEN(X, y, X_test, y_test, alpha = i, l1_ratio = kwargs['l1_ratio'][j],
+                                                              degree = kwargs['degree'][k], lag = kwargs['lag'][t], tol = eps , alpha_num = alpha_num, cv = True,
+                                                              selection = 'p_value', select_value = kwargs['select_pvalue'], trans_type = kwargs['trans_type'], design = design)
+                                if cv_type == 'AICc':
+                                    IC_result[k,i,j,t] += AICc
+                                elif cv_type == 'BIC':
+                                    IC_result[k,i,j,t] += BIC
+                                else:
+                                    IC_result[k,i,j,t] += AIC
+                        done[k,t] = True
+                        save()
+            finally:
+                #the blocks completed before an interruption are kept
+                save(force = True)
             
-        #find the min value, if there is a tie, only the first occurence is returned, and fit the final model
-        ind = np.unravel_index(np.argmin(IC_result, axis=None), IC_result.shape)
+            #find the min value, if there is a tie, only the first occurence is returned, and fit the final model
+            ind = np.unravel_index(np.argmin(IC_result, axis=None), IC_result.shape)
+            
+            #while the best lag is the largest one, the lags of rm.DALVEN_lag_expand are appended and only their blocks are computed
+            lag = rm.DALVEN_lag_expand(X, y, kwargs['lag'], kwargs['lag'][ind[3]], max_lag = kwargs['max_lag'], n_lag = kwargs['n_lag']) if kwargs['lag_expand'] else []
+            if not lag:
+                break
+            print('Best lag ' + str(max(kwargs['lag'])) + ' at the boundary, lags ' + str(lag) + ' added')
+            kwargs['lag'] = kwargs['lag'] + lag
+            IC_result = np.concatenate((IC_result, np.zeros(IC_result.shape[:3] + (len(lag),))), axis = 3)
+            done = np.concatenate((done, np.zeros((done.shape[0], len(lag)), dtype = bool)), axis = 1)
+            r += 1
+            save = _checkpoint(None if checkpoint is None else checkpoint + '.lag_' + str(r), resume,
+                               (model_name, X, y, X_test, y_test, cv_type, alpha_num, eps, kwargs, r, lag), (IC_result, done))
+        
         degree = kwargs['degree'][ind[0]]
         l1_ratio = kwargs['l1_ratio'][ind[2]]
         lag = kwargs['lag'][ind[3]]
@@ -323,15 +446,8 @@ def IC_mse(model_name, X, y, X_test, y_test, X_val =None, y_val = None, cv_type
         for i in range(lag):
             XD = np.hstack((XD,y[lag-1-i:-i-1]))
             
-        #get the name for the retained
-        if kwargs['trans_type'] == 'auto':
-            XD,_ = nr.feature_trans(XD, degree = degree, interaction = 'later')
-        else:
-            XD, _ = nr.poly_feature(XD, degree = degree, interaction = True, power = True)
-
-        
-        #remove feature with 0 variance
-        sel = VarianceThreshold(threshold=eps).fit(XD)
+        #get the name for the retained, the 0-variance features are found block by block
+        support = rm.design_support(XD, degree, trans_type = kwargs['trans_type'], tol = eps)
 
 
 
@@ -409,7 +525,7 @@ def IC_mse(model_name, X, y, X_test, y_test, X_val =None, y_val = None, cv_type
 
                                 
                         
-            index = list(sel.get_support())
+            index = list(support)
             list_name_final = [x for x, y in zip(list_name_final, index) if y]
             list_name_final = [x for x, y in zip(list_name_final, retain_index) if y]
         
@@ -492,27 +608,37 @@ def IC_mse(model_name, X, y, X_test, y_test, X_val =None, y_val = None, cv_type
                 
         IC_result = np.zeros((len(kwargs['cell_type']),len(kwargs['activation']), len(kwargs['state_size']), len(kwargs['num_layers'])))
         Result = {}
+        done = np.zeros(IC_result.shape, dtype = bool)
+        save = _checkpoint(checkpoint, resume, (model_name, X, y, X_test, y_test, X_val, y_val, cv_type, kwargs), (IC_result, done, Result))
         
-        for i in range(len(kwargs['cell_type'])):
-            for j in range(len(kwargs['activation'])):
-                for k in range(len(kwargs['state_size'])):
-                    for t in range(len(kwargs['num_layers'])):
+        try:
+            for i in range(len(kwargs['cell_type'])):
+                for j in range(len(kwargs['activation'])):
+                    for k in range(len(kwargs['state_size'])):
+                        for t in range(len(kwargs['num_layers'])):
+                            if done[i,j,k,t]:
+                                continue
 #                        print(i,j,k,t)
-                        p_train,p_val, p_test, (AIC,AICc,BIC),train_loss, val_loss, test_loss = RNN.timeseries_RNN_feedback_single_train(X, y, X_test=X_test, Y_test=y_test, X_val = X_val, Y_val=y_val, train_ratio = kwargs['train_ratio'],\
-                                                                                         cell_type=kwargs['cell_type'][i],activation = kwargs['activation'][j], state_size = kwargs['state_size'][k],\
-                                                                                         batch_size = kwargs['batch_size'], epoch_overlap = kwargs['epoch_overlap'],num_steps = kwargs['num_steps'],\
-                                                                                         num_layers = kwargs['num_layers'][t], learning_rate = kwargs['learning_rate'],  lambda_l2_reg=kwargs['lambda_l2_reg'],\
-                                                                                         num_epochs = kwargs['num_epochs'], input_prob = kwargs['input_prob'], output_prob = kwargs['output_prob'], state_prob = kwargs['state_prob'],\
-                                                                                         input_prob_test =input_prob_test, output_prob_test = output_prob_test, state_prob_test =state_prob_test,\
-                                                                                         max_checks_without_progress = kwargs['max_checks_without_progress'],epoch_before_val=kwargs['epoch_before_val'], location= kwargs['location'], plot= False)
-                        if cv_type == 'AICc':
-                            IC_result[i,j,k,t] += AICc
-                        elif cv_type == 'BIC':
-                            IC_result[i,j,k,t] += BIC
-                        else:
-                            IC_result[i,j,k,t] += AIC
+                            p_train,p_val, p_test, (AIC,AICc,BIC),train_loss, val_loss, test_loss = RNN.timeseries_RNN_feedback_single_train(X, y, X_test=X_test, Y_test=y_test, X_val = X_val, Y_val=y_val, train_ratio = kwargs['train_ratio'],\
+                                                                                             cell_type=kwargs['cell_type'][i],activation = kwargs['activation'][j], state_size = kwargs['state_size'][k],\
+                                                                                             batch_size = kwargs['batch_size'], epoch_overlap = kwargs['epoch_overlap'],num_steps = kwargs['num_steps'],\
+                                                                                             num_layers = kwargs['num_layers'][t], learning_rate = kwargs['learning_rate'],  lambda_l2_reg=kwargs['lambda_l2_reg'],\
+                                                                                             num_epochs = kwargs['num_epochs'], input_prob = kwargs['input_prob'], output_prob = kwargs['output_prob'], state_prob = kwargs['state_prob'],\
+                                                                                             input_prob_test =input_prob_test, output_prob_test = output_prob_test, state_prob_test =state_prob_test,\
+                                                                                             max_checks_without_progress = kwargs['max_checks_without_progress'],epoch_before_val=kwargs['epoch_before_val'], location= kwargs['location'], plot= False)
+                            if cv_type == 'AICc':
+                                IC_result[i,j,k,t] += AICc
+                            elif cv_type == 'BIC':
+                                IC_result[i,j,k,t] += BIC
+                            else:
+                                IC_result[i,j,k,t] += AIC
                             
-                        Result[(i,j,k,t)] = {'prediction_train':p_train,'prediction_val':p_val,'prediction_test':p_test,'train_loss_final':train_loss,'val_loss_final':val_loss,'test_loss_final':test_loss}
+                            Result[(i,j,k,t)] = {'prediction_train':p_train,'prediction_val':p_val,'prediction_test':p_test,'train_loss_final':train_loss,'val_loss_final':val_loss,'test_loss_final':test_loss}
+                            done[i,j,k,t] = True
+                            save()
+        finally:
+            #the blocks completed before an interruption are kept
+            save(force = True)
         
         #find the min value, if there is a tie, only the first occurence is returned, and fit the final model
         ind = np.unravel_index(np.argmin(IC_result, axis=None), IC_result.shape)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:05:11 2026
+
+@author: agent agent@local
+"""
+
+'''This file contains the persistent cache of the cross-validation results: the fold statistics of a grid search are saved
+on disk under the hash of the data and of the settings, so that the same search is not repeated across sessions,
+and the checkpoint files of the partial grid results, so that a killed search is resumed where it stopped
+
+Command line:
+python cv_cache.py info     size and content of the cache
+python cv_cache.py clear    remove all the cached results
+'''
+
+import os
+import time
+import pickle
+import hashlib
+import numpy as np
+
+
+#location of the cache, can be set by the environment variable SPA_CACHE_DIR
+cache_dir = os.environ.get('SPA_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.spa_cache'))
+
+#size limit in bytes of the cache, the least recently used results are evicted first
+cache_size = 2**30
+
+#minimum time in seconds between two writes of a checkpoint file
+checkpoint_interval = 60
+
+#version of the cached results, fed into every key and stored with every result,
+#to be increased whenever a fold scorer or the layout of the stored statistics changes so that the older results are not used
+cache_version = 1
+
+
+
+def cache_key(*parts):
+    '''Content hash of cache_version and of the parts: np_array (dtype, shape and data), dict (sorted by key), list/tuple and scalars/str (repr)'''
+    h = hashlib.sha1()
+    _feed(h, cache_version)
+    for part in parts:
+        _feed(h, part)
+    return h.hexdigest()
+
+
+
+def _feed(h, obj):
+    if isinstance(obj, np.ndarray):
+        obj = np.ascontiguousarray(obj)
+        h.update(('array' + str(obj.dtype) + str(obj.shape)).encode())
+        h.update(obj.tobytes() if obj.dtype != object else repr(obj.tolist()).encode())
+    elif isinstance(obj, dict):
+        h.update(b'dict')
+        for k in sorted(obj, key = str):
+            _feed(h, k)
+            _feed(h, obj[k])
+    elif isinstance(obj, (list, tuple)):
+        h.update(('list' + str(len(obj))).encode())
+        for item in obj:
+            _feed(h, item)
+    else:
+        h.update(repr(obj).encode())
+
+
+
+def _path(key, directory = None):
+    return os.path.join(directory or cache_dir, key + '.pkl')
+
+
+
+def _load(path):
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+
+def _dump(path, value):
+    #write to a temporary file first so that a concurrent reader or a kill never leaves a partial file
+    tmp = path + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(value, f, protocol = pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+
+def cache_get(key, directory = None):
+    '''Return the result saved under key, None if it is not in the cache or was saved by another cache_version'''
+    path = _path(key, directory)
+    value = _load(path)
+    if not isinstance(value, dict) or value.get('version') != cache_version:
+        return None
+    
+    #mark as recently used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return value['value']
+
+
+
+def cache_put(key, value, directory = None, max_size = None):
+    '''Save value under key with cache_version, then evict the least recently used results until the cache is below max_size (default cache_size)'''
+    directory = directory or cache_dir
+    os.makedirs(directory, exist_ok = True)
+    _dump(_path(key, directory), {'version': cache_version, 'value': value})
+    evict(directory, max_size)
+
+
+
+def _entries(directory = None):
+    '''(path, size, last use) of the cached results, oldest first'''
+    directory = directory or cache_dir
+    if not os.path.isdir(directory):
+        return []
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith('.pkl'):
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+    return sorted(entries, key = lambda entry: entry[2])
+
+
+
+def evict(directory = None, max_size = None):
+    '''Remove the least recently used results until the cache is below max_size (default cache_size)'''
+    if max_size is None:
+        max_size = cache_size
+    entries = _entries(directory)
+    total = sum(size for _, size, _ in entries)
+    for path, size, _ in entries:
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+
+def cache_info(directory = None):
+    '''Return a dictionary with the location, number of results and total size in bytes of the cache'''
+    entries = _entries(directory)
+    return {'directory': directory or cache_dir, 'results': len(entries), 'size': sum(size for _, size, _ in entries),
+            'limit': cache_size}
+
+
+
+def cache_clear(directory = None):
+    '''Remove all the cached results, return the number removed'''
+    entries = _entries(directory)
+    for path, _, _ in entries:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return len(entries)
+
+
+
+def checkpoint_load(path, key):
+    '''Return the state saved in the checkpoint file path, None if there is no file or it was saved by another search (key from cache_key)'''
+    value = _load(path)
+    if not isinstance(value, dict) or value.get('key') != key:
+        return None
+    return value['state']
+
+
+
+def checkpoint_saver(path, key, state):
+    '''Return save(force = False), which writes state (mutable, updated in place by the search) with key to the checkpoint file path,
+    at most every checkpoint_interval seconds unless force'''
+    last = [time.time()]
+    
+    def save(force = False):
+        if force or time.time() - last[0] >= checkpoint_interval:
+            _dump(path, {'key': key, 'state': state})
+            last[0] = time.time()
+    return save
+
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description = 'Inspect or clear the cache of the cross-validation results')
+    parser.add_argument('command', choices = ['info', 'clear'])
+    parser.add_argument('--dir', default = None, help = 'cache location, default ' + cache_dir)
+    args = parser.parse_args()
+    
+    if args.command == 'info':
+        info = cache_info(args.dir)
+        print('Cache location: ' + info['directory'])
+        print('Number of results: ' + str(info['results']))
+        print('Size: %.1f MB (limit %.1f MB)' % (info['size']/2**20, info['limit']/2**20))
+        for path, size, last_use in _entries(args.dir)[::-1]:
+            value = _load(path)
+            label = ''
+            if isinstance(value, dict) and value.get('version') == cache_version and isinstance(value['value'], dict):
+                label = value['value'].get('label', '')
+            else:
+                label = '(other cache_version, not used)'
+            print('  ' + os.path.basename(path)[:12] + '  %8.1f kB  ' % (size/2**10) + str(label))
+    else:
+        print('Removed ' + str(cache_clear(args.dir)) + ' results')
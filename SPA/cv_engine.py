@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:12:40 2026
+
+@author: agent agent@local
+"""
+
+'''This file contains the execution engine shared by the cross-validation files:
+the (fold, hyper-parameter) tasks of the grid search are dispatched to a serial loop,
+a thread pool or a process pool, either for the full grid, for a successive halving search or for a coarse-to-fine penalty search,
+and the per-fold results are reduced by the selection rules (min mean mse, one standard error),
+the grid searches of several models can be raced on the same folds (Race)'''
+
+import os
+import threading
+from itertools import islice
+from functools import partial
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+from scipy import stats
+import cv_cache as cc
+
+
+def executor_getter(executor):
+    '''Return the pool class according to the name, None for the serial loop'''
+
+    switcher = {
+            'serial': None,
+            'thread': ThreadPoolExecutor,
+            'process': ProcessPoolExecutor
+            }
+
+    #Get the executor from switcher dictionary
+    if executor not in switcher:
+        print('No corresponding executor, serial loop is used')
+    pool = switcher.get(executor)
+    return pool
+
+
+
+def fold_map(score_fold, folds, data = None, executor = 'serial', n_jobs = None, split = None, checkpoint = None, **params):
+    '''This function applies score_fold to every fold of the cross-validation and yields the results in fold order
+    Input:
+    score_fold: module-level function (X_train, y_train, X_val, y_val, **params) returning np_array of validation mse over the grid
+    folds: iterable of (X_train, y_train, X_val, y_val), e.g. the generator from cv_final.CVpartition
+           or of (train_index, val_index) from cv_final.CVpartition_index when data is given
+           or of (G_train, c_train, N_train, X_val, y_val) from cv_final.CVpartition_gram, passed as they are to score_fold
+    data: tuple (X, y), default None; the index folds are sliced from it only when the fold is dispatched
+    executor: 'serial' (default), 'thread' or 'process'
+              'process' requires score_fold and params to be picklable, and on platforms that spawn (Windows) the calling script to be guarded by if __name__ == '__main__'
+    n_jobs: int, number of workers, default number of cores
+    split: tuple (name, axis), hyper-parameter list in params that is spread across the workers with one grid point per task,
+           the partial results are concatenated along axis; ignored for the serial loop
+    checkpoint: tuple (file name, key, resume), default None, the results are saved to the file (cv_cache.checkpoint_saver) as they come,
+                key is a str or the tuple of parts (data and settings) hashed by cv_cache.cache_key when the first result is requested,
+                so the grids filled in after the call are included; if resume and the file was saved with the same key,
+                the saved results are yielded first and the folds they cover are skipped; folds must be generated in the same order
+    **params: passed to score_fold
+
+    Output: generator of np_array, the validation mse of each fold
+    Since the results come back in fold order, the accumulated MSE_result is identical to the serial loop
+    '''
+
+    if checkpoint is not None:
+        file_name, key, resume = checkpoint
+        if not isinstance(key, str):
+            key = cc.cache_key(*key)
+        done = (cc.checkpoint_load(file_name, key) if resume else None) or []
+        if done:
+            print('Resumed ' + str(len(done)) + ' folds from the checkpoint ' + file_name)
+        save = cc.checkpoint_saver(file_name, key, done)
+        for result in list(done):
+            yield result
+        results = fold_map(score_fold, islice(folds, len(done), None), data = data, executor = executor, n_jobs = n_jobs, split = split, **params)
+        try:
+            for result in results:
+                done.append(result)
+                save()
+                yield result
+        finally:
+            results.close()
+            save(force = True)
+        return
+
+    pool = executor_getter(executor)
+
+    if data is not None:
+        X, y = data
+        folds = ((X[train_index], y[train_index], X[val_index], y[val_index]) for train_index, val_index in folds)
+
+    if pool is None:
+        for fold in folds:
+            yield score_fold(*fold, **params)
+        return
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+
+    #one task per grid point of the split hyper-parameter
+    if split is not None:
+        name, axis = split
+        task_params = []
+        for value in params[name]:
+            p = dict(params)
+            p[name] = [value]
+            task_params.append(p)
+    else:
+        axis = 0
+        task_params = [params]
+
+    #keep a bounded number of folds in flight so that the fold copies are not all materialized at once
+    max_pending = max(2, 2*n_jobs//len(task_params))
+    pending = deque()
+    workers = pool(max_workers = n_jobs)
+    try:
+        for fold in folds:
+            pending.append([workers.submit(score_fold, *fold, **p) for p in task_params])
+            if len(pending) >= max_pending:
+                yield _gather(pending.popleft(), axis)
+        while pending:
+            yield _gather(pending.popleft(), axis)
+    finally:
+        for tasks in pending:
+            for task in tasks:
+                task.cancel()
+        workers.shutdown(wait = True)
+
+
+
+def _gather(tasks, axis):
+    '''Collect the results of the tasks of one fold'''
+    if len(tasks) == 1:
+        return tasks[0].result()
+    return np.concatenate([task.result() for task in tasks], axis = axis)
+
+
+
+def halving_search(score_fold, folds, grid, data = None, factor = 3, executor = 'serial', n_jobs = None, **params):
+    '''Successive halving over the folds: all the configurations of the grid are scored on the first few folds,
+    only the best 1/factor are kept and scored on factor times more folds, until the survivors are scored on all the folds
+    Input:
+    score_fold: fold function of cv_final (X_train, y_train, X_val, y_val, **grid) returning np_array of the grid shape
+    folds: list of folds, see fold_map
+    grid: list of (name, values), hyper-parameter lists in the order of the axes of the result of score_fold
+    data: see fold_map
+    factor: int, default 3, elimination rate
+    executor, n_jobs: see fold_map, the configurations of a round are spread across the workers
+    **params: other arguments passed to score_fold
+
+    Output:
+    MSE_result: np_array of the grid shape, mean validation mse over all the folds for the configurations of the last round,
+                np.inf for the eliminated ones, so that argmin gives the selected configuration as for the full grid search
+    '''
+
+    shape = tuple(len(values) for _, values in grid)
+    survivors = list(np.ndindex(*shape))
+    n_fold = len(folds)
+    mse_sum = np.zeros(shape)
+
+    #number of eliminations, so that the last round uses all the folds
+    n_round = int(np.floor(np.log(min(len(survivors), n_fold))/np.log(factor) + 1e-12))
+
+    done = 0
+    for r in range(n_round+1):
+        n_use = n_fold if r == n_round else int(np.ceil(n_fold/factor**(n_round-r)))
+        configs = [dict((grid[a][0], [grid[a][1][index[a]]]) for a in range(len(grid))) for index in survivors]
+        for mse in fold_map(_configs_fold_mse, folds[done:n_use], data = data, executor = executor, n_jobs = n_jobs,
+                            split = ('configs', 0), config_fold = score_fold, configs = configs, **params):
+            for index, value in zip(survivors, mse):
+                mse_sum[index] += value
+        done = n_use
+
+        if r < n_round:
+            #keep the best 1/factor, ties are broken by the grid order as in argmin
+            order = sorted(range(len(survivors)), key = lambda i: mse_sum[survivors[i]])
+            survivors = sorted(survivors[i] for i in order[:int(np.ceil(len(survivors)/factor))])
+
+    MSE_result = np.full(shape, np.inf)
+    for index in survivors:
+        MSE_result[index] = mse_sum[index]/n_fold
+    return MSE_result
+
+
+
+def zoom_search(fold_results, alpha_num, axis, n_coarse = 10, tol = 1e-3, **stats):
+    '''Coarse-to-fine search over the penalty axis of the grid (index of the descending logspace of alpha_num penalties):
+    the grid is scored on about n_coarse evenly spaced alpha, then on a spacing halved each round around the best alpha
+    (over all the other hyper-parameters), until the spacing is 1 or the best mean mse improves by less than tol (relative)
+    Input:
+    fold_results: function (alpha_index, round) returning the per-fold results over the grid with the alpha axis restricted to alpha_index,
+                  round = 0, 1, ... is the refinement round
+    alpha_num: int, size of the penalty grid
+    axis: int, position of the alpha axis in the grid
+    n_coarse: int, default 10, number of alpha of the first round
+    tol: float, default 1e-3, relative improvement of the best mean mse below which the refinement stops
+    **stats: passed to fold_stats for each round
+    
+    Output: dictionary cv_result as from fold_stats over the full grid, the alpha not evaluated have MSE_mean np.inf and MSE_std/nonzero np.nan,
+            so that the selection rules never pick them; 'n_fold', 'n_repeat' and the rows of 'MSE_fold' are the ones of the first round,
+            'alpha_index': sorted list of the alpha evaluated
+    '''
+    
+    stride = max(1, int(np.ceil((alpha_num-1)/max(n_coarse-1, 1))))
+    alpha_index = sorted(set(range(0, alpha_num, stride)) | {alpha_num-1})
+    cv_result, evaluated, best, r = None, [], np.inf, 0
+    while True:
+        if alpha_index:
+            result = fold_stats(fold_results(alpha_index, r), **stats)
+            if cv_result is None:
+                cv_result = dict(result)
+                for name, fill in (('MSE_fold', np.inf), ('MSE_mean', np.inf), ('MSE_std', np.nan), ('nonzero', np.nan)):
+                    if result[name] is not None:
+                        shape = list(result[name].shape)
+                        shape[axis + (name == 'MSE_fold')] = alpha_num
+                        cv_result[name] = np.full(shape, fill)
+            for name in ('MSE_fold', 'MSE_mean', 'MSE_std', 'nonzero'):
+                if result[name] is not None:
+                    if name == 'MSE_fold':
+                        n = min(result[name].shape[0], cv_result[name].shape[0])
+                        cv_result[name][(slice(0, n),) + (slice(None),)*axis + (alpha_index,)] = result[name][:n]
+                    else:
+                        cv_result[name][(slice(None),)*axis + (alpha_index,)] = result[name]
+            evaluated = sorted(set(evaluated) | set(alpha_index))
+            
+            new_best = np.min(cv_result['MSE_mean'])
+            if r > 0 and best - new_best <= tol*abs(new_best):
+                break
+            best = new_best
+        if stride == 1:
+            break
+        
+        #finer spacing around the best alpha
+        center = np.unravel_index(np.argmin(cv_result['MSE_mean'], axis=None), cv_result['MSE_mean'].shape)[axis]
+        new_stride = max(1, stride//2)
+        alpha_index = [i for i in range(center - stride + new_stride, center + stride, new_stride) if 0 <= i < alpha_num and i not in evaluated]
+        stride = new_stride
+        r += 1
+    
+    cv_result['alpha_index'] = evaluated
+    return cv_result
+
+
+
+def _configs_fold_mse(X_train, y_train, X_val, y_val, config_fold, configs, **params):
+    '''Validation mse of one fold for a list of single configurations'''
+    return np.array([config_fold(X_train, y_train, X_val, y_val, **config, **params).item() for config in configs])
+
+
+
+def fold_stats(results, nonzero = False, store_fold = False, n_fold = None, block = None, se_tol = 0.01, n_top = 5, patience = 5, race = None):
+    '''This function reduces the per-fold results of the grid search to the statistics used by the selection rules
+    The mean, the variance (Welford update) and the mean number of nonzero coefficients are accumulated fold by fold,
+    so the memory does not grow with the number of folds unless the per-fold mse is stored
+    Input:
+    results: iterable of np_array, the result of each fold over the grid, e.g. the generator from fold_map
+    nonzero: bool, default False, the results carry a trailing axis [mse, number of nonzero coefficients]
+    store_fold: bool, default False, keep the validation mse of every fold
+    n_fold: int, default None, expected number of folds used to preallocate the storage of store_fold,
+            if None (or too small) the storage grows by doubling
+    block: int, default None, number of folds of one repetition (cv_final.CV_mse uses K_fold, the K folds of Re_KFold or K splits of MC), if given the results are consumed
+           repetition by repetition and the rest is skipped once, from the 2nd repetition on, either
+           the standard error of the mean mse of the n_top best grid points is below se_tol times the best mean mse
+           or the n_top best grid points (in order) are unchanged for patience repetitions
+    se_tol, n_top, patience: stopping settings for block, default 0.01, 5, 5
+    race: function (n, fold_mse), default None, called after each fold with the validation mse of the current best grid point
+          on the n first folds, the rest is skipped once it returns False (Race.reporter); the per-fold mse is then kept internally
+
+    Output: dictionary cv_result
+    'MSE_fold': np_array n_fold x grid shape, validation mse of each fold, None if not stored
+    'MSE_mean': np_array of the grid shape, mean over the folds
+    'MSE_std': np_array of the grid shape, standard deviation over the folds
+    'nonzero': np_array of the grid shape, mean number of nonzero coefficients over the folds, None if not recorded
+    'n_fold': int, number of folds
+    'n_repeat': int, number of repetitions used, None without block
+    'dropped': bool, the search was stopped by race
+    '''
+
+    count = 0
+    MSE_fold = None
+    keep_fold = store_fold or race is not None
+    dropped = False
+    top_last, n_same = None, 0
+    #np.inf marks the configurations eliminated by the halving search, their spread is not defined
+    with np.errstate(invalid = 'ignore'):
+        for result in results:
+            result = np.asarray(result, dtype = float)
+            mse = result[...,0] if nonzero else result
+            if count == 0:
+                MSE_sum = np.zeros(mse.shape)
+                MSE_mean = np.zeros(mse.shape)
+                M2 = np.zeros(mse.shape)
+                nonzero_sum = np.zeros(mse.shape) if nonzero else None
+                if keep_fold:
+                    MSE_fold = np.empty((n_fold or 16,) + mse.shape)
+            count += 1
+
+            #the mean is the running sum over count, the same as averaging at the end
+            delta = mse - MSE_mean
+            MSE_sum += mse
+            np.divide(MSE_sum, count, out = MSE_mean)
+            M2 += delta*(mse - MSE_mean)
+
+            if nonzero:
+                nonzero_sum += result[...,1]
+            if keep_fold:
+                if count > MSE_fold.shape[0]:
+                    MSE_fold = np.concatenate((MSE_fold, np.empty(MSE_fold.shape)), axis = 0)
+                MSE_fold[count-1] = mse
+
+            if race is not None:
+                best = np.argmin(MSE_mean, axis = None)
+                if not race(count, MSE_fold[:count].reshape(count, -1)[:, best]):
+                    dropped = True
+                    break
+
+            if block is not None and count % block == 0 and count//block >= 2:
+                top = np.argsort(MSE_mean, axis = None, kind = 'stable')[:n_top]
+                MSE_se = np.sqrt(M2.flat[top]/count)/np.sqrt(count)
+                n_same = n_same + 1 if top_last is not None and np.array_equal(top, top_last) else 0
+                top_last = top
+                if MSE_se.max() <= se_tol*MSE_mean.flat[top[0]] or n_same >= patience:
+                    break
+
+        cv_result = {}
+        cv_result['MSE_fold'] = MSE_fold[:count] if store_fold else None
+        cv_result['MSE_mean'] = MSE_mean
+        cv_result['MSE_std'] = np.sqrt(M2/count)
+        cv_result['nonzero'] = nonzero_sum/count if nonzero else None
+        cv_result['n_fold'] = count
+        cv_result['n_repeat'] = count//block if block is not None else None
+        cv_result['dropped'] = dropped
+
+    #stop the fold generator (and its pending tasks) when the repetitions are cut short
+    if hasattr(results, 'close'):
+        results.close()
+    return cv_result
+
+
+
+class Race(object):
+    '''Racing of the grid searches of several models on the same folds (F-race style)
+    Every block folds, from min_fold on, the best grid point of each model is compared with the one of the leader (smallest mean
+    validation mse) by a one-sided paired t-test over the folds so far, a model significantly worse at level alpha is dropped
+    The searches run concurrently (one thread each, see cv_final.family_CV_mse), each calls report through fold_stats(race = reporter(name))
+    and waits for the other models still in the race at every comparison, then calls finish when its search is over
+    The folds are only paired if all the models use the same partition (same N, cv_type, K_fold, Nr and group)
+    '''
+
+    def __init__(self, names, block = 1, alpha = 0.05, min_fold = 3):
+        self.active = set(names)
+        self.block = block
+        self.alpha = alpha
+        self.min_fold = max(min_fold, 2)
+        self.scores = {}
+        self.dropped = {}
+        self.decided = 0
+        self.condition = threading.Condition()
+
+
+    def reporter(self, name):
+        '''function (n, fold_mse) for fold_stats'''
+        return partial(self.report, name)
+
+
+    def report(self, name, n, fold_mse):
+        '''fold_mse: np_array of size n, validation mse of the current best grid point of model name on the n first folds
+        Output: False if the model is dropped'''
+        if n % self.block or n < self.min_fold:
+            return name not in self.dropped
+
+        with self.condition:
+            self.scores[name] = (n, np.asarray(fold_mse, dtype = float))
+            self.condition.wait_for(lambda: name in self.dropped or
+                                    all(a in self.scores and self.scores[a][0] >= n for a in self.active))
+            if name not in self.dropped and self.decided < n:
+                self._eliminate(n)
+                self.decided = n
+                self.condition.notify_all()
+            return name not in self.dropped
+
+
+    def finish(self, name):
+        '''The search of name is over, the other models no longer wait for it'''
+        with self.condition:
+            self.active.discard(name)
+            self.condition.notify_all()
+
+
+    def _eliminate(self, n):
+        racing = [a for a in self.active if self.scores[a][0] == n]
+        if len(racing) < 2:
+            return
+        leader = min(racing, key = lambda a: np.mean(self.scores[a][1]))
+        t_crit = stats.t.ppf(1 - self.alpha, n - 1)
+        for a in racing:
+            if a == leader:
+                continue
+            d = self.scores[a][1] - self.scores[leader][1]
+            sd = np.std(d, ddof = 1)
+            if (sd == 0 and np.mean(d) > 0) or (sd > 0 and np.mean(d)/(sd/np.sqrt(n)) > t_crit):
+                self.active.discard(a)
+                self.dropped[a] = n
+                print(a + ' is dropped from the race after ' + str(n) + ' folds, worse than ' + leader)
+
+
+
+def selection_getter(selection):
+    '''Return the selection rule according to the name, rule(cv_result, complexity) gives the index of the selected grid point
+    'min': smallest mean validation mse
+    'one_std': simplest model within one standard deviation of the smallest mean validation mse
+    '''
+
+    switcher = {
+            'min': select_min,
+            'one_std': select_one_std
+            }
+
+    #Get the rule from switcher dictionary
+    if selection not in switcher:
+        print('No corresponding selection rule, min mse is used')
+    rule = switcher.get(selection, select_min)
+    return rule
+
+
+
+def select_min(cv_result, complexity = None):
+    '''Grid point with the smallest mean validation mse, if there is a tie, only the first occurence is returned'''
+    return np.unravel_index(np.argmin(cv_result['MSE_mean'], axis=None), cv_result['MSE_mean'].shape)
+
+
+
+def select_one_std(cv_result, complexity):
+    '''Grid point with the smallest complexity among the ones whose mean validation mse is below the min mean mse plus its standard deviation
+    Input:
+    cv_result: dictionary from fold_stats
+    complexity: np_array broadcastable to the grid shape, smaller is simpler, e.g. the number of nonzero coefficients
+
+    Output: tuple, index of the selected grid point, if there is a tie, only the first occurence in the grid order is returned
+    '''
+
+    MSE_mean = cv_result['MSE_mean']
+    ind = select_min(cv_result)
+    MSE_bar = MSE_mean[ind] + cv_result['MSE_std'][ind]
+
+    ind_mse = MSE_mean < MSE_bar
+    #no spread over the folds (single split or halving search), same as min
+    if not ind_mse.any():
+        return ind
+
+    complexity = np.broadcast_to(complexity, MSE_mean.shape)
+    ind_num = complexity == complexity[ind_mse].min()
+    return tuple(int(i) for i in np.argwhere(ind_num*ind_mse)[0])
@@ -7,7 +7,10 @@ Created on Thu Feb 20 20:03:24 2020
 """
 
 
+import os
 import numpy as np
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from sklearn.model_selection import KFold
 from sklearn.model_selection import RepeatedKFold
 from sklearn.model_selection import ShuffleSplit
@@ -19,6 +22,8 @@ import nonlinear_regression as nr
 from sklearn.model_selection import train_test_split
 import nonlinear_regression_other as nro
 from sklearn.feature_selection import VarianceThreshold
+import cv_engine as ce
+import cv_cache as cc
 #import timeit
 
 
@@ -39,31 +44,47 @@ def CVpartition(X, y, Type = 'Re_KFold', K = 10, Nr = 1000, random_state = 0, gr
     group: group index for grouped CV
     
     Output:generator (X_train, y_train, X_val, y_val)
+    the folds are sliced from the indices of CVpartition_index, contiguous folds are views of X and y
     '''
     
+    for train_index, val_index in CVpartition_index(X, y, Type = Type, K = K, Nr = Nr, random_state = random_state, group = group):
+        yield (X[train_index], y[train_index], X[val_index], y[val_index])
+
+
+
+def CVpartition_index(X, y, Type = 'Re_KFold', K = 10, Nr = 1000, random_state = 0, group = None):
+    '''This function create the partition indices for cross validation and bootstrap, no copy of the data is made
+    Input: see CVpartition
+    
+    Output:generator (train_index, val_index)
+    train_index, val_index: np_array of int, or slice when the rows are contiguous (X[index] is then a view)
+    '''
+    
+    N = X.shape[0]
+    
     if Type == 'MC':
         CV = ShuffleSplit(n_splits=Nr, test_size=1/K, random_state =random_state)
         for train_index, val_index in CV.split(X,y):
-            yield (X[train_index], y[train_index], X[val_index], y[val_index])
+            yield (train_index, val_index)
             
     elif Type == 'Single':
-        X, X_test, y, y_test = train_test_split(X, y, test_size=1/K, random_state =random_state)
-        yield (X, y ,X_test, y_test)
+        train_index, val_index = train_test_split(np.arange(N), test_size=1/K, random_state =random_state)
+        yield (train_index, val_index)
 
     elif Type == 'KFold':
         CV = KFold(n_splits = int(K), random_state =random_state)
         for train_index, val_index in CV.split(X,y):
-            yield (X[train_index], y[train_index], X[val_index], y[val_index])
+            yield (_contiguous(train_index), _contiguous(val_index))
         
     elif Type == 'Re_KFold':
         CV = RepeatedKFold(n_splits= int(K), n_repeats= Nr, random_state =random_state)
         for train_index, val_index in CV.split(X,y):
-            yield (X[train_index], y[train_index], X[val_index], y[val_index])
+            yield (train_index, val_index)
             
     elif Type == 'Timeseries':
         TS = TimeSeriesSplit(n_splits=int(K))
         for train_index, val_index in TS.split(X):
-            yield (X[train_index], y[train_index], X[val_index], y[val_index])    
+            yield (_contiguous(train_index), _contiguous(val_index))
     
     
     elif Type == 'Single_group':
@@ -75,7 +96,7 @@ def CVpartition(X, y, Type = 'Re_KFold', K = 10, Nr = 1000, random_state = 0, gr
         for i in range(1,num):
             final_list = final_list | np.squeeze(group == label[i])
             
-        yield(X[~final_list], y[~final_list], X[final_list],y[final_list])
+        yield (np.flatnonzero(~final_list), np.flatnonzero(final_list))
 
 
 
@@ -85,7 +106,7 @@ def CVpartition(X, y, Type = 'Re_KFold', K = 10, Nr = 1000, random_state = 0, gr
         label =np.unique(group)
         print('***** '+str(len(label))+' fold is used for CV ******')
         for i in range(len(label)):
-            yield(X[np.squeeze(group != label[i])], y[np.squeeze(group != label[i])], X[np.squeeze(group == label[i])],y[np.squeeze(group == label[i])])
+            yield (np.flatnonzero(np.squeeze(group != label[i])), np.flatnonzero(np.squeeze(group == label[i])))
 
     elif Type == 'Group_no_extrapolation':
         #for no extrapolation case, 
@@ -93,34 +114,486 @@ def CVpartition(X, y, Type = 'Re_KFold', K = 10, Nr = 1000, random_state = 0, gr
         print('***** '+str(len(label)-2)+' fold is used for CV ******')
         for i in range(len(label)):
             if min(label)<label[i] and label[i]<max(label):
-                yield(X[np.squeeze(group != label[i])], y[np.squeeze(group != label[i])], X[np.squeeze(group == label[i])],y[np.squeeze(group == label[i])])
+                yield (np.flatnonzero(np.squeeze(group != label[i])), np.flatnonzero(np.squeeze(group == label[i])))
    
     elif Type == 'GroupKFold':
         from sklearn.model_selection import GroupKFold
         gkf = GroupKFold(n_splits = int(K))
         print('using Group Kfold')
         for train_index, val_index in gkf.split(X, y, groups=group):
-            yield (X[train_index], y[train_index], X[val_index], y[val_index])    
+            yield (train_index, val_index)
 
     elif Type == 'GroupShuffleSplit':
         from sklearn.model_selection import GroupShuffleSplit
         gss = GroupShuffleSplit(n_splits = int(Nr), test_size = 1/K, random_state=random_state)
         for train_index, val_index in gss.split(X, y, groups=group):
-            yield (X[train_index], y[train_index], X[val_index], y[val_index])    
+            yield (train_index, val_index)
     
     elif Type == 'No_CV':
-        yield (X,y,X,y)
+        yield (slice(0, N), slice(0, N))
     
     elif Type == 'Single_ordered':
-        num = X.shape[0]
-        yield (X[:num-round(X.shape[0]*1/K):], y[:num-round(X.shape[0]*1/K):] , X[num-round(X.shape[0]*1/K):], y[num-round(X.shape[0]*1/K):])        
+        yield (slice(0, N-round(N*1/K)), slice(N-round(N*1/K), N))
         
     else:
         print('Wrong type specified for data partition')
 
 
 
-def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10, Nr = 1000, eps = 1e-4,alpha_num=50, group = None, round_number = '', **kwargs):
+def CVpartition_gram(X, y, Type = 'Re_KFold', K = 10, Nr = 1000, random_state = 0, group = None):
+    '''This function create the partition for the linear models in sufficient statistics:
+    X'X and X'y of the whole data are computed once and downdated by the validation block of each fold
+    Input: see CVpartition
+    
+    Output:generator (G_train, c_train, N_train, X_val, y_val)
+    G_train = X_train'X_train, c_train = X_train'y_train, of size m x m and m x 1
+    '''
+    
+    G = np.dot(X.T, X)
+    c = np.dot(X.T, y)
+    N = X.shape[0]
+    
+    for train_index, val_index in CVpartition_index(X, y, Type = Type, K = K, Nr = Nr, random_state = random_state, group = group):
+        X_val = X[val_index]
+        y_val = y[val_index]
+        N_val = X_val.shape[0]
+        N_train = len(range(N)[train_index]) if isinstance(train_index, slice) else len(train_index)
+        
+        if N_train + N_val == N and N_val <= N_train:
+            G_train = G - np.dot(X_val.T, X_val)
+            c_train = c - np.dot(X_val.T, y_val)
+        else:
+            #the training block is not the complement of the validation block (time series, No_CV) or is the smaller one, use it directly
+            G_train = np.dot(X[train_index].T, X[train_index])
+            c_train = np.dot(X[train_index].T, y[train_index])
+            
+        yield (G_train, c_train, N_train, X_val, y_val)
+
+
+def CVpartition_series(X, y, degree, lag, Type = 'Timeseries', K = 10, Nr = 1000, random_state = 0, group = None, trans_type = 'auto', full_nonlinear = False):
+    '''This function create the time-ordered partition for DALVEN: the transformed, lagged design of each (degree, lag) is built once
+    on the whole series (rm.DALVEN_series) and the folds only index its rows, so the samples at the start of each validation block keep
+    their lags from the preceding block instead of being dropped with the lag padding of the block
+    Input: see CVpartition, Type is 'Timeseries' or 'Single_ordered'
+    
+    Output:generator (series, train_index, val_index)
+    series: dictionary from rm.DALVEN_series, the same for all the folds
+    train_index, val_index: sample indices of the series, see rm.DALVEN_series_design
+    '''
+    
+    series = None
+    for train_index, val_index in CVpartition_index(X, y, Type = Type, K = K, Nr = Nr, random_state = random_state, group = group):
+        if series is None:
+            series = rm.DALVEN_series(X, y, degree, lag, trans_type = trans_type, full_nonlinear = full_nonlinear)
+        yield (series, train_index, val_index)
+
+
+
+def _contiguous(index):
+    '''Return slice for an increasing run of consecutive indices, so that indexing gives a view instead of a copy'''
+    if len(index) > 0 and index[-1] - index[0] == len(index) - 1 and np.all(np.diff(index) == 1):
+        return slice(int(index[0]), int(index[-1]) + 1)
+    return index
+
+
+
+#validation mse of one fold over the whole hyper-parameter grid, used by CV_mse through cv_engine.fold_map
+#for the sparse models, the last axis holds [mse, number of nonzero coefficients] used by the one-std selection
+
+def _nonzero(params):
+    '''number of nonzero coefficients, 0 if no variable is selected (params = None)'''
+    if params is None:
+        return 0
+    return np.count_nonzero(params)
+
+
+def _EN_alpha_list(alpha_base, l1_ratio, eps, alpha_num):
+    '''Descending penalty grid of EN for one l1_ratio, alpha_base = max|X'y|/N of the full data'''
+    if l1_ratio == 0:
+        alpha_max = alpha_base/0.0001
+        return np.logspace(np.log10(alpha_max * eps/100), np.log10(alpha_max), alpha_num)[::-1]
+    else:
+        alpha_max = alpha_base/l1_ratio
+        return np.logspace(np.log10(alpha_max * eps), np.log10(alpha_max), alpha_num)[::-1]
+
+
+def _EN_fold_mse(X_train, y_train, X_val, y_val, alpha_base, l1_ratio, eps, alpha_num, path = False, alpha_index = None):
+    '''path: solve the alpha grid of each l1_ratio in one warm-started path instead of one fit per alpha
+       alpha_index: only score these positions of the alpha grid (search = 'zoom'), default all'''
+    EN = rm.model_getter('EN')
+    if alpha_index is None:
+        alpha_index = np.arange(alpha_num)
+    MSE_result = np.zeros((len(alpha_index),len(l1_ratio),2))
+    for j in range(len(l1_ratio)):
+        alpha = _EN_alpha_list(alpha_base, l1_ratio[j], eps, alpha_num)[alpha_index]
+        if l1_ratio[j] == 0 and path:
+            params, _, MSE_result[:,j,0] = rm.RR_path(X_train, y_train, X_val, y_val, alpha)
+            MSE_result[:,j,1] = np.sum(params != 0, axis = 0)
+        elif l1_ratio[j] == 0:
+            for i in range(len(alpha)):
+                clf = Ridge(alpha=alpha[i],fit_intercept=False).fit(X_train, y_train)
+                MSE_result[i,j,0] = np.sum((clf.predict(X_val)-y_val)**2)/y_val.shape[0]
+                MSE_result[i,j,1] = _nonzero(clf.coef_)
+        elif path:
+            params, _, MSE_result[:,j,0] = rm.EN_path(X_train, y_train, X_val, y_val, alpha, l1_ratio[j])
+            MSE_result[:,j,1] = np.sum(params != 0, axis = 0)
+        else:
+            for i in range(len(alpha)):
+                _, params, _, MSE_result[i,j,0], _, _ = EN(X_train, y_train, X_val, y_val, alpha = alpha[i], l1_ratio = l1_ratio[j])
+                MSE_result[i,j,1] = _nonzero(params)
+    return MSE_result
+
+
+def _SPLS_fold_mse(X_train, y_train, X_val, y_val, K, eta, eps, cap = False):
+    '''cap: for grouped CV, K larger than N_train-1 (or 30) is given mse = 10000'''
+    SPLS = rm.model_getter('SPLS')
+    MSE_result = np.zeros((len(K),len(eta),2))
+    for i in range(len(K)):
+        for j in range(len(eta)):
+            if cap and K[i] > X_train.shape[0]-1:
+                MSE_result[i,j] = 10000, X_train.shape[1]
+            ######should be remove in the future##########################
+            elif cap and K[i] > 30:
+                MSE_result[i,j] = 10000, X_train.shape[1]
+            else:
+                _, params, _, MSE_result[i,j,0], _, _ = SPLS(X_train, y_train, X_val, y_val, K = int(K[i]), eta = eta[j], eps = eps)
+                MSE_result[i,j,1] = _nonzero(params)
+    return MSE_result
+
+
+def _LASSO_fold_mse(X_train, y_train, X_val, y_val, alpha, path = False):
+    '''path: solve the alpha grid (in any order) in one warm-started path instead of one fit per alpha'''
+    MSE_result = np.zeros((len(alpha),2))
+    if path:
+        params, _, MSE_result[:,0] = rm.EN_path(X_train, y_train, X_val, y_val, alpha, 1)
+        MSE_result[:,1] = np.sum(params != 0, axis = 0)
+        return MSE_result
+
+    LASSO = rm.model_getter('LASSO')
+    for i in range(len(alpha)):
+        _, params, _, MSE_result[i,0], _, _ = LASSO(X_train, y_train, X_val, y_val, alpha = alpha[i])
+        MSE_result[i,1] = _nonzero(params)
+    return MSE_result
+
+
+def _OLS_fold_mse(X_train, y_train, X_val, y_val):
+    OLS = rm.model_getter('OLS')
+    _, _, _, mse, _, _ = OLS(X_train, y_train, X_val, y_val)
+    return np.array([mse])
+
+
+#same as above with the fold given by the downdated sufficient statistics (G_train, c_train, N_train) of CVpartition_gram
+
+def _EN_gram_fold_mse(G, c, n, X_val, y_val, alpha_base, l1_ratio, eps, alpha_num, path = False, alpha_index = None):
+    X_root, y_root = rm.gram_root(G, c, n)
+    if alpha_index is None:
+        alpha_index = np.arange(alpha_num)
+    MSE_result = np.zeros((len(alpha_index),len(l1_ratio),2))
+    for j in range(len(l1_ratio)):
+        if l1_ratio[j] == 0:
+            params, MSE_result[:,j,0] = rm.RR_gram(G, c, X_val, y_val, _EN_alpha_list(alpha_base, l1_ratio[j], eps, alpha_num)[alpha_index])
+            MSE_result[:,j,1] = np.sum(params != 0, axis = 0)
+        else:
+            MSE_result[:,j] = _EN_fold_mse(X_root, y_root, X_val, y_val, alpha_base, [l1_ratio[j]], eps, alpha_num, path = path, alpha_index = alpha_index)[:,0]
+    return MSE_result
+
+
+def _LASSO_gram_fold_mse(G, c, n, X_val, y_val, alpha, path = False):
+    X_root, y_root = rm.gram_root(G, c, n)
+    return _LASSO_fold_mse(X_root, y_root, X_val, y_val, alpha, path = path)
+
+
+def _OLS_gram_fold_mse(G, c, n, X_val, y_val):
+    #minimum norm solution as the pseudo-inverse in statsmodels OLS
+    OLS_params = np.linalg.lstsq(G, c, rcond = None)[0]
+    return np.array([rm.mse(y_val, np.dot(X_val, OLS_params))])
+
+
+def _RR_gram_fold_mse(G, c, n, X_val, y_val, alpha, path = False):
+    _, MSE_result = rm.RR_gram(G, c, X_val, y_val, alpha)
+    return MSE_result
+
+
+def _PLS_fold_mse(X_train, y_train, X_val, y_val, K, eps, cap = False, path = False):
+    '''cap: for grouped CV, K larger than N_train-1 is given mse = 10000
+       path: extract the components once up to max(K) and score every K from it'''
+    MSE_result = np.zeros(len(K))
+    if path:
+        valid = np.array([not (cap and k > X_train.shape[0]-1) for k in K])
+        MSE_result[~valid] = 10000
+        if valid.any():
+            _, _, MSE_result[valid] = rm.PLS_path(X_train, y_train, X_val, y_val, np.asarray(K)[valid], tol = eps)
+        return MSE_result
+    
+    for i in range(len(K)):
+        if cap and K[i] > X_train.shape[0]-1:
+            MSE_result[i] = 10000
+        else:
+            PLS = PLSRegression(scale = False, n_components=int(K[i]), tol = eps).fit(X_train,y_train)
+            PLS_para = PLS.coef_.reshape(-1,1)
+            yhat = np.dot(X_val, PLS_para)
+            MSE_result[i] = rm.mse(y_val, yhat)
+    return MSE_result
+
+
+def _RR_fold_mse(X_train, y_train, X_val, y_val, alpha, path = False):
+    '''path: one SVD of the fold for all alpha instead of one fit per alpha'''
+    if path:
+        _, _, MSE_result = rm.RR_path(X_train, y_train, X_val, y_val, alpha)
+        return MSE_result
+
+    MSE_result = np.zeros(len(alpha))
+    for i in range(len(alpha)):
+        RR = Ridge(alpha = alpha[i], fit_intercept = False).fit(X_train, y_train)
+        Para = RR.coef_.reshape(-1,1)
+        yhat = np.dot(X_val, Para)
+        MSE_result[i] = rm.mse(y_val, yhat)
+    return MSE_result
+
+
+def _ALVEN_fold_mse(X_train, y_train, X_val, y_val, degree, l1_ratio, eps, alpha_num, select_value, trans_type, path = False, alpha_index = None):
+    '''path: solve the alpha grid of each (degree, l1_ratio) in one warm-started path instead of one fit per alpha
+       the pre-processed design only depends on (fold, degree, trans_type, select_value), it is built once per degree and shared by all l1_ratio and alpha
+       alpha_index: only score these positions of the alpha grid (search = 'zoom'), default all'''
+    ALVEN = rm.model_getter('ALVEN')
+    if alpha_index is None:
+        alpha_index = np.arange(alpha_num)
+    MSE_result = np.zeros((len(degree),len(alpha_index),len(l1_ratio),2))
+    for k in range(len(degree)):
+        design = rm.ALVEN_design(X_train, y_train, X_val, y_val, degree[k], tol = eps, selection = 'p_value',
+                                 select_value = select_value, trans_type = trans_type)
+        for j in range(len(l1_ratio)):
+            if path:
+                params, MSE_result[k,:,j,0] = rm.ALVEN_path(X_train, y_train, X_val, y_val, l1_ratio = l1_ratio[j], degree = degree[k], alpha_num = alpha_num, tol = eps,
+                                                            selection = 'p_value', select_value = select_value, trans_type = trans_type, design = design,
+                                                            alpha_index = alpha_index)
+                MSE_result[k,:,j,1] = np.sum(params != 0, axis = 0)
+                continue
+            for i in range(len(alpha_index)):
+                _, params, _, MSE_result[k,i,j,0], _, _ , _, _= ALVEN(X_train, y_train, X_val, y_val, alpha = alpha_index[i], l1_ratio = l1_ratio[j],
+                                                                   degree = degree[k], tol = eps , alpha_num = alpha_num, cv = True,
+                                                                   selection = 'p_value', select_value = select_value, trans_type = trans_type, design = design)
+                MSE_result[k,i,j,1] = _nonzero(params)
+    return MSE_result
+
+
+def _RF_fold_mse(X_train, y_train, X_val, y_val, max_depth, n_estimators, min_samples_leaf, tree_jobs = None):
+    '''one forest per (max_depth, min_samples_leaf) is grown through the n_estimators grid (nro.RF_path)
+       tree_jobs: number of cores used to build the trees'''
+    MSE_result = np.zeros((len(max_depth),len(n_estimators),len(min_samples_leaf)))
+    for i in range(len(max_depth)):
+        for k in range(len(min_samples_leaf)):
+            MSE_result[i,:,k] = nro.RF_path(X_train, y_train, X_val,y_val, n_estimators = n_estimators, max_depth = max_depth[i], min_samples_leaf=min_samples_leaf[k],
+                                            n_jobs = tree_jobs)
+    return MSE_result
+
+
+def _SVR_fold_mse(X_train, y_train, X_val, y_val, C, gamma, epsilon):
+    '''the kernel of each (fold, gamma) is computed once and shared by the C/epsilon grid (nro.SVR_path)'''
+    MSE_result = np.zeros((len(C),len(gamma),len(epsilon)))
+    for j in range(len(gamma)):
+        MSE_result[:,j,:] = nro.SVR_path(X_train, y_train, X_val,y_val, C=C, gamma=gamma[j], epsilon=epsilon)
+    return MSE_result
+
+
+def _DALVEN_fold_mse(X_train, y_train, X_val, y_val, model_name, degree, l1_ratio, lag, eps, alpha_num, select_value, trans_type, alpha_index = None):
+    '''model_name: 'DALVEN' or 'DALVEN_full_nonlinear'
+       the lag tensor is built once per (fold, degree) up to max(lag), and the design of each lag is sliced from it and shared by all l1_ratio and alpha
+       alpha_index: only score these positions of the alpha grid (search = 'zoom'), default all'''
+    DALVEN = rm.model_getter(model_name)
+    full_nonlinear = model_name == 'DALVEN_full_nonlinear'
+    if alpha_index is None:
+        alpha_index = np.arange(alpha_num)
+    MSE_result = np.zeros((len(degree),len(alpha_index),len(l1_ratio), len(lag),2))
+    for k in range(len(degree)):
+        tensor = rm.DALVEN_tensor(X_train, y_train, X_val, y_val, degree[k], max(lag), trans_type = trans_type, full_nonlinear = full_nonlinear)
+        for t in range(len(lag)):
+            design = rm.DALVEN_design(X_train, y_train, X_val, y_val, degree[k], lag[t], tol = eps, selection = 'p_value', select_value = select_value,
+                                      trans_type = trans_type, full_nonlinear = full_nonlinear, tensor = tensor)
+            for j in range(len(l1_ratio)):
+                for i in range(len(alpha_index)):
+                    _, params, _, MSE_result[k,i,j,t,0], _, _ , _, _,_= DALVEN(X_train, y_train, X_val, y_val, alpha = alpha_index[i], l1_ratio = l1_ratio[j],
+                                                                             degree = degree[k], lag = lag[t], tol = eps , alpha_num = alpha_num, cv = True,
+                                                                             selection = 'p_value', select_value = select_value, trans_type = trans_type, design = design)
+                    MSE_result[k,i,j,t,1] = _nonzero(params)
+    return MSE_result
+
+
+def _DALVEN_series_fold_mse(series, train_index, val_index, model_name, degree, l1_ratio, lag, eps, alpha_num, select_value, trans_type, alpha_index = None):
+    '''_DALVEN_fold_mse on the fold rows of the lagged design shared by the time-ordered folds (CVpartition_series), only the screening is fitted per fold'''
+    DALVEN = rm.model_getter(model_name)
+    if alpha_index is None:
+        alpha_index = np.arange(alpha_num)
+    MSE_result = np.zeros((len(degree),len(alpha_index),len(l1_ratio), len(lag),2))
+    for k in range(len(degree)):
+        for t in range(len(lag)):
+            design = rm.DALVEN_series_design(series, degree[k], lag[t], train_index, val_index, tol = eps, selection = 'p_value', select_value = select_value)
+            for j in range(len(l1_ratio)):
+                for i in range(len(alpha_index)):
+                    _, params, _, MSE_result[k,i,j,t,0], _, _ , _, _,_= DALVEN(None, None, None, None, alpha = alpha_index[i], l1_ratio = l1_ratio[j],
+                                                                             degree = degree[k], lag = lag[t], tol = eps , alpha_num = alpha_num, cv = True,
+                                                                             selection = 'p_value', select_value = select_value, trans_type = trans_type, design = design)
+                    MSE_result[k,i,j,t,1] = _nonzero(params)
+    return MSE_result
+
+
+def _RNN_fold_mse(X_train, y_train, X_val, y_val, cell_type, activation, state_size, num_layers, unique_location = False, **kwargs):
+    '''unique_location: save each task under its own name, needed when the tasks run concurrently'''
+    import timeseries_regression_RNN as RNN
+
+    location = kwargs['location']
+    if unique_location:
+        import uuid
+        location = location + '_' + uuid.uuid4().hex[:8]
+
+    MSE_result = np.zeros((len(cell_type),len(activation), len(state_size), len(num_layers)))
+    for i in range(len(cell_type)):
+        for j in range(len(activation)):
+            for k in range(len(state_size)):
+                for t in range(len(num_layers)):
+                    _,_, _, _, _, _, MSE_result[i,j,k,t] = RNN.timeseries_RNN_feedback_single_train(X_train, y_train, X_test=X_val, Y_test=y_val, train_ratio = kwargs['train_ratio'],\
+                                                                                     cell_type=cell_type[i],activation = activation[j], state_size = state_size[k],\
+                                                                                     batch_size = kwargs['batch_size'], epoch_overlap = kwargs['epoch_overlap'],num_steps = kwargs['num_steps'],\
+                                                                                     num_layers = num_layers[t], learning_rate = kwargs['learning_rate'],  lambda_l2_reg=kwargs['lambda_l2_reg'],\
+                                                                                     num_epochs = kwargs['num_epochs'], input_prob = kwargs['input_prob'], output_prob = kwargs['output_prob'], state_prob = kwargs['state_prob'],\
+                                                                                     input_prob_test =1, output_prob_test = 1, state_prob_test =1,\
+                                                                                     max_checks_without_progress = kwargs['max_checks_without_progress'],epoch_before_val=kwargs['epoch_before_val'], location= location, plot= False)
+    return MSE_result
+
+
+
+#the per-fold results are only generated when the statistics are not already in cv_result (see CV_mse)
+
+def _cv_stats(cv_result, key, results, nonzero = False, store_fold = False, content = None, cache = False, **sequential):
+    '''fold statistics of the grid search (cv_engine.fold_stats) stored in the dictionary cv_result
+       results is only consumed when cv_result does not already hold the statistics of the same key (model and CV settings) and content
+       results: per-fold results, or function (**fold_stats settings) returning the statistics (search = 'zoom', see _alpha_results)
+       content: tuple (X, y, group, kwargs, path, gram), hashed with key (cv_cache.cache_key) with the default grids filled in kwargs,
+                the hash is kept in cv_result['key'] and cv_result is only reused on the same hash
+       cache: bool, the statistics are also looked up in/saved to the disk cache (cv_cache) under the same hash'''
+    if cv_result is None:
+        cv_result = {}
+    content_key = cc.cache_key(key, *content)
+    if cv_result.get('key') != content_key or (store_fold and cv_result['MSE_fold'] is None):
+        stats = None
+        if cache:
+            stats = cc.cache_get(content_key)
+            if stats is not None and store_fold and stats['MSE_fold'] is None:
+                stats = None
+            if stats is not None:
+                print('CV result of ' + key[0] + ' loaded from the cache')
+        if stats is None:
+            if callable(results):
+                stats = results(nonzero = nonzero, store_fold = store_fold, **sequential)
+                print('Zoom search evaluated ' + str(len(stats['alpha_index'])) + ' alpha')
+            else:
+                stats = ce.fold_stats(results, nonzero = nonzero, store_fold = store_fold, **sequential)
+            if cache and not stats['dropped']:
+                stats['label'] = key[0] + ' ' + key[1] + ' X' + str(key[4])
+                cc.cache_put(content_key, stats)
+        cv_result.clear()
+        cv_result.update(stats)
+        cv_result['key'] = content_key
+        if cv_result['n_repeat'] is not None:
+            print('Adaptive CV used ' + str(cv_result['n_repeat']) + ' repetitions')
+    return cv_result
+
+
+def _POLY_fold_results(X, y, X_test, degree, interaction, power, cv_type, K_fold, Nr, group, gram, executor, n_jobs):
+    '''validation mse of each fold over the degree grid, each degree is transformed once and scored on the same folds'''
+    MSE_fold = []
+    for d in range(len(degree)):
+        X_trans, _ = nr.poly_feature(X, X_test, degree = degree[d], interaction = interaction, power = power)
+        X_trans=np.hstack((np.ones([X_trans.shape[0],1]),X_trans))
+        if gram:
+            score_fold, folds, data = _OLS_gram_fold_mse, CVpartition_gram(X_trans, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), None
+        else:
+            score_fold, folds, data = _OLS_fold_mse, CVpartition_index(X_trans, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), (X_trans, y)
+        MSE_fold.append([mse[0] for mse in ce.fold_map(score_fold, folds, data = data, executor = executor, n_jobs = n_jobs)])
+    for mse in np.array(MSE_fold).T:
+        yield mse
+
+
+def _alpha_results(score_fold, folds, search, n_alpha, axis, kwargs, checkpoint = None, **params):
+    '''per-fold results of the penalized models for _cv_stats, folds is a function returning a new fold generator (partial of CVpartition_index/gram)
+       search = 'zoom': function running cv_engine.zoom_search over the alpha axis (n_alpha penalties) with zoom_coarse (kwargs, default 10) alpha in the first round
+                        and the refinement tolerance zoom_tol (kwargs, default 1e-3), each round is scored on the same folds,
+                        the explicit alpha list of LASSO is restricted instead of passing alpha_index, round r > 0 is checkpointed to file.r
+       otherwise the cv_engine.fold_map generator over the full grid'''
+    if search != 'zoom':
+        return ce.fold_map(score_fold, folds(), checkpoint = checkpoint, **params)
+    
+    if 'zoom_coarse' not in kwargs:
+        kwargs['zoom_coarse'] = 10
+    if 'zoom_tol' not in kwargs:
+        kwargs['zoom_tol'] = 1e-3
+    
+    def fold_results(alpha_index, r):
+        if 'alpha' in params:
+            round_params = dict(params, alpha = np.asarray(params['alpha'])[alpha_index])
+        else:
+            round_params = dict(params, alpha_index = alpha_index)
+        round_checkpoint = checkpoint
+        if checkpoint is not None and r > 0:
+            round_checkpoint = (checkpoint[0] + '.' + str(r),) + checkpoint[1:]
+        return ce.fold_map(score_fold, folds(), checkpoint = round_checkpoint, **round_params)
+    
+    return partial(ce.zoom_search, fold_results, n_alpha, axis, n_coarse = kwargs['zoom_coarse'], tol = kwargs['zoom_tol'])
+
+
+def _lag_stats(cv_result, key, lag_results, X, y, kwargs, checkpoint = None, **stats):
+    '''fold statistics of DALVEN (_cv_stats), lag_results(checkpoint) returns the per-fold results over the lags kwargs['lag']
+       with lag_expand (kwargs), while the min mean mse is at the largest lag, the lags of rm.DALVEN_lag_expand (up to max_lag, n_lag at a time)
+       are scored on the same folds and appended to the lag axis, round r > 0 is checkpointed to file.lag_r; not used with race
+       kwargs['lag'] and cv_result['lag'] hold all the lags of the grid, cv_result is reused under the hash of the first lags'''
+    if cv_result is not None and cv_result.get('key') == cc.cache_key(key, *stats['content']) and 'lag' in cv_result:
+        if not (stats['store_fold'] and cv_result['MSE_fold'] is None):
+            kwargs['lag'] = list(cv_result['lag'])
+            return cv_result
+    cv_result = _cv_stats(cv_result, key, lag_results(checkpoint), nonzero = True, **stats)
+    
+    r = 0
+    while kwargs['lag_expand'] and 'race' not in stats:
+        lag = rm.DALVEN_lag_expand(X, y, kwargs['lag'], kwargs['lag'][ce.select_min(cv_result)[3]], max_lag = kwargs['max_lag'], n_lag = kwargs['n_lag'])
+        if not lag:
+            break
+        print('Best lag ' + str(max(kwargs['lag'])) + ' at the boundary, lags ' + str(lag) + ' added')
+        r += 1
+        round_checkpoint = checkpoint
+        if checkpoint is not None:
+            round_checkpoint = (checkpoint[0] + '.lag_' + str(r),) + checkpoint[1:]
+        grid_lag, kwargs['lag'] = kwargs['lag'], lag
+        _concat_stats(cv_result, _cv_stats(None, key, lag_results(round_checkpoint), nonzero = True, **stats), 3)
+        kwargs['lag'] = grid_lag + lag
+    cv_result['lag'] = list(kwargs['lag'])
+    return cv_result
+
+
+def _concat_stats(cv_result, stats, axis):
+    '''append the fold statistics stats of new grid points to cv_result along the grid axis,
+       the per-fold mse is only kept if both have the same folds'''
+    for name in ('MSE_mean', 'MSE_std', 'nonzero'):
+        if cv_result[name] is not None:
+            cv_result[name] = np.concatenate((cv_result[name], stats[name]), axis = axis)
+    if cv_result['MSE_fold'] is not None and stats['MSE_fold'] is not None and cv_result['n_fold'] == stats['n_fold']:
+        cv_result['MSE_fold'] = np.concatenate((cv_result['MSE_fold'], stats['MSE_fold']), axis = axis+1)
+    else:
+        cv_result['MSE_fold'] = None
+    cv_result['n_fold'] = min(cv_result['n_fold'], stats['n_fold'])
+    if 'alpha_index' in cv_result:
+        cv_result['alpha_index'] = sorted(set(cv_result['alpha_index']) | set(stats['alpha_index']))
+
+
+def _halving_results(score_fold, folds, grid, **kwargs):
+    '''mean validation mse of cv_engine.halving_search as a single result, the spread over the folds is not kept
+       so the one-std selection reduces to the min mse'''
+    yield ce.halving_search(score_fold, folds, grid, **kwargs)
+
+
+
+def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10, Nr = 1000, eps = 1e-4,alpha_num=50, group = None, round_number = '',
+           executor = 'serial', n_jobs = None, path = False, gram = False, search = 'grid', selection = 'min', cv_result = None,
+           store_fold = False, adaptive = False, cache = False, checkpoint = None, resume = True, race = None, **kwargs):
     '''This function determines the best hyper_parameter using mse based on CV
     Input:
     model_name: str, indicating which model to use
@@ -129,6 +602,47 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
     cv_type: cross_validation type
     K: fold for CV
     Nr: repetition for CV
+    executor: 'serial' (default), 'thread' or 'process', how the (fold, hyper-parameter) tasks are dispatched, see cv_engine.fold_map
+              SPLS calls R through rpy2, which is not thread-safe, so 'thread' is run as 'process' for SPLS
+    n_jobs: int, number of workers for 'thread'/'process', default number of cores, for RF with 'serial' the number of cores building the trees
+    path: bool, for EN/LASSO/ALVEN, solve the alpha grid in one warm-started coordinate descent path (rm.EN_path) per fold, from the largest alpha down
+          instead of one fit per alpha, the mse of each alpha agrees with the cold fits up to the solver tolerance
+          for RR and EN with l1_ratio = 0, all alpha are solved from one SVD of the fold (rm.RR_path)
+          for PLS, the components are extracted once per fold up to the largest K (rm.PLS_path)
+    gram: bool, for RR/EN/LASSO/POLY, X'X and X'y are computed once and downdated by the validation block of each fold (CVpartition_gram),
+          the fold is solved in the m x m space (rm.RR_gram, rm.gram_root) instead of on the N_train x m copy, for N >> m
+    search: 'grid' (default), 'halving' or 'zoom', for RF/SVR, 'halving' scores all the configurations on a few folds and only promotes the best 1/halving_factor
+            (kwargs, default 3) to more folds until the survivors are scored on all the folds (cv_engine.halving_search)
+            for EN/LASSO/ALVEN/DALVEN, 'zoom' scores about zoom_coarse (kwargs, default 10) of the alpha_num penalties, then halves the spacing
+            around the best one until the spacing is 1 or the best mean mse improves by less than zoom_tol (kwargs, default 1e-3) (cv_engine.zoom_search),
+            the penalties not scored are never selected and hyper_params has the same format
+    selection: 'min' (default) or 'one_std', rule applied to the fold statistics to select the hyper-parameters (cv_engine.selection_getter)
+               'one_std' takes the simplest model (fewest nonzero coefficients, fewest components/degree, largest penalty, shallowest trees...)
+               whose mean validation mse is below the min mean mse plus its standard deviation over the folds
+    cv_result: dictionary, default None, filled with the fold statistics (cv_engine.fold_stats) of the grid search;
+               if it already holds the ones of the same model, data, hyper-parameter grid and CV settings, e.g. from a call with the other selection rule,
+               the cross-validation is skipped and only the final model is fitted
+    store_fold: bool, default False, keep the validation mse of every fold in cv_result['MSE_fold'],
+                otherwise only the running mean/std/sparsity over the folds are kept and the memory does not grow with K_fold x Nr
+    adaptive: bool, default False, for Re_KFold/MC, the folds are checked by repetition of K_fold folds (Re_KFold) or K_fold splits (MC)
+              and Nr is only the maximum number of repetitions of Re_KFold or of splits of MC (at most Nr/K_fold repetitions),
+              the repetitions stop once the standard error of the mean mse of the adaptive_top (kwargs, default 5) best grid points
+              is below adaptive_tol (kwargs, default 0.01) times the best mean mse, or once their ranking is unchanged for
+              adaptive_patience (kwargs, default 5) repetitions, the number used is printed and kept in cv_result['n_repeat']
+    cache: bool, default False, keep the fold statistics on disk (cv_cache, location cv_cache.cache_dir) under the hash of X, y, group,
+           model_name, the hyper-parameter grid (kwargs) and the CV settings; a later call with the same data and settings,
+           in this or another session, only selects the hyper-parameters and fits the final model
+    checkpoint: str, default None, file name where the validation mse of the completed folds is saved during the search
+                (at most every cv_cache.checkpoint_interval seconds and when it stops), not used by POLY and the halving search
+    resume: bool, default True, with checkpoint, the folds saved by an interrupted call with the same data and settings are reused
+            and only the remaining folds are computed, otherwise the file is overwritten
+    race: function, default None, reporter of a cv_engine.Race set by family_CV_mse, the folds are stopped once the model is dropped
+          from the race, the final model is still fitted on the folds done; not used with search = 'zoom'
+    lag: for DALVEN, list of lags, default None, the short ranked list of rm.DALVEN_lag_candidates (ACF/PACF of y, CCF of each x and y on the training data)
+         with n_lag (kwargs, default 5) lags up to max_lag (kwargs, default 40), extended while the best lag is the largest one if lag_expand
+         (kwargs, default True for the generated list, see _lag_stats)
+    shared_design: for DALVEN, bool, default True for cv_type 'Timeseries' and 'Single_ordered', the transformed, lagged design is built once
+                   on the whole training series and the folds index its rows (CVpartition_series), the validation blocks keep their first lag samples
     **kwargs: hyper-parameters for model fitting, if None, using default range or settings
     
     
@@ -142,6 +656,30 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
     yhat_test
     '''
     
+    select = ce.selection_getter(selection)
+    
+    #sequential repetitions, the first repetitions of Re_KFold/MC do not depend on Nr so the folds are cut short
+    sequential = {}
+    if adaptive and (cv_type == 'Re_KFold' or cv_type == 'MC'):
+        if 'adaptive_tol' not in kwargs:
+            kwargs['adaptive_tol'] = 0.01
+        if 'adaptive_top' not in kwargs:
+            kwargs['adaptive_top'] = 5
+        if 'adaptive_patience' not in kwargs:
+            kwargs['adaptive_patience'] = 5
+        sequential = {'block': K_fold, 'se_tol': kwargs['adaptive_tol'], 'n_top': kwargs['adaptive_top'], 'patience': kwargs['adaptive_patience']}
+    elif adaptive:
+        print('Adaptive repetition is only used for Re_KFold and MC, all the folds are used')
+    stats = dict(store_fold = store_fold, **sequential)
+    if race is not None and search != 'zoom':
+        stats['race'] = race
+    #kwargs is hashed once the default grids are filled in by the model branch, for the checkpoint when fold_map starts
+    stats['content'] = (X, y, group, kwargs, path, gram)
+    stats['cache'] = cache
+    key = (model_name, cv_type, K_fold, Nr, X.shape, eps, alpha_num, search, tuple(sorted(sequential.items())))
+    if checkpoint is not None:
+        checkpoint = (checkpoint, (key, X, y, group, kwargs, path, gram), resume)
+    
     if model_name == 'EN':
         EN = rm.model_getter(model_name)
         
@@ -150,44 +688,21 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
             #kwargs['alpha'] = [1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1, 5, 10, 50]
             kwargs['l1_ratio'] = [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.97, 0.99][::-1]
             
-        MSE_result = np.zeros((alpha_num,len(kwargs['l1_ratio'])))
-
-        counter = 0
-        for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):
-            counter += 1
-            for j in range(len(kwargs['l1_ratio'])):
-                if kwargs['l1_ratio'][j] == 0:
-                    alpha_max = (np.sqrt(np.sum(np.dot(X.T,y) ** 2, axis=1)).max())/X.shape[0]/0.0001
-                    kwargs['alpha'] = np.logspace(np.log10(alpha_max * eps/100), np.log10(alpha_max), alpha_num)[::-1]
-                    for i in range(alpha_num):
-                        clf = Ridge(alpha=kwargs['alpha'][i],fit_intercept=False).fit(X_train, y_train)
-                        mse = np.sum((clf.predict(X_val)-y_val)**2)/y_val.shape[0]                                                
-                        MSE_result[i,j] += mse
-
-                else:
-                    alpha_max = (np.sqrt(np.sum(np.dot(X.T,y) ** 2, axis=1)).max())/X.shape[0]/kwargs['l1_ratio'][j]
-                    kwargs['alpha'] = np.logspace(np.log10(alpha_max * eps), np.log10(alpha_max), alpha_num)[::-1]
-                    for i in range(alpha_num):
-                        _, _, _, mse, _, _ = EN(X_train, y_train, X_val, y_val, alpha = kwargs['alpha'][i], l1_ratio = kwargs['l1_ratio'][j])
-                        MSE_result[i,j] += mse
-
-        MSE_result = MSE_result/counter
+        alpha_base = (np.sqrt(np.sum(np.dot(X.T,y) ** 2, axis=1)).max())/X.shape[0]
+
+        if gram:
+            score_fold, folds, data = _EN_gram_fold_mse, partial(CVpartition_gram, X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), None
+        else:
+            score_fold, folds, data = _EN_fold_mse, partial(CVpartition_index, X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), (X, y)
+        cv_result = _cv_stats(cv_result, key, _alpha_results(score_fold, folds, search, alpha_num, 0, kwargs, data = data, executor = executor, n_jobs = n_jobs, checkpoint = checkpoint,
+                                                             split = ('l1_ratio', 1), alpha_base = alpha_base, l1_ratio = kwargs['l1_ratio'], eps = eps, alpha_num = alpha_num, path = path),
+                              nonzero = True, **stats)
+        MSE_result = cv_result['MSE_mean']
                 
-        #find the min value, if there is a tie, only the first occurence is returned
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape)
+        #select the grid point, if there is a tie, only the first occurence is returned
+        ind = select(cv_result, cv_result['nonzero'])
         l1_ratio = kwargs['l1_ratio'][ind[1]]
-        
-        if l1_ratio != 0:
-            alpha_max = (np.sqrt(np.sum(np.dot(X.T,y) ** 2, axis=1)).max())/X.shape[0]/l1_ratio
-            kwargs['alpha'] = np.logspace(np.log10(alpha_max * eps), np.log10(alpha_max), alpha_num)[::-1]
-           
-            alpha = kwargs['alpha'][ind[0]]
-        else:
-            alpha_max = (np.sqrt(np.sum(np.dot(X.T,y) ** 2, axis=1)).max())/X.shape[0]/0.0001
-            kwargs['alpha'] = np.logspace(np.log10(alpha_max * eps/100), np.log10(alpha_max), alpha_num)[::-1]
-           
-            alpha = kwargs['alpha'][ind[0]]
-            
+        alpha = _EN_alpha_list(alpha_base, l1_ratio, eps, alpha_num)[ind[0]]
             
         hyper_params = {}
         hyper_params['alpha'] = alpha
@@ -216,15 +731,7 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
             if 'eta' not in kwargs:
                 kwargs['eta'] = np.linspace(0,1,20, endpoint = False)[::-1] #eta = 0 use normal PLS
            
-            MSE_result = np.zeros((len(kwargs['K']),len(kwargs['eta'])))
-            
-            counter = 0
-            for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):
-                counter += 1
-                for i in range(len(kwargs['K'])):
-                    for j in range(len(kwargs['eta'])):
-                        _, _, _, mse, _, _ = SPLS(X_train, y_train, X_val, y_val, K = int(kwargs['K'][i]), eta = kwargs['eta'][j], eps = eps)
-                        MSE_result[i,j] += mse
+            cap = False
         
         else:
             if 'K' not in kwargs:
@@ -232,30 +739,19 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
             if 'eta' not in kwargs:
                 kwargs['eta'] = np.linspace(0,1,20, endpoint = False)[::-1] #eta = 0 use normal PLS
            
-            MSE_result = np.zeros((len(kwargs['K']),len(kwargs['eta'])))
-            
-            counter = 0
-            for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):
-                counter += 1
-#                print(counter)
-#                start_time = timeit.default_timer()
-                for i in range(len(kwargs['K'])):
-                    for j in range(len(kwargs['eta'])):
-                        if kwargs['K'][i] > X_train.shape[0]-1:
-                            mse = 10000
-                        ######should be remove in the future##########################
-                        elif kwargs['K'][i] > 30:
-                            mse = 10000
-                        else:
-                            _, _, _, mse, _, _ = SPLS(X_train, y_train, X_val, y_val, K = int(kwargs['K'][i]), eta = kwargs['eta'][j], eps = eps)
-                        
-                        MSE_result[i,j] += mse
-#                print(timeit.default_timer() - start_time)   
-                    
-        MSE_result = MSE_result/counter
+            cap = True
+        
+        #R is not thread-safe
+        if executor == 'thread':
+            executor = 'process'
+        
+        cv_result = _cv_stats(cv_result, key, ce.fold_map(_SPLS_fold_mse, CVpartition_index(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), data = (X, y),
+                                                           executor = executor, n_jobs = n_jobs, checkpoint = checkpoint, split = ('K', 0), K = kwargs['K'], eta = kwargs['eta'], eps = eps, cap = cap),
+                              nonzero = True, **stats)
+        MSE_result = cv_result['MSE_mean']
             
-        #find the min value, if there is a tie, only the first occurence is returned
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape)
+        #select the grid point, if there is a tie, only the first occurence is returned
+        ind = select(cv_result, cv_result['nonzero'])
         K = kwargs['K'][ind[0]]
         eta = kwargs['eta'][ind[1]]
             
@@ -280,20 +776,18 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
 
             #[1e-5, 5*1e-5, 1e-4, 5*1e-4, 1e-3, 1e-2, 1e-1, 1, 5, 10, 50]
         
-        MSE_result = np.zeros(len(kwargs['alpha']))
-        
-        counter = 0
-        for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):
-            counter +=1
-            for i in range(len(kwargs['alpha'])):
-                _, _, _, mse, _, _ = LASSO(X_train, y_train, X_val, y_val, alpha = kwargs['alpha'][i])
-                MSE_result[i] += mse
-                    
-        MSE_result = MSE_result/counter
+        if gram:
+            score_fold, folds, data = _LASSO_gram_fold_mse, partial(CVpartition_gram, X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), None
+        else:
+            score_fold, folds, data = _LASSO_fold_mse, partial(CVpartition_index, X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), (X, y)
+        cv_result = _cv_stats(cv_result, key, _alpha_results(score_fold, folds, search, len(kwargs['alpha']), 0, kwargs, data = data, executor = executor, n_jobs = n_jobs,
+                                                             checkpoint = checkpoint, split = None if path else ('alpha', 0), alpha = kwargs['alpha'], path = path),
+                              nonzero = True, **stats)
+        MSE_result = cv_result['MSE_mean']
                
-        #find the min value, if there is a tie, only the first occurence is returned
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape)
-        alpha = kwargs['alpha'][ind]
+        #select the grid point, if there is a tie, only the first occurence is returned
+        ind = select(cv_result, cv_result['nonzero'])
+        alpha = kwargs['alpha'][ind[0]]
         
         hyper_params = {}
         hyper_params['alpha'] = alpha
@@ -319,22 +813,12 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
         
                
            
-        MSE_result = np.zeros(len(kwargs['degree']))
-       
-        for d in range(len(kwargs['degree'])):
-            X_trans, _ = nr.poly_feature(X, X_test, degree = kwargs['degree'][d], interaction = kwargs['interaction'], power = kwargs['power'])
-            X_trans=np.hstack((np.ones([X_trans.shape[0],1]),X_trans))
-            counter = 0
-            for X_train, y_train, X_val, y_val in CVpartition(X_trans, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):                
-                counter += 1
-                _, _, _, mse, _, _ = OLS(X_train, y_train, X_val, y_val)
-               
-                MSE_result[d] += mse
-                    
-        MSE_result = MSE_result/counter
+        cv_result = _cv_stats(cv_result, key, _POLY_fold_results(X, y, X_test, kwargs['degree'], kwargs['interaction'], kwargs['power'], cv_type, K_fold, Nr, group,
+                                                                 gram, executor, n_jobs), **stats)
+        MSE_result = cv_result['MSE_mean']
         
-        #find the min value, if there is a tie, only the first occurence is returned
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape)
+        #select the grid point, the lowest degree is the simplest, if there is a tie, only the first occurence is returned
+        ind = select(cv_result, np.asarray(kwargs['degree']))
         degree = kwargs['degree'][ind[0]]
         
         hyper_params = {}
@@ -357,41 +841,20 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
             if 'K' not in kwargs:
                 kwargs['K'] = np.linspace(1, min(X.shape[1],int((K_fold-1)/K_fold*X.shape[0]-1)),min(X.shape[1],int((K_fold-1)/K_fold*X.shape[0]-1)))
            
-            MSE_result = np.zeros((len(kwargs['K'])))
-
-            counter = 0
-            for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group=group):
-                counter += 1
-                for i in range(len(kwargs['K'])):
-#                    print(str(kwargs['K'][i])+'  '+str(X_train.shape[0]))
-                    PLS = PLSRegression(scale = False, n_components=int(kwargs['K'][i]), tol = eps).fit(X_train,y_train)
-                    PLS_para = PLS.coef_.reshape(-1,1)
-                    yhat = np.dot(X_val, PLS_para)
-                    MSE_result[i] += rm.mse(y_val, yhat)
+            cap = False
         
         else:
             if 'K' not in kwargs:
                 kwargs['K'] = np.linspace(1, min(X.shape[1],int(X.shape[0]-1)),min(X.shape[1],int(X.shape[0]-1)))
+            cap = True
                      
-            MSE_result = np.zeros((len(kwargs['K'])))
+        cv_result = _cv_stats(cv_result, key, ce.fold_map(_PLS_fold_mse, CVpartition_index(X, y, Type = cv_type, K = K_fold, Nr = Nr, group=group), data = (X, y),
+                                                           executor = executor, n_jobs = n_jobs, checkpoint = checkpoint, split = None if path else ('K', 0), K = kwargs['K'], eps = eps, cap = cap, path = path),
+                              **stats)
+        MSE_result = cv_result['MSE_mean']
             
-            counter = 0
-            for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group=group):
-                counter += 1
-                for i in range(len(kwargs['K'])):
-                    if kwargs['K'][i] > X_train.shape[0]-1:
-                        MSE_result[i] = 10000
-                    else:
-                        PLS = PLSRegression(scale = False, n_components=int(kwargs['K'][i]), tol = eps).fit(X_train,y_train)
-                        PLS_para = PLS.coef_.reshape(-1,1)
-                        yhat = np.dot(X_val, PLS_para)
-                        MSE_result[i] += rm.mse(y_val, yhat)
-                              
-                    
-        MSE_result = MSE_result/counter
-            
-        #find the min value, if there is a tie, only the first occurence is returned
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape) 
+        #select the grid point, the fewest components is the simplest, if there is a tie, only the first occurence is returned
+        ind = select(cv_result, np.asarray(kwargs['K']))
         K = kwargs['K'][ind[0]]
             
         hyper_params = {}
@@ -420,21 +883,17 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
             alpha_max = (np.sqrt(np.sum(np.dot(X.T,y) ** 2, axis=1)).max())/X.shape[0]/0.0001
             kwargs['alpha'] = np.logspace(np.log10(alpha_max * eps/100), np.log10(alpha_max), alpha_num)[::-1]
    
-        MSE_result = np.zeros((len(kwargs['alpha'])))
-        
-        counter = 0
-        for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):
-            counter+=1
-            for i in range(len(kwargs['alpha'])):
-                RR = Ridge(alpha = kwargs['alpha'][i], fit_intercept = False).fit(X_train, y_train)
-                Para = RR.coef_.reshape(-1,1)
-                yhat = np.dot(X_val, Para)
-                MSE_result[i] += rm.mse(y_val, yhat)
-                                        
-        MSE_result = MSE_result/counter
+        if gram:
+            score_fold, folds, data = _RR_gram_fold_mse, CVpartition_gram(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), None
+        else:
+            score_fold, folds, data = _RR_fold_mse, CVpartition_index(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), (X, y)
+        cv_result = _cv_stats(cv_result, key, ce.fold_map(score_fold, folds, data = data, executor = executor, n_jobs = n_jobs, checkpoint = checkpoint,
+                                                           split = None if path or gram else ('alpha', 0), alpha = kwargs['alpha'], path = path),
+                              **stats)
+        MSE_result = cv_result['MSE_mean']
             
-        #find the min value, if there is a tie, only the first occurence is returned
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape)
+        #select the grid point, the largest penalty is the simplest, if there is a tie, only the first occurence is returned
+        ind = select(cv_result, -np.asarray(kwargs['alpha']))
         alpha = kwargs['alpha'][ind[0]]
             
         hyper_params = {}
@@ -470,33 +929,24 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
         if 'trans_type' not in kwargs:
             kwargs['trans_type'] = 'auto'
         
-        if 'select_value' not in kwargs:
+        if 'ALVEN_select_pvalue' not in kwargs:
             kwargs['ALVEN_select_pvalue'] = 0.10
             
-            
-        MSE_result = np.zeros((len(kwargs['degree']),alpha_num,len(kwargs['l1_ratio'])))
     
         #check if the data is zscored, score back:
         #########################to be continue###################################
         
-        counter = 0
-        for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):
-            counter += 1
-#            print('*****'+str(counter))
-            for k in range(len(kwargs['degree'])):
-                for j in range(len(kwargs['l1_ratio'])):
-                    for i in range(alpha_num):
-                        _, _, _, mse, _, _ , _, _= ALVEN(X_train, y_train, X_val, y_val, alpha = i, l1_ratio = kwargs['l1_ratio'][j],
-                                                      degree = kwargs['degree'][k], tol = eps , alpha_num = alpha_num, cv = True,
-                                                      selection = 'p_value', select_value = kwargs['ALVEN_select_pvalue'], trans_type = kwargs['trans_type'])
-                        MSE_result[k,i,j] += mse
-
-        MSE_result = MSE_result/counter
+        cv_result = _cv_stats(cv_result, key, _alpha_results(_ALVEN_fold_mse, partial(CVpartition_index, X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group),
+                                                             search, alpha_num, 1, kwargs, data = (X, y), executor = executor, n_jobs = n_jobs, checkpoint = checkpoint,
+                                                             split = ('l1_ratio', 2), degree = kwargs['degree'], l1_ratio = kwargs['l1_ratio'],
+                                                             eps = eps, alpha_num = alpha_num, select_value = kwargs['ALVEN_select_pvalue'], trans_type = kwargs['trans_type'], path = path),
+                              nonzero = True, **stats)
+        MSE_result = cv_result['MSE_mean']
 
 
             
-        #find the min value, if there is a tie, only the first occurence is returned, and fit the final model
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape)
+        #select the grid point, if there is a tie, only the first occurence is returned, and fit the final model
+        ind = select(cv_result, cv_result['nonzero'])
         degree = kwargs['degree'][ind[0]]
         l1_ratio = kwargs['l1_ratio'][ind[2]]
        
@@ -599,22 +1049,28 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
         if 'min_samples_leaf' not in kwargs:
             kwargs['min_samples_leaf'] = [0.0001]#0.02,0.05, 0.1] #, 0.05 ,0.1, 0.2] # 0.3, 0.4]
         
-        MSE_result = np.zeros((len(kwargs['max_depth']),len(kwargs['n_estimators']),len(kwargs['min_samples_leaf'])))
-        
-        count = 0
-        for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):
-            count += 1
-#            print(count)
-            for i in range(len(kwargs['max_depth'])):
-                for j in range(len(kwargs['n_estimators'])):
-                    for k in range(len(kwargs['min_samples_leaf'])):
-                        _, _, mse, _,_ = nro.RF_fitting(X_train, y_train, X_val,y_val, n_estimators = kwargs['n_estimators'][j], max_depth = kwargs['max_depth'][i], min_samples_leaf=kwargs['min_samples_leaf'][k])
-                        MSE_result[i,j,k] += mse
-                                        
-        MSE_result = MSE_result/count
+        #the trees are built on the n_jobs cores (all by default), unless the folds already run in parallel
+        tree_jobs = (n_jobs or -1) if executor == 'serial' else 1
+        
+        if search == 'halving':
+            if 'halving_factor' not in kwargs:
+                kwargs['halving_factor'] = 3
+            results = _halving_results(_RF_fold_mse, list(CVpartition_index(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group)),
+                                       [('max_depth', kwargs['max_depth']), ('n_estimators', kwargs['n_estimators']), ('min_samples_leaf', kwargs['min_samples_leaf'])],
+                                       data = (X, y), factor = kwargs['halving_factor'], executor = executor, n_jobs = n_jobs, tree_jobs = tree_jobs)
+        else:
+            results = ce.fold_map(_RF_fold_mse, CVpartition_index(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), data = (X, y), executor = executor, n_jobs = n_jobs, checkpoint = checkpoint,
+                                  split = ('max_depth', 0), max_depth = kwargs['max_depth'], n_estimators = kwargs['n_estimators'], min_samples_leaf = kwargs['min_samples_leaf'],
+                                  tree_jobs = tree_jobs)
+        cv_result = _cv_stats(cv_result, key, results, **stats)
+        MSE_result = cv_result['MSE_mean']
+        
+        #score matrix, shallow trees with large leaves are the simplest
+        I = np.indices(MSE_result.shape)
+        S = I[0]/len(kwargs['max_depth']) - I[2]/len(kwargs['min_samples_leaf'])
             
-        #find the min value, if there is a tie, only the first occurence is returned
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape)
+        #select the grid point, if there is a tie, only the first occurence is returned
+        ind = select(cv_result, S)
         max_depth = kwargs['max_depth'][ind[0]]
         n_estimators = kwargs['n_estimators'][ind[1]]
         min_samples_leaf = kwargs['min_samples_leaf'][ind[2]]
@@ -625,7 +1081,8 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
         hyper_params['min_samples_leaf'] = min_samples_leaf
         
         #fit the final model using opt hyper_params
-        RF_model, mse_train, mse_test, yhat_train, yhat_test = nro.RF_fitting(X, y, X_test, y_test, n_estimators = n_estimators, max_depth = max_depth, min_samples_leaf = min_samples_leaf)
+        RF_model, mse_train, mse_test, yhat_train, yhat_test = nro.RF_fitting(X, y, X_test, y_test, n_estimators = n_estimators, max_depth = max_depth, min_samples_leaf = min_samples_leaf,
+                                                                              n_jobs = n_jobs or -1)
         
         return(hyper_params, RF_model, mse_train, mse_test, yhat_train, yhat_test, MSE_result[ind])
  
@@ -641,23 +1098,24 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
         if 'epsilon' not in kwargs:
             kwargs['epsilon'] = [0.01, 0.02, 0.03, 0.05, 0.08, 0.09, 0.1, 0.15, 0.2, 0.3]
         
-        MSE_result = np.zeros((len(kwargs['C']),len(kwargs['gamma']),len(kwargs['epsilon'])))
-
-        counter = 0
-        for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):
-            counter += 1
-#            print(counter)
-            for i in range(len(kwargs['C'])):
-                for j in range(len(kwargs['gamma'])):
-                    for k in range(len(kwargs['epsilon'])):
-                        _, _, mse, _,_ = nro.SVR_fitting(X_train, y_train, X_val,y_val,
-                                                     C=kwargs['C'][i], gamma=kwargs['gamma'][j], epsilon=kwargs['epsilon'][k])
-                        MSE_result[i,j,k] += mse
-                                        
-        MSE_result = MSE_result/counter
+        if search == 'halving':
+            if 'halving_factor' not in kwargs:
+                kwargs['halving_factor'] = 3
+            results = _halving_results(_SVR_fold_mse, list(CVpartition_index(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group)),
+                                       [('C', kwargs['C']), ('gamma', kwargs['gamma']), ('epsilon', kwargs['epsilon'])],
+                                       data = (X, y), factor = kwargs['halving_factor'], executor = executor, n_jobs = n_jobs)
+        else:
+            results = ce.fold_map(_SVR_fold_mse, CVpartition_index(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), data = (X, y), executor = executor, n_jobs = n_jobs, checkpoint = checkpoint,
+                                  split = ('gamma', 1), C = kwargs['C'], gamma = kwargs['gamma'], epsilon = kwargs['epsilon'])
+        cv_result = _cv_stats(cv_result, key, results, **stats)
+        MSE_result = cv_result['MSE_mean']
+        
+        #score matrix, small C with wide kernel and large epsilon is the simplest
+        I = np.indices(MSE_result.shape)
+        S = I[0]/len(kwargs['C']) - I[1]/len(kwargs['gamma']) - I[2]/len(kwargs['epsilon'])
             
-        #find the min value, if there is a tie, only the first occurence is returned
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape)
+        #select the grid point, if there is a tie, only the first occurence is returned
+        ind = select(cv_result, S)
         C = kwargs['C'][ind[0]]
         gamma = kwargs['gamma'][ind[1]]
         epsilon = kwargs['epsilon'][ind[2]]
@@ -684,8 +1142,15 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
         if 'degree' not in kwargs:
             kwargs['degree'] = [1,2,3]
             
-        if 'lag' not in kwargs:
-            kwargs['lag'] = [i+1 for i in range(40)]
+        if 'max_lag' not in kwargs:
+            kwargs['max_lag'] = 40
+        if 'n_lag' not in kwargs:
+            kwargs['n_lag'] = 5
+        if 'lag_expand' not in kwargs:
+            kwargs['lag_expand'] = kwargs.get('lag') is None
+        if kwargs.get('lag') is None:
+            kwargs['lag'] = rm.DALVEN_lag_candidates(X, y, max_lag = kwargs['max_lag'], n_lag = kwargs['n_lag'])
+            print('Lags considered in ' + model_name + ': ' + str(kwargs['lag']))
         
         if 'label_name' not in kwargs:
             kwargs['label_name'] = False
@@ -695,32 +1160,35 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
         
         if 'select_value' not in kwargs:
             kwargs['select_pvalue'] = 0.05
+        
+        if 'shared_design' not in kwargs:
+            kwargs['shared_design'] = cv_type == 'Timeseries' or cv_type == 'Single_ordered'
             
             
-        MSE_result = np.zeros((len(kwargs['degree']),alpha_num,len(kwargs['l1_ratio']), len(kwargs['lag'])))
     
         #check if the data is zscored, score back:
         #########################to be continue###################################
         
-        counter = 0
-        for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):
-            counter += 1
-#            print('*****'+str(counter))
-            for k in range(len(kwargs['degree'])):
-                for j in range(len(kwargs['l1_ratio'])):
-                    for i in range(alpha_num):
-                        for t in range(len(kwargs['lag'])):
-                            _, _, _, mse, _, _ , _, _,_= DALVEN(X_train, y_train, X_val, y_val, alpha = i, l1_ratio = kwargs['l1_ratio'][j],
-                                                      degree = kwargs['degree'][k], lag = kwargs['lag'][t], tol = eps , alpha_num = alpha_num, cv = True,
-                                                      selection = 'p_value', select_value = kwargs['select_pvalue'], trans_type = kwargs['trans_type'])
-                            MSE_result[k,i,j,t] += mse
-
-        MSE_result = MSE_result/counter
+        def lag_results(checkpoint):
+            #the folds only index the lagged design of the whole series for the time-ordered types
+            if kwargs['shared_design']:
+                score_fold, data = _DALVEN_series_fold_mse, None
+                folds = partial(CVpartition_series, X, y, kwargs['degree'], kwargs['lag'], Type = cv_type, K = K_fold, Nr = Nr, group = group,
+                                trans_type = kwargs['trans_type'], full_nonlinear = model_name == 'DALVEN_full_nonlinear')
+            else:
+                score_fold, data = _DALVEN_fold_mse, (X, y)
+                folds = partial(CVpartition_index, X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group)
+            return _alpha_results(score_fold, folds, search, alpha_num, 1, kwargs, data = data, executor = executor, n_jobs = n_jobs, checkpoint = checkpoint,
+                                  split = ('lag', 3), model_name = model_name, degree = kwargs['degree'], l1_ratio = kwargs['l1_ratio'], lag = kwargs['lag'],
+                                  eps = eps, alpha_num = alpha_num, select_value = kwargs['select_pvalue'], trans_type = kwargs['trans_type'])
+        
+        cv_result = _lag_stats(cv_result, key, lag_results, X, y, kwargs, checkpoint = checkpoint, **stats)
+        MSE_result = cv_result['MSE_mean']
 
 
             
-        #find the min value, if there is a tie, only the first occurence is returned, and fit the final model
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape)
+        #select the grid point, if there is a tie, only the first occurence is returned, and fit the final model
+        ind = select(cv_result, cv_result['nonzero'])
         degree = kwargs['degree'][ind[0]]
         l1_ratio = kwargs['l1_ratio'][ind[2]]
         lag = kwargs['lag'][ind[3]]
@@ -895,8 +1363,15 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
         if 'degree' not in kwargs:
             kwargs['degree'] = [1,2] #,3]
             
-        if 'lag' not in kwargs:
-            kwargs['lag'] = [i+1 for i in range(40)]
+        if 'max_lag' not in kwargs:
+            kwargs['max_lag'] = 40
+        if 'n_lag' not in kwargs:
+            kwargs['n_lag'] = 5
+        if 'lag_expand' not in kwargs:
+            kwargs['lag_expand'] = kwargs.get('lag') is None
+        if kwargs.get('lag') is None:
+            kwargs['lag'] = rm.DALVEN_lag_candidates(X, y, max_lag = kwargs['max_lag'], n_lag = kwargs['n_lag'])
+            print('Lags considered in ' + model_name + ': ' + str(kwargs['lag']))
         
         if 'label_name' not in kwargs:
             kwargs['label_name'] = False
@@ -906,32 +1381,35 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
         
         if 'select_value' not in kwargs:
             kwargs['select_pvalue'] = 0.05
+        
+        if 'shared_design' not in kwargs:
+            kwargs['shared_design'] = cv_type == 'Timeseries' or cv_type == 'Single_ordered'
             
             
-        MSE_result = np.zeros((len(kwargs['degree']),alpha_num,len(kwargs['l1_ratio']), len(kwargs['lag'])))
     
         #check if the data is zscored, score back:
         #########################to be continue###################################
         
-        counter = 0
-        for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):
-            counter += 1
-#            print('*****'+str(counter))
-            for k in range(len(kwargs['degree'])):
-                for j in range(len(kwargs['l1_ratio'])):
-                    for i in range(alpha_num):
-                        for t in range(len(kwargs['lag'])):
-                            _, _, _, mse, _, _ , _, _,_= DALVEN(X_train, y_train, X_val, y_val, alpha = i, l1_ratio = kwargs['l1_ratio'][j],
-                                                      degree = kwargs['degree'][k], lag = kwargs['lag'][t], tol = eps , alpha_num = alpha_num, cv = True,
-                                                      selection = 'p_value', select_value = kwargs['select_pvalue'], trans_type = kwargs['trans_type'])
-                            MSE_result[k,i,j,t] += mse
-
-        MSE_result = MSE_result/counter
+        def lag_results(checkpoint):
+            #the folds only index the lagged design of the whole series for the time-ordered types
+            if kwargs['shared_design']:
+                score_fold, data = _DALVEN_series_fold_mse, None
+                folds = partial(CVpartition_series, X, y, kwargs['degree'], kwargs['lag'], Type = cv_type, K = K_fold, Nr = Nr, group = group,
+                                trans_type = kwargs['trans_type'], full_nonlinear = model_name == 'DALVEN_full_nonlinear')
+            else:
+                score_fold, data = _DALVEN_fold_mse, (X, y)
+                folds = partial(CVpartition_index, X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group)
+            return _alpha_results(score_fold, folds, search, alpha_num, 1, kwargs, data = data, executor = executor, n_jobs = n_jobs, checkpoint = checkpoint,
+                                  split = ('lag', 3), model_name = model_name, degree = kwargs['degree'], l1_ratio = kwargs['l1_ratio'], lag = kwargs['lag'],
+                                  eps = eps, alpha_num = alpha_num, select_value = kwargs['select_pvalue'], trans_type = kwargs['trans_type'])
+        
+        cv_result = _lag_stats(cv_result, key, lag_results, X, y, kwargs, checkpoint = checkpoint, **stats)
+        MSE_result = cv_result['MSE_mean']
 
 
             
-        #find the min value, if there is a tie, only the first occurence is returned, and fit the final model
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape)
+        #select the grid point, if there is a tie, only the first occurence is returned, and fit the final model
+        ind = select(cv_result, cv_result['nonzero'])
         degree = kwargs['degree'][ind[0]]
         l1_ratio = kwargs['l1_ratio'][ind[2]]
         lag = kwargs['lag'][ind[3]]
@@ -959,15 +1437,8 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
         for i in range(lag):
             XD = np.hstack((XD,y[lag-1-i:-i-1]))
             
-        #get the name for the retained
-        if kwargs['trans_type'] == 'auto':
-            XD,_ = nr.feature_trans(XD, degree = degree, interaction = 'later')
-        else:
-            XD, _ = nr.poly_feature(XD, degree = degree, interaction = True, power = True)
-
-        
-        #remove feature with 0 variance
-        sel = VarianceThreshold(threshold=eps).fit(XD)
+        #get the name for the retained, the 0-variance features are found block by block
+        support = rm.design_support(XD, degree, trans_type = kwargs['trans_type'], tol = eps)
 
 
 
@@ -1045,7 +1516,7 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
 
                                 
                         
-            index = list(sel.get_support())
+            index = list(support)
             list_name_final = [x for x, y in zip(list_name_final, index) if y]
             list_name_final = [x for x, y in zip(list_name_final, retain_index) if y]
         
@@ -1122,29 +1593,17 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
         
                 
                 
-        MSE_result = np.zeros((len(kwargs['cell_type']),len(kwargs['activation']), len(kwargs['state_size']), len(kwargs['num_layers'])))
-        
-        counter = 0
-        for X_train, y_train, X_val, y_val in CVpartition(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group):
-            counter += 1
-            for i in range(len(kwargs['cell_type'])):
-                for j in range(len(kwargs['activation'])):
-                    for k in range(len(kwargs['state_size'])):
-                        for t in range(len(kwargs['num_layers'])):
-                            _,_, _, _, _, _, test_loss = RNN.timeseries_RNN_feedback_single_train(X_train, y_train, X_test=X_val, Y_test=y_val, train_ratio = kwargs['train_ratio'],\
-                                                                                             cell_type=kwargs['cell_type'][i],activation = kwargs['activation'][j], state_size = kwargs['state_size'][k],\
-                                                                                             batch_size = kwargs['batch_size'], epoch_overlap = kwargs['epoch_overlap'],num_steps = kwargs['num_steps'],\
-                                                                                             num_layers = kwargs['num_layers'][t], learning_rate = kwargs['learning_rate'],  lambda_l2_reg=kwargs['lambda_l2_reg'],\
-                                                                                             num_epochs = kwargs['num_epochs'], input_prob = kwargs['input_prob'], output_prob = kwargs['output_prob'], state_prob = kwargs['state_prob'],\
-                                                                                             input_prob_test =input_prob_test, output_prob_test = output_prob_test, state_prob_test =state_prob_test,\
-                                                                                             max_checks_without_progress = kwargs['max_checks_without_progress'],epoch_before_val=kwargs['epoch_before_val'], location= kwargs['location'], plot= False)
-                            
-                            MSE_result[i,j,k,t] += test_loss
-                                
-        MSE_result = MSE_result/counter
+        cv_result = _cv_stats(cv_result, key, ce.fold_map(_RNN_fold_mse, CVpartition_index(X, y, Type = cv_type, K = K_fold, Nr = Nr, group = group), data = (X, y),
+                                                           executor = executor, n_jobs = n_jobs, checkpoint = checkpoint, split = ('state_size', 2), unique_location = executor != 'serial', **kwargs),
+                              **stats)
+        MSE_result = cv_result['MSE_mean']
+        
+        #score matrix, small and shallow networks are the simplest
+        I = np.indices(MSE_result.shape)
+        S = I[2]*I[3] + I[0] + I[1]
     
-        #find the min value, if there is a tie, only the first occurence is returned, and fit the final model
-        ind = np.unravel_index(np.argmin(MSE_result, axis=None), MSE_result.shape)
+        #select the grid point, if there is a tie, only the first occurence is returned, and fit the final model
+        ind = select(cv_result, S)
         cell_type = kwargs['cell_type'][ind[0]]
         activation = kwargs['activation'][ind[1]]
         state_size = kwargs['state_size'][ind[2]]
@@ -1176,5 +1635,164 @@ def CV_mse(model_name, X, y, X_test, y_test, cv_type = 'Re_KFold', K_fold = 10,
 
 
 
+#models fitted on the non-zscored data in the nested cross-validation
+raw_models = ['ALVEN', 'DALVEN', 'DALVEN_full_nonlinear']
 
 
+def _nested_fold_mse(X_train, y_train, X_test, y_test, X_scale_train, y_scale_train, X_scale_test, y_scale_test, group_train,
+                     model_name, cv_func = None, **kwargs):
+    '''testing mse of each model on one outer fold, the hyper-parameters are selected by cv_func (default CV_mse) on the outer training set'''
+    if cv_func is None:
+        cv_func = CV_mse
+    MSE_test = np.zeros(len(model_name))
+    for i in range(len(model_name)):
+        if model_name[i] in raw_models:
+            result = cv_func(model_name[i], X_train, y_train, X_test, y_test, group = group_train, **kwargs)
+        else:
+            result = cv_func(model_name[i], X_scale_train, y_scale_train, X_scale_test, y_scale_test, group = group_train, **kwargs)
+        
+        if model_name[i] == 'RF' or model_name[i] == 'SVR':
+            MSE_test[i] = result[3]
+        elif model_name[i] == 'RNN':
+            MSE_test[i] = result[7]
+        else:
+            MSE_test[i] = result[4]
+    return MSE_test
+
+
+
+def nested_CV_mse(model_name, X, y, X_scale, y_scale, cv_type = 'Re_KFold', K_fold = 10, Nr = 1000, alpha_num = 50, group = None,
+                  outer = 'random', num_outter = 10, executor = 'serial', n_jobs = None, cv_func = None, **kwargs):
+    '''This function estimates the testing error of each model by nested cross-validation,
+    the hyper-parameters are selected by CV_mse (inner loop) on the training set of each outer fold
+    Input:
+    model_name: list of str, models to compare
+    X, y: independent and dependent variables, non-zscored, used by ALVEN/DALVEN
+    X_scale, y_scale: zscored X and y, used by the other models
+    cv_type, K_fold, Nr, alpha_num: inner cross-validation settings, see CV_mse
+    group: group index, split with X by the outer folds of both types, the outer training part is passed to the inner loop
+    outer: 'random' (default), num_outter splits with 1/K_fold testing data (train_test_split with random_state = 0, ..., num_outter-1)
+           'group', leave one group out
+    executor: 'serial' (default), 'thread' or 'process', the (outer fold, model) tasks are dispatched by cv_engine.fold_map,
+              the inner loop is then run in serial in each task
+              SPLS calls R through rpy2, which is not thread-safe, so 'thread' is run as 'process' if SPLS is in model_name
+    n_jobs: int, number of workers, default number of cores
+    cv_func: function with the interface of CV_mse used for the inner loop, default CV_mse (e.g. cv_final_onestd.CV_mse)
+    **kwargs: passed to the inner CV_mse, e.g. adaptive, selection, path or the hyper-parameter grids
+
+    Output:
+    test_nest_err: np_array len(model_name) x number of outer folds, testing mse of each model on each outer fold
+    The outer folds are computed once as indices and shared by X and X_scale, so both are split the same way
+    '''
+    
+    N = X.shape[0]
+    if outer == 'group':
+        from sklearn.model_selection import LeaveOneGroupOut
+        outer_folds = list(LeaveOneGroupOut().split(X, y.flatten(), groups = group.flatten()))
+    else:
+        outer_folds = [train_test_split(np.arange(N), test_size=1/K_fold, random_state = index_out) for index_out in range(num_outter)]
+        
+    #R is not thread-safe
+    if executor == 'thread' and 'SPLS' in model_name:
+        executor = 'process'
+    
+    folds = ((X[train], y[train], X[test], y[test], X_scale[train], y_scale[train], X_scale[test], y_scale[test],
+              None if group is None else group[train]) for train, test in outer_folds)
+    
+    test_nest_err = np.zeros((len(model_name), len(outer_folds)))
+    index_out = 0
+    for MSE_test in ce.fold_map(_nested_fold_mse, folds, executor = executor, n_jobs = n_jobs, split = ('model_name', 0),
+                                model_name = model_name, cv_func = cv_func, cv_type = cv_type, K_fold = K_fold, Nr = Nr, alpha_num = alpha_num, **kwargs):
+        test_nest_err[:,index_out] = MSE_test
+        index_out += 1
+        
+    return test_nest_err
+
+
+
+def _family_fit(model_index, X, y, X_test, y_test, X_scale, y_scale, X_test_scale, y_test_scale, cv_func, race = None, **kwargs):
+    '''cv_func of one candidate model, dictionary of the outputs as kept by the driver'''
+    try:
+        if race is not None:
+            kwargs['race'] = race.reporter(model_index)
+        if model_index == 'ALVEN':
+            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_func(model_index, X, y, X_test, y_test, label_name=True, **kwargs)
+            return {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
+        elif model_index == 'SVR' or model_index == 'RF':
+            model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_func(model_index, X_scale, y_scale, X_test_scale, y_test_scale, **kwargs)
+            return {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
+        else:
+            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_func(model_index, X_scale, y_scale, X_test_scale, y_test_scale, **kwargs)
+            return {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
+    finally:
+        if race is not None:
+            race.finish(model_index)
+
+
+
+def family_CV_mse(model_name, X, y, X_test, y_test, X_scale, y_scale, X_test_scale, y_test_scale, race = False, race_alpha = 0.05,
+                  family_executor = 'serial', budget = None, cv_func = None, **kwargs):
+    '''This function runs the cross-validation of each candidate model of the driver and collects the results
+    Input:
+    model_name: list of str, the candidate models, ALVEN uses the raw data (X, y, X_test, y_test) and the other models the scaled data
+    race: bool, default False, race the candidate models on the shared folds (cv_engine.Race): each model runs in its own thread and
+          is dropped as soon as its best grid point is worse than the one of the leader by a one-sided paired t-test at level race_alpha,
+          the comparisons are made after every repetition (K_fold folds) from the 2nd on for Re_KFold/MC, after every fold from the 3rd on otherwise
+    family_executor: 'serial' (default), 'thread' or 'process', the candidate models are cross-validated one after the other or concurrently
+                     in a pool with one worker per model (cv_engine.executor_getter); 'process' falls back to 'thread' with SPLS, whose model
+                     holds R objects, and requires the calling script to be guarded by if __name__ == '__main__' on Windows; race always uses threads
+    budget: dictionary, default None, model name: number of cores of its cross-validation, the folds of a model with more than one core
+            run in a thread pool of that size (executor = 'thread', n_jobs) unless executor is given in kwargs, RF builds its trees on them otherwise;
+            the models not given share the cores evenly when they run concurrently
+    cv_func: function, default CV_mse of this file (cv_final_onestd.CV_mse for the one standard error rule)
+    **kwargs: passed to cv_func, e.g. cv_type, K_fold, Nr, group, alpha_num, adaptive
+    
+    Output:
+    fitting1_result_trial: dictionary, model name: dictionary of the outputs of cv_func
+    val_err: np_array, validation mse of each model in the order of model_name, np.inf for the models dropped from the race
+    '''
+    
+    if cv_func is None:
+        cv_func = CV_mse
+    data = (X, y, X_test, y_test, X_scale, y_scale, X_test_scale, y_test_scale)
+    
+    pool = ce.executor_getter(family_executor) if len(model_name) > 1 else None
+    racer = None
+    if race and len(model_name) > 1:
+        #the models wait for each other at every comparison, so they all run at once
+        cv_type = kwargs.get('cv_type', 'Re_KFold')
+        block = kwargs.get('K_fold', 10) if cv_type == 'Re_KFold' or cv_type == 'MC' else 1
+        racer = ce.Race(model_name, block = block, alpha = race_alpha, min_fold = 2*block if block > 1 else 3)
+        pool = ThreadPoolExecutor
+    elif pool is ProcessPoolExecutor and 'SPLS' in model_name:
+        pool = ThreadPoolExecutor
+    
+    #cpu budget of each model
+    if budget is None:
+        budget = {}
+    share = max(1, (os.cpu_count() or 1)//(len(model_name) if pool is not None else 1))
+    family_kwargs = {}
+    for model_index in model_name:
+        family_kwargs[model_index] = dict(kwargs)
+        if model_index in budget:
+            family_kwargs[model_index]['n_jobs'] = budget[model_index]
+        elif pool is not None and 'n_jobs' not in kwargs:
+            family_kwargs[model_index]['n_jobs'] = share
+        if (family_kwargs[model_index].get('n_jobs') or 1) > 1 and 'executor' not in kwargs:
+            family_kwargs[model_index]['executor'] = 'thread'
+        if racer is not None:
+            family_kwargs[model_index]['race'] = racer
+    
+    fitting1_result_trial = {}
+    if pool is None:
+        for model_index in model_name:
+            fitting1_result_trial[model_index] = _family_fit(model_index, *data, cv_func, **family_kwargs[model_index])
+    else:
+        with pool(max_workers = len(model_name)) as workers:
+            tasks = [workers.submit(_family_fit, model_index, *data, cv_func, **family_kwargs[model_index]) for model_index in model_name]
+        for model_index, task in zip(model_name, tasks):
+            fitting1_result_trial[model_index] = task.result()
+    dropped = racer.dropped if racer is not None else {}
+    
+    val_err = np.array([np.inf if model_index in dropped else fitting1_result_trial[model_index]['MSE_val'] for model_index in model_name], dtype = float)
+    return fitting1_result_trial, val_err
@@ -11,6 +11,8 @@ Created on Fri Jan 11 17:00:27 2019
 
 from sklearn.preprocessing import PolynomialFeatures
 import numpy as np
+from itertools import combinations, combinations_with_replacement, islice
+from math import comb
 #from copy import deepcopy
 
 
@@ -172,3 +174,94 @@ def feature_trans(X, X_test = None, degree = 2, interaction = 'later'):
     return (X, X_test)
 
 
+
+def _feature_groups(m, degree, trans_type = 'auto'):
+    '''Column groups of feature_trans(interaction = 'later') (trans_type 'auto') or poly_feature(interaction = True, power = True) (otherwise)
+    in their column order, each group is (factors, combos, count): a column is the product of the factors (transformations of X)
+    taken at the columns of one combination of combos()'''
+    diag = lambda r: (lambda: ((i,)*r for i in range(m)), m)
+    if trans_type != 'auto':
+        return [(('x',)*r, lambda r = r: combinations_with_replacement(range(m), r), comb(m+r-1, r)) for r in range(1, degree+1)]
+    
+    groups = [(('x',),) + diag(1)]
+    for r in range(2, degree+1):
+        groups.append((('x',)*r, lambda r = r: combinations(range(m), r), comb(m, r)))
+    factors = [('log',), ('sqrt',), ('inv',)]
+    if degree >= 2:
+        factors += [('x','x'), ('log','log'), ('inv','inv'), ('x','sqrt'), ('log','inv'), ('sqrt','inv')]
+    if degree >= 3:
+        factors += [('x','x','x'), ('log','log','log'), ('inv','inv','inv'), ('x','x','sqrt'), ('log','log','inv'), ('log','sqrt','inv'),
+                    ('log','inv','inv'), ('sqrt','inv','inv')]
+    return groups + [(f,) + diag(len(f)) for f in factors]
+
+
+def feature_count(m, degree, trans_type = 'auto'):
+    '''number of columns of feature_trans/poly_feature of m variables, see feature_blocks'''
+    return sum(count for _, _, count in _feature_groups(m, degree, trans_type))
+
+
+def feature_blocks(X, degree = 2, trans_type = 'auto', block = 10000, mask = None):
+    '''
+    This function yields the columns of feature_trans(X, degree = degree, interaction = 'later') (trans_type 'auto')
+    or of poly_feature(X, degree = degree, interaction = True, power = True) (otherwise) in blocks, in the same order,
+    so that designs too large for the memory can be processed block by block
+    
+    Input:
+    X: N x m np_array indepdendent variables
+    block: int, number of columns computed at a time
+    mask: bool np_array of size feature_count, default None, only the columns where mask is True are computed
+    
+    Return:
+    generator of np_array N x (at most block), the columns of the block (the ones of mask only)
+    '''
+    
+    base = {'x': X}
+    start = 0
+    for factors, combos, count in _feature_groups(X.shape[1], degree, trans_type):
+        combos = combos()
+        for b in range(0, count, block):
+            index = np.array(list(islice(combos, block)), dtype = int).reshape(-1, len(factors))
+            if mask is not None:
+                index = index[mask[start+b:start+b+index.shape[0]]]
+            yield _product(base, X, factors, index)
+        start += count
+
+
+def _product(base, X, factors, index):
+    '''columns of the products of the factors (transformations of X, cached in base) at the variables index (number of columns x len(factors))'''
+    for f in factors:
+        if f not in base:
+            base[f] = {'log': _xlog, 'sqrt': _xsqrt, 'inv': _xinv}[f](X)
+    col = base[factors[0]][:, index[:,0]]
+    for k in range(1, len(factors)):
+        col = col*base[factors[k]][:, index[:,k]]
+    return col
+
+
+def feature_terms(m, degree = 2, trans_type = 'auto', mask = None, block = 10000):
+    '''
+    This function lists the columns of feature_blocks where mask is True as products of transformations of the m variables
+    
+    Return:
+    list of (factors, index) in the column order, index: np_array of int, number of columns x len(factors), the variables of each product
+    '''
+    
+    terms = []
+    start = 0
+    for factors, combos, count in _feature_groups(m, degree, trans_type):
+        if mask is None or mask[start:start+count].any():
+            combos = combos()
+            index = []
+            for b in range(0, count, block):
+                chunk = np.array(list(islice(combos, block)), dtype = int).reshape(-1, len(factors))
+                index.append(chunk if mask is None else chunk[mask[start+b:start+b+chunk.shape[0]]])
+            terms.append((factors, np.concatenate(index)))
+        start += count
+    return terms
+
+
+def feature_columns(X, terms):
+    '''columns of the terms (feature_terms) computed from X, np_array N x number of columns'''
+    base = {'x': X}
+    return np.column_stack([_product(base, X, factors, index) for factors, index in terms] + [np.empty((X.shape[0], 0))])
+
@@ -13,6 +13,16 @@ import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.neural_network import MLPRegressor
 from sklearn.svm import SVR
+from sklearn.metrics.pairwise import rbf_kernel
+from collections import OrderedDict
+import hashlib
+import threading
+
+
+#memory limit in bytes of the RBF kernel cache used by SVR_path, the least recently used kernels are evicted first
+kernel_cache_size = 2**30
+_kernel_cache = OrderedDict()
+_kernel_cache_lock = threading.Lock()
 
 
 def model_getter(model_name):
@@ -43,7 +53,7 @@ def mse(y, yhat):
 
 
 
-def RF_fitting(X, y, X_test, y_test, n_estimators = 100, max_depth = 10, min_samples_leaf = 0.1, max_features = 'auto',random_state=0):
+def RF_fitting(X, y, X_test, y_test, n_estimators = 100, max_depth = 10, min_samples_leaf = 0.1, max_features = 'auto',random_state=0, n_jobs = None):
     '''Random forest regressor https://scikit-learn.org/stable/modules/generated/sklearn.ensemble.RandomForestRegressor.html#sklearn.ensemble.RandomForestRegressor.decision_path
     Input:
     X: independent variables of size N x m
@@ -54,6 +64,7 @@ def RF_fitting(X, y, X_test, y_test, n_estimators = 100, max_depth = 10, min_sam
     max_depth: int, max_depth of a single tree
     max_features: maximum number of features when considered for a potential splitting, 'auto' = m
     random_state: int, if None, np.rand is used
+    n_jobs: int, number of cores used to build the trees, -1 for all, default None (1)
         
     Output:
     tuple (trained_model, model_params, mse_train, mse_test, yhat_train, yhat_test)
@@ -62,7 +73,7 @@ def RF_fitting(X, y, X_test, y_test, n_estimators = 100, max_depth = 10, min_sam
     
     #build model
     RF = RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth,random_state= random_state,
-                                    max_features = max_features, min_samples_leaf = min_samples_leaf)
+                                    max_features = max_features, min_samples_leaf = min_samples_leaf, n_jobs = n_jobs)
     RF.fit(X, y.flatten())
     
     #predict
@@ -78,6 +89,29 @@ def RF_fitting(X, y, X_test, y_test, n_estimators = 100, max_depth = 10, min_sam
 
 
 
+def RF_path(X, y, X_test, y_test, n_estimators, max_depth = 10, min_samples_leaf = 0.1, max_features = 'auto',random_state=0, n_jobs = None):
+    '''Random forest regressor for a list of n_estimators, one forest is grown with warm_start and scored at each number of trees
+    The trees added by warm_start use the same random seeds as a new forest, so the forest with n trees is the same as RF_fitting(n_estimators = n)
+    Input: see RF_fitting
+    n_estimators: list of int, numbers of trees
+        
+    Output:
+    mse_test: np_array of size len(n_estimators)
+    '''
+    
+    RF = RandomForestRegressor(n_estimators=1, max_depth=max_depth,random_state= random_state, warm_start = True,
+                                    max_features = max_features, min_samples_leaf = min_samples_leaf, n_jobs = n_jobs)
+    
+    mse_test = np.zeros(len(n_estimators))
+    for i in np.argsort(n_estimators, kind = 'stable'):
+        RF.set_params(n_estimators = int(n_estimators[i]))
+        RF.fit(X, y.flatten())
+        mse_test[i] = mse(y_test, RF.predict(X_test).reshape((-1,1)))
+    
+    return mse_test
+
+
+
 
 def MLP_fitting(X, y, X_test, y_test, hidden_layer_sizes = (10,), activation = 'tanh', solver = 'adma', alpha = 0.0001,
         learning_rate_init = 0.001, max_iter = 1000, random_state = 0, tol = 1e-4, early_stopping = True, n_iter_no_change = 5, validation_fraction = 0.1):
@@ -146,3 +180,55 @@ def SVR_fitting(X, y, X_test, y_test, C = 100, epsilon = 10, gamma = 'auto', tol
 
     return (SVR_model, mse_train, mse_test, yhat_train, yhat_test)
 
+
+
+def SVR_path(X, y, X_test, y_test, C, epsilon, gamma, tol = 1e-4, max_iter = 10000):
+    '''Support Vector Reression with RBF kernel for a grid of C and epsilon at one gamma
+    The kernel matrices only depend on (data, gamma), they are computed once (rbf_kernels) and the SVR are fitted with the precomputed kernel
+    Input: see SVR_fitting
+    C, epsilon: list of float
+    gamma: float
+        
+    Output:
+    mse_test: np_array of size len(C) x len(epsilon)
+    '''
+    
+    K, K_test = rbf_kernels(X, X_test, gamma)
+    
+    mse_test = np.zeros((len(C), len(epsilon)))
+    for i in range(len(C)):
+        for k in range(len(epsilon)):
+            SVR_model = SVR(kernel = 'precomputed', C=C[i], epsilon=epsilon[k], tol = tol, max_iter = max_iter)
+            SVR_model.fit(K, y.flatten())
+            mse_test[i,k] = mse(y_test, SVR_model.predict(K_test).reshape((-1,1)))
+    
+    return mse_test
+
+
+
+def rbf_kernels(X, X_test, gamma):
+    '''RBF kernel matrices K(X, X) and K(X_test, X), cached by (data, gamma) with least recently used eviction (kernel_cache_size)
+    Output:
+    tuple (K, K_test), np_array N x N and N_test x N
+    '''
+    
+    X = np.ascontiguousarray(X, dtype = float)
+    X_test = np.ascontiguousarray(X_test, dtype = float)
+    key = (hashlib.sha1(X).hexdigest(), X.shape, hashlib.sha1(X_test).hexdigest(), X_test.shape, float(gamma))
+    
+    with _kernel_cache_lock:
+        if key in _kernel_cache:
+            _kernel_cache.move_to_end(key)
+            return _kernel_cache[key]
+    
+    kernels = (rbf_kernel(X, X, gamma = gamma), rbf_kernel(X_test, X, gamma = gamma))
+    size = kernels[0].nbytes + kernels[1].nbytes
+    
+    with _kernel_cache_lock:
+        if size <= kernel_cache_size:
+            _kernel_cache[key] = kernels
+            while sum(K.nbytes + K_test.nbytes for K, K_test in _kernel_cache.values()) > kernel_cache_size:
+                _kernel_cache.popitem(last = False)
+    
+    return kernels
+
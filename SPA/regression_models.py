@@ -10,6 +10,7 @@ import statsmodels.api as sm
 #from statsmodels.sandbox.regression.predstd import wls_prediction_std
 from SPLS import SPLS_fitting_method
 from sklearn.linear_model import ElasticNet
+from sklearn.linear_model import enet_path
 import numpy as np
 from sklearn.linear_model import Lasso
 import nonlinear_regression as nr
@@ -18,8 +19,15 @@ from sklearn.feature_selection import f_regression
 import math
 import numpy.matlib as matlib
 from sklearn.feature_selection import VarianceThreshold
-#from sklearn.cross_decomposition import PLSRegression
+from sklearn.cross_decomposition import PLSRegression
 from sklearn.linear_model import Ridge
+from numpy.lib.stride_tricks import as_strided
+from scipy.stats import norm
+import tempfile
+
+
+#the nonlinear mapping of DALVEN_full_nonlinear is built block by block (_screen_blocks) once its dense training design would exceed design_memory bytes
+design_memory = 2**30
 
 
 def model_getter(model_name):
@@ -155,6 +163,36 @@ def EN_fitting(X, y, X_test, y_test, alpha, l1_ratio, max_iter = 10000, tol = 1e
     return (EN_model, EN_params, mse_train, mse_test, yhat_train, yhat_test)
 
 
+def EN_path(X, y, X_test, y_test, alpha, l1_ratio, max_iter = 10000, tol = 1e-4):
+    '''Elastic Net along a penalty path https://scikit-learn.org/stable/modules/generated/sklearn.linear_model.enet_path.html
+    The whole path is solved in one coordinate descent sweep, each alpha is warm-started from the solution of the previous one
+    Input:
+    X: independent variables of size N x m
+    y: dependent variable of size N x 1
+    X_test: independent variables of size N_test x m
+    y_test: dependent variable of size N_test x 1
+    alpha: np_array, regularization parameters in any order, the path is solved from the largest one down
+    l1_ratio: float, scaling between l1 and l2 penalties, from 0(Ridge) to 1(Lasso)
+
+    Output:
+    tuple (model_params, mse_train, mse_test)
+    model_params: np_array m x len(alpha), parameters for each alpha, in the order of alpha
+    mse_train, mse_test: np_array of size len(alpha)
+    '''
+    
+    #fit the path, same objective as EN_fitting, enet_path returns the alphas in descending order
+    alpha = np.asarray(alpha, dtype = float)
+    order = np.argsort(-alpha, kind = 'stable')
+    EN_params = np.empty((X.shape[1], len(alpha)))
+    EN_params[:, order] = enet_path(X, y.flatten(), l1_ratio = l1_ratio, alphas = alpha[order], max_iter = max_iter, tol = tol)[1]
+    
+    #get prediction for every alpha at once
+    mse_train = np.sum((np.dot(X, EN_params)-y)**2, axis = 0)/y.shape[0]
+    mse_test = np.sum((np.dot(X_test, EN_params)-y_test)**2, axis = 0)/y_test.shape[0]
+    
+    return (EN_params, mse_train, mse_test)
+
+
 def RR_fitting(X, y, X_test, y_test, alpha, l1_ratio, max_iter = 10000, tol = 1e-4):
     '''Ridge regression
     Input:
@@ -188,6 +226,118 @@ def RR_fitting(X, y, X_test, y_test, alpha, l1_ratio, max_iter = 10000, tol = 1e
     return (RR_model, RR_params, mse_train, mse_test, yhat_train, yhat_test)
 
 
+def RR_path(X, y, X_test, y_test, alpha):
+    '''Ridge regression for all the penalties at once through one thin SVD X = U S V'
+    params(alpha) = V diag(s/(s^2+alpha)) U'y, same solution as RR_fitting (no intercept)
+    Input:
+    X: independent variables of size N x m
+    y: dependent variable of size N x 1
+    X_test: independent variables of size N_test x m
+    y_test: dependent variable of size N_test x 1
+    alpha: np_array, regularization parameters
+
+    Output:
+    tuple (model_params, mse_train, mse_test)
+    model_params: np_array m x len(alpha), parameters for each alpha
+    mse_train, mse_test: np_array of size len(alpha)
+    '''
+    
+    U, s, Vt = np.linalg.svd(X, full_matrices = False)
+    
+    #shrinkage factor for each singular value and alpha, r x len(alpha)
+    d = s.reshape(-1,1)/(s.reshape(-1,1)**2 + np.asarray(alpha).reshape(1,-1))
+    RR_params = np.dot(Vt.T, d*np.dot(U.T, y))
+    
+    #get prediction for every alpha at once
+    mse_train = np.sum((np.dot(X, RR_params)-y)**2, axis = 0)/y.shape[0]
+    mse_test = np.sum((np.dot(X_test, RR_params)-y_test)**2, axis = 0)/y_test.shape[0]
+    
+    return (RR_params, mse_train, mse_test)
+
+
+def RR_gram(G, c, X_test, y_test, alpha):
+    '''Ridge regression for all the penalties at once from the sufficient statistics G = X'X and c = X'y
+    (G + alpha I)^-1 c is solved through one eigendecomposition G = V L V', the N x m data is not needed
+    Input:
+    G: np_array m x m, X'X of the training data
+    c: np_array m x 1, X'y of the training data
+    X_test, y_test: testing data
+    alpha: list/np_array of regularization parameters
+
+    Output:
+    tuple (model_params, mse_test)
+    model_params: np_array m x len(alpha)
+    mse_test: np_array of size len(alpha)
+    '''
+    
+    lam, V = np.linalg.eigh(G)
+    Vc = np.dot(V.T, c)
+    RR_params = np.dot(V, Vc/(lam.reshape(-1,1) + np.asarray(alpha).reshape(1,-1)))
+    
+    mse_test = np.sum((np.dot(X_test, RR_params)-y_test)**2, axis = 0)/y_test.shape[0]
+    
+    return (RR_params, mse_test)
+
+
+def gram_root(G, c, n):
+    '''Small design with the same least squares problem as the data summarized by G = X'X, c = X'y and N = n
+    With G = V L V' (zero eigenvalues dropped, rank r), X_root = sqrt(r/n) L^0.5 V' and y_root = sqrt(r/n) L^-0.5 V'c,
+    so X_root'X_root = r/n G and X_root'y_root = r/n c: the 1/(2N) scaled loss of ElasticNet/Lasso has the same solution on (X_root, y_root) as on (X, y)
+    Input:
+    G: np_array m x m
+    c: np_array m x 1
+    n: int, number of samples summarized in G and c
+
+    Output:
+    tuple (X_root, y_root), np_array r x m and r x 1
+    '''
+    
+    lam, V = np.linalg.eigh(G)
+    keep = lam > lam.max()*G.shape[0]*np.finfo(float).eps
+    lam = lam[keep]
+    V = V[:,keep]
+    
+    scale = np.sqrt(len(lam)/n)
+    X_root = scale*np.sqrt(lam).reshape(-1,1)*V.T
+    y_root = scale*np.dot(V.T, c)/np.sqrt(lam).reshape(-1,1)
+    
+    return (X_root, y_root)
+
+
+def PLS_path(X, y, X_test, y_test, K, tol = 1e-6):
+    '''PLS regression (scale = False) for all the numbers of components at once
+    The NIPALS components are extracted once up to max(K), component k does not depend on how many components follow,
+    so the parameters with the first K components are W_K pinv(P_K'W_K) Q_K', the same as PLSRegression(n_components = K).coef_
+    Input:
+    X: independent variables of size N x m
+    y: dependent variable of size N x 1
+    X_test: independent variables of size N_test x m
+    y_test: dependent variable of size N_test x 1
+    K: list of int, numbers of latent variables
+
+    Output:
+    tuple (model_params, mse_train, mse_test)
+    model_params: np_array m x len(K), parameters for each K
+    mse_train, mse_test: np_array of size len(K)
+    '''
+    
+    PLS = PLSRegression(scale = False, n_components = int(max(K)), tol = tol).fit(X, y)
+    W = PLS.x_weights_
+    P = PLS.x_loadings_
+    Q = PLS.y_loadings_
+    
+    PLS_params = np.zeros((X.shape[1], len(K)))
+    for i in range(len(K)):
+        k = int(K[i])
+        PLS_params[:,i] = np.dot(np.dot(W[:,:k], np.linalg.pinv(np.dot(P[:,:k].T, W[:,:k]))), Q[:,:k].T).flatten()
+    
+    #get prediction for every K at once
+    mse_train = np.sum((np.dot(X, PLS_params)-y)**2, axis = 0)/y.shape[0]
+    mse_test = np.sum((np.dot(X_test, PLS_params)-y_test)**2, axis = 0)/y_test.shape[0]
+    
+    return (PLS_params, mse_train, mse_test)
+
+
 
 
 def LASSO_fitting(X, y, X_test, y_test, alpha, max_iter = 10000, tol = 1e-4):
@@ -224,7 +374,7 @@ def LASSO_fitting(X, y, X_test, y_test, alpha, max_iter = 10000, tol = 1e-4):
 
 
 def ALVEN_fitting(X, y, X_test, y_test, alpha, l1_ratio, degree, alpha_num = None, cv= False, max_iter = 10000, 
-                  tol = 1e-4, selection = 'p_value', select_value = 0.15, trans_type = 'auto'):
+                  tol = 1e-4, selection = 'p_value', select_value = 0.15, trans_type = 'auto', design = None):
     '''Algebric learning via elastic net
     Input:
     X: independent variables of size N x m, has to be non-zscored!
@@ -240,6 +390,8 @@ def ALVEN_fitting(X, y, X_test, y_test, alpha, l1_ratio, degree, alpha_num = Non
                              'elbow' and use the point with the greatest orthogonal distace from the line linking the first and the last points
                               All the values are calculated based on f-regression (F statistic of univariate linear correlation)
     trans_type: can choose either automatic transformation used in ALVEN ('auto'), or only polynomial transformation ('poly')
+    design: tuple returned by ALVEN_design for the same data, degree, selection and trans_type, default None (computed here)
+            used in cross-validation to share the pre-processing among l1_ratio and alpha
 
 
                  
@@ -249,12 +401,99 @@ def ALVEN_fitting(X, y, X_test, y_test, alpha, l1_ratio, degree, alpha_num = Non
     model_params: np_array m x 1
     '''
     
+    if design is None:
+        design = ALVEN_design(X, y, X_test, y_test, degree, tol = tol, selection = selection,
+                              select_value = select_value, trans_type = trans_type)
+    X_fit, y, X_test_fit, y_test, retain_index = design
+
+    #choose the appropriate alpha in cross_Validation: cv= Ture
+    
+    if X_fit.shape[1] == 0:
+        print('no variable selected by ALVEN')
+        ALVEN_model = None
+        ALVEN_params = None
+        mse_train = np.var(y)
+        mse_test = np.var(y_test)
+        yhat_train = np.zeros(y.shape)
+        yhat_test = np.zeros(y_test.shape)
+        alpha = 0
+    else:
+        if alpha_num is not None and cv:
+            X_max = np.concatenate((X_fit,X_test_fit),axis = 0)
+            y_max = np.concatenate((y, y_test), axis = 0)
+            alpha_max = (np.sqrt(np.sum(np.dot(X_max.T,y_max) ** 2, axis=1)).max())/X_max.shape[0]/l1_ratio
+            alpha_list = np.logspace(np.log10(alpha_max * tol), np.log10(alpha_max), alpha_num)[::-1]
+            alpha = alpha_list[alpha]
+        
+        if alpha_num is not None and not cv:
+            alpha_max = (np.sqrt(np.sum(np.dot(X_fit.T,y) ** 2, axis=1)).max())/X_fit.shape[0]/l1_ratio
+            alpha_list = np.logspace(np.log10(alpha_max * tol), np.log10(alpha_max), alpha_num)[::-1]
+            alpha = alpha_list[alpha]
+            
+        #EN for model fitting
+        ALVEN_model, ALVEN_params, mse_train, mse_test, yhat_train, yhat_test = EN_fitting(X_fit, y, X_test_fit, y_test, alpha, l1_ratio, max_iter = max_iter, tol = tol)
+        
+    
+    return (ALVEN_model, ALVEN_params, mse_train, mse_test, yhat_train, yhat_test, alpha, retain_index)
+
+
+def ALVEN_path(X, y, X_test, y_test, l1_ratio, degree, alpha_num, max_iter = 10000, 
+               tol = 1e-4, selection = 'p_value', select_value = 0.15, trans_type = 'auto', design = None, alpha_index = None):
+    '''Algebric learning via elastic net over the whole cross-validation penalty grid
+    The pre-processing is done once and the alpha_num penalties of ALVEN_fitting(cv = True) are solved in one warm-started path
+    Input: see ALVEN_fitting
+    alpha_index: list of int, default None (all), only the penalties alpha = alpha_index of ALVEN_fitting are solved
+
+    Output:
+    tuple (model_params, mse_test)
+    model_params: np_array m_selected x alpha_num, parameters on the pre-processed variables for each alpha, 0 x alpha_num if no variable is selected
+    mse_test: np_array of size alpha_num, same order as alpha = 0, 1, ..., alpha_num-1 in ALVEN_fitting
+    (len(alpha_index) instead of alpha_num with alpha_index)
+    '''
+    
+    if alpha_index is None:
+        alpha_index = np.arange(alpha_num)
+
+    if design is None:
+        design = ALVEN_design(X, y, X_test, y_test, degree, tol = tol, selection = selection,
+                              select_value = select_value, trans_type = trans_type)
+    X_fit, y, X_test_fit, y_test, _ = design
+
+    if X_fit.shape[1] == 0:
+        print('no variable selected by ALVEN')
+        return (np.zeros((0, len(alpha_index))), np.var(y_test)*np.ones(len(alpha_index)))
+    
+    X_max = np.concatenate((X_fit,X_test_fit),axis = 0)
+    y_max = np.concatenate((y, y_test), axis = 0)
+    alpha_max = (np.sqrt(np.sum(np.dot(X_max.T,y_max) ** 2, axis=1)).max())/X_max.shape[0]/l1_ratio
+    alpha_list = np.logspace(np.log10(alpha_max * tol), np.log10(alpha_max), alpha_num)[::-1][alpha_index]
+        
+    ALVEN_params, _, mse_test = EN_path(X_fit, y, X_test_fit, y_test, alpha_list, l1_ratio, max_iter = max_iter, tol = tol)
+    
+    return (ALVEN_params, mse_test)
+
+
+def ALVEN_design(X, y, X_test, y_test, degree, tol = 1e-4, selection = 'p_value', select_value = 0.15, trans_type = 'auto'):
+    '''Pre-processing step of ALVEN: feature transformation, 0-variance removal, zscore and f-regression screening
+    It only depends on the data, degree, selection and trans_type, so it can be computed once and passed to ALVEN_fitting/ALVEN_path for every l1_ratio and alpha
+    Output:
+    tuple (X_fit, y, X_test_fit, y_test, retain_index), zscored and screened data
+    '''
+    
     #feature transformation
     if trans_type == 'auto':
         X, X_test = nr.feature_trans(X, X_test, degree = degree, interaction = 'later')
     else:
         X, X_test = nr.poly_feature(X, X_test, degree = degree, interaction = True, power = True)
     
+    return _screen_design(X, y, X_test, y_test, tol = tol, selection = selection, select_value = select_value)
+
+
+def _screen_design(X, y, X_test, y_test, tol = 1e-4, selection = 'p_value', select_value = 0.15):
+    '''Common pre-processing of ALVEN and DALVEN after the features are built: 0-variance removal, zscore and f-regression screening
+    Output:
+    tuple (X_fit, y, X_test_fit, y_test, retain_index), zscored and screened data
+    '''
     
     #remove feature with 0 variance
     sel = VarianceThreshold(threshold=tol).fit(X)
@@ -283,19 +522,21 @@ def ALVEN_fitting(X, y, X_test, y_test, alpha, l1_ratio, degree, alpha_num = Non
   
     #eliminate feature
     f_test, p_values = f_regression(X, y.flatten())
-              
-        
+    retain_index = _retain(f_test, p_values, selection, select_value)
+    
+    return (X[:,retain_index], y, X_test[:,retain_index], y_test, retain_index)
+
+
+def _retain(f_test, p_values, selection = 'p_value', select_value = 0.15):
+    '''Columns kept by the f-regression screening of _screen_design, bool np_array'''
+    
     if selection == 'p_value':
-        X_fit = X[:,p_values<select_value]
-        X_test_fit = X_test[:,p_values<select_value]
         retain_index = p_values<select_value
         
     elif selection == 'percentage':
-        number = int(math.ceil(select_value * X.shape[1]))
+        number = int(math.ceil(select_value * f_test.shape[0]))
         f_test.sort()
         value = f_test[-number]
-        X_fit =  X[:,f_test>=value]
-        X_test_fit = X_test[:,f_test>=value]
         
         retain_index = f_test>=value
         
@@ -320,41 +561,294 @@ def ALVEN_fitting(X, y, X_test, y_test, alpha, l1_ratio, degree, alpha_num = Non
         BestPoint = np.argmax(distToLine)
         value = f[BestPoint]
         
-        X_fit =  X[:,f_test>=value]
-        X_test_fit = X_test[:,f_test>=value]        
-        
         retain_index = f_test>=value
-        
+    
+    return retain_index
 
-    #choose the appropriate alpha in cross_Validation: cv= Ture
+
+def _empty(shape, dtype, memmap = None):
+    '''Uninitialized array, in a temporary file of the directory memmap (np.memmap) if given'''
+    if memmap is None or 0 in shape:
+        return np.empty(shape, dtype = dtype)
+    return np.memmap(tempfile.TemporaryFile(dir = memmap), dtype = dtype, mode = 'w+', shape = shape)
+
+
+def _screen_blocks(XD, y, XD_test, y_test, degree, trans_type = 'auto', tol = 1e-4, selection = 'p_value', select_value = 0.15,
+                   block = None, dtype = None, memmap = None):
+    '''_screen_design of the nonlinear mapping of the lagged design XD (DALVEN_full_nonlinear) without building it dense:
+    the columns are computed block by block (nr.feature_blocks) and only their 0-variance, zscore and f-regression statistics are kept,
+    then only the retained columns are computed again and written into the preallocated output
+    block: int, number of columns computed at a time, default None (about 2**23 values per block)
+    dtype: dtype of the output designs, default None (float64), e.g. np.float32 halves the memory
+    memmap: str, default None, directory of the temporary files holding the output designs (np.memmap) instead of the memory
+    Output:
+    tuple (XD_fit, y, XD_test_fit, y_test, retain_index), as _screen_design
+    '''
     
-    if X_fit.shape[1] == 0:
-        print('no variable selected by ALVEN')
-        ALVEN_model = None
-        ALVEN_params = None
-        mse_train = np.var(y)
-        mse_test = np.var(y_test)
-        yhat_train = np.zeros(y.shape)
-        yhat_test = np.zeros(y_test.shape)
-        alpha = 0
-    else:
-        if alpha_num is not None and cv:
-            X_max = np.concatenate((X_fit,X_test_fit),axis = 0)
-            y_max = np.concatenate((y, y_test), axis = 0)
-            alpha_max = (np.sqrt(np.sum(np.dot(X_max.T,y_max) ** 2, axis=1)).max())/X_max.shape[0]/l1_ratio
-            alpha_list = np.logspace(np.log10(alpha_max * tol), np.log10(alpha_max), alpha_num)[::-1]
-            alpha = alpha_list[alpha]
-        
-        if alpha_num is not None and not cv:
-            alpha_max = (np.sqrt(np.sum(np.dot(X_fit.T,y) ** 2, axis=1)).max())/X_fit.shape[0]/l1_ratio
-            alpha_list = np.logspace(np.log10(alpha_max * tol), np.log10(alpha_max), alpha_num)[::-1]
-            alpha = alpha_list[alpha]
-            
-        #EN for model fitting
-        ALVEN_model, ALVEN_params, mse_train, mse_test, yhat_train, yhat_test = EN_fitting(X_fit, y, X_test_fit, y_test, alpha, l1_ratio, max_iter = max_iter, tol = tol)
-        
+    if block is None:
+        block = max(2**23//XD.shape[0], 1)
     
-    return (ALVEN_model, ALVEN_params, mse_train, mse_test, yhat_train, yhat_test, alpha, retain_index)
+    scaler_y = StandardScaler(with_mean=True, with_std=True)
+    scaler_y.fit(y)
+    y = scaler_y.transform(y)
+    y_test = scaler_y.transform(y_test)
+    
+    #first pass, statistics of each block
+    support, mean, scale, f_test, p_values = [], [], [], [], []
+    for B in nr.feature_blocks(XD, degree, trans_type, block):
+        keep = B.var(axis = 0) > tol
+        B = B[:,keep]
+        support.append(keep)
+        mean.append(B.mean(axis = 0))
+        scale.append(B.std(axis = 0))
+        f, p = f_regression((B - mean[-1])/scale[-1], y.flatten())
+        f_test.append(f)
+        p_values.append(p)
+    support = np.concatenate(support)
+    retain_index = _retain(np.concatenate(f_test), np.concatenate(p_values), selection, select_value)
+    mean = np.concatenate(mean)[retain_index]
+    scale = np.concatenate(scale)[retain_index]
+    
+    #second pass, only the retained columns
+    mask = np.zeros(support.shape, dtype = bool)
+    mask[np.flatnonzero(support)[retain_index]] = True
+    XD_fit = _empty((XD.shape[0], mean.shape[0]), dtype or np.float64, memmap)
+    XD_test_fit = _empty((XD_test.shape[0], mean.shape[0]), dtype or np.float64, memmap)
+    start = 0
+    for B, B_test in zip(nr.feature_blocks(XD, degree, trans_type, block, mask), nr.feature_blocks(XD_test, degree, trans_type, block, mask)):
+        end = start + B.shape[1]
+        XD_fit[:,start:end] = (B - mean[start:end])/scale[start:end]
+        XD_test_fit[:,start:end] = (B_test - mean[start:end])/scale[start:end]
+        start = end
+    
+    return (XD_fit, y, XD_test_fit, y_test, retain_index)
+
+
+def design_support(XD, degree, trans_type = 'auto', tol = 1e-4, block = None):
+    '''Columns of the nonlinear mapping of the lagged design XD kept by the 0-variance removal (VarianceThreshold(tol).get_support()),
+    computed block by block (nr.feature_blocks), bool np_array'''
+    
+    if block is None:
+        block = max(2**23//XD.shape[0], 1)
+    return np.concatenate([B.var(axis = 0) > tol for B in nr.feature_blocks(XD, degree, trans_type, block)])
+
+
+def _blockwise(N, m, degree, trans_type = 'auto', block = None, dtype = None, memmap = None):
+    '''the nonlinear mapping of N x m lagged design is screened block by block (_screen_blocks): block, dtype or memmap is given
+    or the dense design is larger than design_memory'''
+    return block is not None or dtype is not None or memmap is not None or N*nr.feature_count(m, degree, trans_type)*8 > design_memory
+
+
+def lag_tensor(X, max_lag):
+    '''Strided view of the lagged copies of X up to max_lag, built once and sliced for every lag <= max_lag
+    Input:
+    X: np_array of size N x m
+    max_lag: int, largest lag
+    
+    Output:
+    T: read-only view of size N x (max_lag+1) x m, T[t, j] = X[t-j] (0 before the first sample)
+    '''
+    
+    X = np.asarray(X, dtype = float).reshape(X.shape[0], -1)
+    Xpad = np.concatenate((np.zeros((max_lag, X.shape[1])), X), axis = 0)
+    #window t covers Xpad[t], ..., Xpad[t+max_lag] = X[t-max_lag], ..., X[t], reversed to X[t], ..., X[t-max_lag]
+    T = as_strided(Xpad, shape = (X.shape[0], max_lag+1, X.shape[1]), strides = (Xpad.strides[0], Xpad.strides[0], Xpad.strides[1]), writeable = False)
+    return T[:,::-1]
+
+
+def lag_design(TX, Ty, lag):
+    '''Lagged design matrix from the lag tensors of X and y, columns xt,xt-1,...xt-l,yt-1,...,yt-l for t >= lag
+    Input:
+    TX, Ty: lag_tensor of X and y with max_lag >= lag
+    lag: int
+    
+    Output:
+    XD: np_array of size (N-lag) x ((lag+1)*m + lag)
+    '''
+    
+    N = TX.shape[0]
+    return np.hstack((TX[lag:,:lag+1].reshape(N-lag, -1), Ty[lag:,1:lag+1].reshape(N-lag, -1)))
+
+
+def DALVEN_tensor(X, y, X_test, y_test, degree, max_lag, trans_type = 'auto', full_nonlinear = False):
+    '''Lag tensors shared by all the lags <= max_lag of one (data, degree)
+    For DALVEN the feature transformation is done here before the lagging, for DALVEN_full_nonlinear it is done after the lagging in DALVEN_design
+    Output:
+    tuple (TX, Ty, TX_test, Ty_test), see lag_tensor
+    '''
+    
+    if not full_nonlinear:
+        #feature transformation
+        if trans_type == 'auto':
+            X, X_test = nr.feature_trans(X, X_test, degree = degree, interaction = 'later')
+        else:
+            X, X_test = nr.poly_feature(X, X_test, degree = degree, interaction = True, power = True)
+    
+    return (lag_tensor(X, max_lag), lag_tensor(y, max_lag), lag_tensor(X_test, max_lag), lag_tensor(y_test, max_lag))
+
+
+def DALVEN_design(X, y, X_test, y_test, degree, lag, tol = 1e-4, selection = 'p_value', select_value = 0.15, trans_type = 'auto',
+                  full_nonlinear = False, tensor = None, block = None, dtype = None, memmap = None):
+    '''Pre-processing step of DALVEN: feature transformation, lag padding, 0-variance removal, zscore and f-regression screening
+    tensor: tuple returned by DALVEN_tensor for the same data, degree and trans_type with max_lag >= lag, default None (computed here)
+    block, dtype, memmap: for DALVEN_full_nonlinear, the nonlinear mapping is computed and screened block by block if one is given
+                          or if its dense design exceeds design_memory bytes, see _screen_blocks
+    Output:
+    tuple (XD_fit, y, XD_test_fit, y_test, retain_index), zscored and screened data
+    '''
+    
+    if tensor is None:
+        tensor = DALVEN_tensor(X, y, X_test, y_test, degree, lag, trans_type = trans_type, full_nonlinear = full_nonlinear)
+    TX, Ty, TX_test, Ty_test = tensor
+    
+    #lag padding for X and y in design matrix
+    XD = lag_design(TX, Ty, lag)
+    XD_test = lag_design(TX_test, Ty_test, lag)
+    
+    if full_nonlinear and _blockwise(XD.shape[0], XD.shape[1], degree, trans_type, block, dtype, memmap):
+        return _screen_blocks(XD, y[lag:], XD_test, y_test[lag:], degree, trans_type = trans_type, tol = tol, selection = selection,
+                              select_value = select_value, block = block, dtype = dtype, memmap = memmap)
+    
+    if full_nonlinear:
+        #nonliner mapping
+        if trans_type == 'auto':
+            XD, XD_test = nr.feature_trans(XD, XD_test, degree = degree, interaction = 'later')
+        else:
+            XD, XD_test = nr.poly_feature(XD, XD_test, degree = degree, interaction = True, power = True)
+    
+    #shorterning y
+    y = y[lag:]
+    y_test = y_test[lag:]
+    
+    return _screen_design(XD, y, XD_test, y_test, tol = tol, selection = selection, select_value = select_value)
+
+
+def DALVEN_series(X, y, degree, lag, trans_type = 'auto', full_nonlinear = False):
+    '''Lagged design of the whole ordered series for every (degree, lag), before the screening, shared by the time-ordered CV folds
+    The lag tensor is built once per degree up to max(lag), the feature transformation is row-wise so it is the same on the whole series as on each block
+    Input:
+    degree, lag: lists of int
+    
+    Output:
+    dictionary {(degree, lag): (XD, yD, trans)}, XD and yD hold the rows t = lag, ..., N-1 of the series, see lag_rows,
+    trans is None, or (degree, trans_type) when the nonlinear mapping of DALVEN_full_nonlinear is too large to be shared (_blockwise)
+    and XD is the lagged design before the mapping, which is then screened block by block on each fold
+    '''
+    
+    series = {}
+    for d in degree:
+        Xd = X
+        if not full_nonlinear:
+            if trans_type == 'auto':
+                Xd, _ = nr.feature_trans(X, degree = d, interaction = 'later')
+            else:
+                Xd, _ = nr.poly_feature(X, degree = d, interaction = True, power = True)
+        TX, Ty = lag_tensor(Xd, max(lag)), lag_tensor(y, max(lag))
+        for l in lag:
+            XD = lag_design(TX, Ty, l)
+            if full_nonlinear and _blockwise(XD.shape[0], XD.shape[1], d, trans_type):
+                series[d, l] = (XD, y[l:], (d, trans_type))
+                continue
+            if full_nonlinear:
+                if trans_type == 'auto':
+                    XD, _ = nr.feature_trans(XD, degree = d, interaction = 'later')
+                else:
+                    XD, _ = nr.poly_feature(XD, degree = d, interaction = True, power = True)
+            series[d, l] = (XD, y[l:], None)
+    return series
+
+
+def lag_rows(index, lag):
+    '''Rows of the lagged design (rows t = lag, ..., N-1 of the series) of the samples index of the series, the first lag samples have no row
+    index: slice or np_array of int, a slice gives a slice (the rows are then a view)
+    '''
+    
+    if isinstance(index, slice):
+        start = max(index.start or 0, lag) - lag
+        return slice(start, max(index.stop - lag, start))
+    index = np.asarray(index)
+    return index[index >= lag] - lag
+
+
+def DALVEN_series_design(series, degree, lag, train_index, val_index, tol = 1e-4, selection = 'p_value', select_value = 0.15):
+    '''Design of one time-ordered fold from the shared lagged design of DALVEN_series: the rows of the training and validation samples,
+    including the first lag samples of the validation block whose lags are in the training block, only the screening is fitted on the fold
+    Output:
+    tuple (XD_fit, y, XD_test_fit, y_test, retain_index), as DALVEN_design
+    '''
+    
+    XD, yD, trans = series[degree, lag]
+    train_rows, val_rows = lag_rows(train_index, lag), lag_rows(val_index, lag)
+    if trans is not None:
+        return _screen_blocks(XD[train_rows], yD[train_rows], XD[val_rows], yD[val_rows], trans[0], trans_type = trans[1], tol = tol,
+                              selection = selection, select_value = select_value)
+    return _screen_design(XD[train_rows], yD[train_rows], XD[val_rows], yD[val_rows], tol = tol, selection = selection, select_value = select_value)
+
+
+def DALVEN_lag_candidates(X, y, max_lag = 40, n_lag = 5, alpha = 0.01, above = 0):
+    '''Short ranked list of candidate lags for DALVEN from the dynamics of the training data, instead of every lag up to max_lag
+    Each lag is scored by the largest of, relative to the confidence bound of level alpha:
+        the PACF of y, if the Ljung-Box test on the ACF of y finds autocorrelation (as in dataset_property_new.dynamic_assess)
+        the cross-correlation between y and each lagged x, both prewhitened by the AR filter of x (order from the PACF of x)
+    and the significant lags are ranked by decreasing score
+    Input:
+    X: np_array of size N x m
+    y: np_array of size N x 1
+    max_lag: int, largest lag considered, default 40 (at most N//4)
+    n_lag: int, number of lags returned, default 5
+    alpha: significance level, default 0.01
+    above: int, default 0, only the lags > above are proposed, see DALVEN_lag_expand
+    
+    Output:
+    lag: list of at most n_lag int, the significant lags by decreasing score, the lags above+1, above+2, ... if none is significant,
+         empty if above >= max_lag
+    '''
+    
+    y = np.asarray(y, dtype = float).ravel()
+    X = np.asarray(X, dtype = float).reshape(y.shape[0], -1)
+    N = y.shape[0]
+    max_lag = max(min(max_lag, N//4), 1)
+    if above >= max_lag:
+        return []
+    bound = norm.ppf(1-alpha/2)/np.sqrt(N)
+    score = np.zeros(max_lag+1)
+    
+    #autoregressive lags of y
+    _, _, acf_pvalues = sm.tsa.stattools.acf(y, nlags = max_lag, qstat = True)
+    if (acf_pvalues < alpha).any():
+        score = np.maximum(score, np.abs(sm.tsa.stattools.pacf(y, nlags = max_lag))/bound)
+    
+    #lags of each x, the AR filter of x removes its own autocorrelation which otherwise spreads the cross-correlation over many lags
+    for x in X.T:
+        if np.std(x) == 0:
+            continue
+        pacf_lag = np.abs(sm.tsa.stattools.pacf(x, nlags = max_lag)[1:]) > bound
+        order = int(np.argmin(pacf_lag)) if not pacf_lag.all() else max_lag
+        xw, yw = x - x.mean(), y - y.mean()
+        if order:
+            rho, _ = sm.regression.yule_walker(x, order = order)
+            xw = xw[order:] - sum(rho[j]*xw[order-j-1:-j-1] for j in range(order))
+            yw = yw[order:] - sum(rho[j]*yw[order-j-1:-j-1] for j in range(order))
+        n = xw.shape[0]
+        ccf = np.array([xw[:n-k] @ yw[k:] for k in range(max_lag+1)])/(n*np.std(xw)*np.std(yw))
+        score = np.maximum(score, np.abs(ccf)/bound)
+    
+    lag = np.arange(above+1, max_lag+1)
+    significant = lag[score[lag] > 1]
+    if significant.size:
+        return [int(l) for l in significant[np.argsort(-score[significant], kind = 'stable')][:n_lag]]
+    return [int(l) for l in lag[:n_lag]]
+
+
+def DALVEN_lag_expand(X, y, lag, best, max_lag = 40, n_lag = 5, alpha = 0.01):
+    '''Lags to add to the lag grid when the selected lag best is its largest one, so the optimum may lie beyond the boundary
+    Output:
+    list of at most n_lag int > best from DALVEN_lag_candidates, empty if best is inside the grid or max_lag is reached
+    '''
+    
+    if best < max(lag):
+        return []
+    return DALVEN_lag_candidates(X, y, max_lag = max_lag, n_lag = n_lag, alpha = alpha, above = best)
 
 
 
@@ -365,7 +859,7 @@ def ALVEN_fitting(X, y, X_test, y_test, alpha, l1_ratio, degree, alpha_num = Non
 
 
 def DALVEN_fitting(X, y, X_test, y_test, alpha, l1_ratio, degree, lag, alpha_num = None, cv= False, max_iter = 10000, 
-                  tol = 1e-4, selection = 'p_value', select_value = 0.15, trans_type = 'auto'):
+                  tol = 1e-4, selection = 'p_value', select_value = 0.15, trans_type = 'auto', design = None):
     '''Dyanmic Algebric learning via elastic net
     Input:
     X: independent variables of size N x m, has to be non-zscored!
@@ -382,6 +876,8 @@ def DALVEN_fitting(X, y, X_test, y_test, alpha, l1_ratio, degree, lag, alpha_num
                              'elbow' and use the point with the greatest orthogonal distace from the line linking the first and the last points
                               All the values are calculated based on f-regression (F statistic of univariate linear correlation)
     trans_type: can choose either automatic transformation used in ALVEN ('auto'), or only polynomial transformation ('poly')
+    design: tuple returned by DALVEN_design for the same data, degree, lag, selection and trans_type, default None (computed here)
+            used in cross-validation/IC to share the pre-processing among l1_ratio and alpha
 
 
                  
@@ -391,91 +887,10 @@ def DALVEN_fitting(X, y, X_test, y_test, alpha, l1_ratio, degree, lag, alpha_num
     model_params: np_array m x 1
     '''
     
-    #feature transformation
-    if trans_type == 'auto':
-        X, X_test = nr.feature_trans(X, X_test, degree = degree, interaction = 'later')
-    else:
-        X, X_test = nr.poly_feature(X, X_test, degree = degree, interaction = True, power = True)
-    
-    
-    
-    #lag padding for X
-    XD = X[lag:]
-    XD_test = X_test[lag:]
-    for i in range(lag):
-        XD = np.hstack((XD,X[lag-1-i:-i-1]))
-        XD_test = np.hstack((XD_test,X_test[lag-1-i:-i-1]))
-        
-    #lag padding for y in design matrix
-    for i in range(lag):
-        XD = np.hstack((XD,y[lag-1-i:-i-1]))
-        XD_test = np.hstack((XD_test,y_test[lag-1-i:-i-1]))    
-    
-    #shorterning y
-    y = y[lag:]
-    y_test = y_test[lag:]
-    
-    #remove feature with 0 variance
-    sel = VarianceThreshold(threshold=tol).fit(XD)
-    XD=sel.transform(XD)
-    XD_test = sel.transform(XD_test)
-
-
-    #zscore data
-    scaler_x = StandardScaler(with_mean=True, with_std=True)
-    scaler_x.fit(XD)
-    XD = scaler_x.transform(XD)
-    XD_test = scaler_x.transform(XD_test)
-    
-    scaler_y = StandardScaler(with_mean=True, with_std=True)
-    scaler_y.fit(y)
-    y = scaler_y.transform(y)
-    y_test = scaler_y.transform(y_test)
-    
-
-    #eliminate feature
-    f_test, p_values = f_regression(XD, y.flatten())
-              
-        
-    if selection == 'p_value':
-        XD_fit = XD[:,p_values<select_value]
-        XD_test_fit = XD_test[:,p_values<select_value]
-        retain_index = p_values<select_value
-        
-    elif selection == 'percentage':
-        number = int(math.ceil(select_value * XD.shape[1]))
-        f_test.sort()
-        value = f_test[-number]
-        XD_fit =  XD[:,f_test>=value]
-        XD_test_fit = XD_test[:,f_test>=value]
-        
-        retain_index = f_test>=value
-        
-    else:
-        f = np.copy(f_test)
-        f.sort()  #descending order
-        f = f[::-1]
-        
-        axis = np.linspace(0,len(f)-1, len(f))
-        AllCord = np.concatenate((axis.reshape(-1,1),f.reshape(-1,1)),axis=1)
-        
-        lineVec = AllCord[-1] - AllCord[0]
-        lineVec = lineVec/ np.sqrt(np.sum(lineVec**2))
-        
-        #find the distance from each point to the line
-        vecFromFirst = AllCord- AllCord[0]
-        #and calculate the distance of each point to the line
-        scalarProduct = np.sum(vecFromFirst * matlib.repmat(lineVec, len(f), 1), axis=1)
-        vecFromFirstParallel = np.outer(scalarProduct, lineVec)
-        vecToLine = vecFromFirst - vecFromFirstParallel
-        distToLine = np.sqrt(np.sum(vecToLine ** 2, axis=1))
-        BestPoint = np.argmax(distToLine)
-        value = f[BestPoint]
-        
-        XD_fit =  XD[:,f_test>=value]
-        XD_test_fit = XD_test[:,f_test>=value]        
-        
-        retain_index = f_test>=value
+    if design is None:
+        design = DALVEN_design(X, y, X_test, y_test, degree, lag, tol = tol, selection = selection, select_value = select_value,
+                               trans_type = trans_type, full_nonlinear = False)
+    XD_fit, y, XD_test_fit, y_test, retain_index = design
         
 
     #choose the appropriate alpha in cross_Validation: cv= Ture
@@ -517,6 +932,46 @@ def DALVEN_fitting(X, y, X_test, y_test, alpha, l1_ratio, degree, lag, alpha_num
 
 
 
+def DALVEN_IC_path(X, y, X_test, y_test, l1_ratio, degree, lag, alpha_num, max_iter = 10000, tol = 1e-4, selection = 'p_value',
+                   select_value = 0.15, trans_type = 'auto', full_nonlinear = False, design = None):
+    '''Information criteria of DALVEN (or DALVEN_full_nonlinear) over the whole penalty grid
+    The pre-processing is done once and the alpha_num penalties of DALVEN_fitting(cv = True) are solved in one warm-started path,
+    AIC/AICc/BIC are computed from the training mse and the number of nonzero coefficients of every alpha
+    Input: see DALVEN_fitting, full_nonlinear selects DALVEN_fitting_full_nonlinear
+
+    Output:
+    tuple (AIC, AICc, BIC), np_array of size alpha_num each, same order as alpha = 0, 1, ..., alpha_num-1 in DALVEN_fitting
+    '''
+
+    if design is None:
+        design = DALVEN_design(X, y, X_test, y_test, degree, lag, tol = tol, selection = selection, select_value = select_value,
+                               trans_type = trans_type, full_nonlinear = full_nonlinear)
+    XD_fit, y, XD_test_fit, y_test, _ = design
+    num_train = XD_fit.shape[0]
+
+    if XD_fit.shape[1] == 0:
+        print('no variable selected by ALVEN')
+        mse_train = np.var(y)*np.ones(alpha_num)
+        num_parameter = np.zeros(alpha_num)
+    else:
+        XD_max = np.concatenate((XD_fit,XD_test_fit),axis = 0)
+        y_max = np.concatenate((y, y_test), axis = 0)
+        alpha_max = (np.sqrt(np.sum(np.dot(XD_max.T,y_max) ** 2, axis=1)).max())/XD_max.shape[0]/l1_ratio
+        alpha_list = np.logspace(np.log10(alpha_max * tol), np.log10(alpha_max), alpha_num)[::-1]
+
+        DALVEN_params, mse_train, _ = EN_path(XD_fit, y, XD_test_fit, y_test, alpha_list, l1_ratio, max_iter = max_iter, tol = tol)
+        num_parameter = np.sum(DALVEN_params != 0, axis = 0)
+
+    AIC = num_train*np.log(mse_train) + 2*num_parameter
+    AICc = num_train*np.log(mse_train) + (num_parameter+num_train)/(1-(num_parameter+2)/num_train)
+    BIC = num_train*np.log(mse_train) + num_parameter*np.log(num_train)
+
+    return (AIC, AICc, BIC)
+
+
+
+
+
 def DALVEN_testing_kstep(X, y, X_test, y_test, ALVEN_model, retain_index, degree, lag, k_step =1, tol = 1e-4, trans_type = 'auto', plot = False, round_number = ''):
     '''Dyanmic Algebric learning via elastic net for k_step ahead prediction (pre-request: trained DALVEN model)
     Input:
@@ -592,18 +1047,23 @@ def DALVEN_testing_kstep(X, y, X_test, y_test, ALVEN_model, retain_index, degree
     mse_test_multi[0] = mse(y_test, yhat_test_multi[0])
     
 
-    
-    k_step = k_step -1
     #multi-step prediction
-    for k in range(k_step):
-        #lag padding for y in design matrix
-        XD_test = XD_test[1:]
-        for l in range(min(lag,k+1)):
-            XD_test[:,position+l] =  yhat_test_multi[k-l][:-1-l].flatten()
-        XD_test_fit = XD_test[:,retain_index]        
-
-        yhat_test_multi[k+1] = ALVEN_model.predict(XD_test_fit).reshape((-1,1))
-        mse_test_multi[k+1] = mse(y_test[k+1:], yhat_test_multi[k+1])
+    #the h-step prediction of the sample t puts the (h-1-l)-step predictions in the y-lag columns l < h, the other columns are the ones of the 0-step,
+    #so it is the 0-step prediction corrected by the retained y-lag coefficients times (prediction - zscored measurement)
+    retain_index = np.asarray(retain_index, dtype = bool)
+    ylag = retain_index[position:position+lag]
+    coef = np.zeros(lag)
+    coef[ylag] = np.ravel(ALVEN_model.coef_)[np.cumsum(retain_index)[position:position+lag][ylag]-1]
+    Zy = XD_test[:,position:position+lag].T
+    n = XD_test.shape[0]
+    Yhat = np.zeros((max(k_step,1), n))
+    Yhat[0] = yhat_test_multi[0].flatten()
+    for h in range(1, k_step):
+        L = min(lag, h)
+        Yhat[h,:n-h] = Yhat[0,h:] + coef[:L] @ (Yhat[h-1-np.arange(L),:n-h] - Zy[:L,h:])
+        yhat_test_multi[h] = Yhat[h,:n-h].reshape((-1,1))
+        mse_test_multi[h] = mse(y_test[h:], yhat_test_multi[h])
+    k_step = k_step -1
         
         
         
@@ -659,7 +1119,8 @@ def DALVEN_testing_kstep(X, y, X_test, y_test, ALVEN_model, retain_index, degree
 
 ##########################################################################################
 def DALVEN_fitting_full_nonlinear(X, y, X_test, y_test, alpha, l1_ratio, degree, lag, alpha_num = None, cv= False, max_iter = 10000, 
-                                  tol = 1e-4, selection = 'p_value', select_value = 0.05, trans_type = 'auto'):
+                                  tol = 1e-4, selection = 'p_value', select_value = 0.05, trans_type = 'auto', design = None,
+                                  block = None, dtype = None, memmap = None):
     '''Dyanmic Algebric learning via elastic net with fully nonlienar mapping fo both x and y and interactions
     Input:
     X: independent variables of size N x m, has to be non-zscored!
@@ -676,6 +1137,10 @@ def DALVEN_fitting_full_nonlinear(X, y, X_test, y_test, alpha, l1_ratio, degree,
                              'elbow' and use the point with the greatest orthogonal distace from the line linking the first and the last points
                               All the values are calculated based on f-regression (F statistic of univariate linear correlation)
     trans_type: can choose either automatic transformation used in ALVEN ('auto'), or only polynomial transformation ('poly')
+    design: tuple returned by DALVEN_design for the same data, degree, lag, selection and trans_type, default None (computed here)
+            used in cross-validation/IC to share the pre-processing among l1_ratio and alpha
+    block, dtype, memmap: the nonlinear mapping is computed and screened block by block into a preallocated design of dtype (np.memmap in the
+                          directory memmap), see DALVEN_design, by default only when its dense design exceeds design_memory bytes
 
 
                  
@@ -684,95 +1149,11 @@ def DALVEN_fitting_full_nonlinear(X, y, X_test, y_test, alpha, l1_ratio, degree,
     trained_model: EN model type
     model_params: np_array m x 1
     '''
-    #lag design matrix first
-    #lag padding for X
-    XD = X[lag:]
-    XD_test = X_test[lag:]
-    for i in range(lag):
-        XD = np.hstack((XD,X[lag-1-i:-i-1]))
-        XD_test = np.hstack((XD_test,X_test[lag-1-i:-i-1]))
-        
-    #lag padding for y in design matrix
-    for i in range(lag):
-        XD = np.hstack((XD,y[lag-1-i:-i-1]))
-        XD_test = np.hstack((XD_test,y_test[lag-1-i:-i-1]))    
-    
-    
-    
-    #nonliner mapping
-        #feature transformation
-    if trans_type == 'auto':
-        XD, XD_test = nr.feature_trans(XD, XD_test, degree = degree, interaction = 'later')
-    else:
-        XD, XD_test = nr.poly_feature(XD, XD_test, degree = degree, interaction = True, power = True)
-    
-  
-    #remove feature with 0 variance
-    sel = VarianceThreshold(threshold=tol).fit(XD)
-    XD=sel.transform(XD)
-    XD_test = sel.transform(XD_test)
-
-   
-    #shorterning y
-    y = y[lag:]
-    y_test = y_test[lag:]
-    
-    
-    #zscore data
-    scaler_x = StandardScaler(with_mean=True, with_std=True)
-    scaler_x.fit(XD)
-    XD = scaler_x.transform(XD)
-    XD_test = scaler_x.transform(XD_test)
     
-    scaler_y = StandardScaler(with_mean=True, with_std=True)
-    scaler_y.fit(y)
-    y = scaler_y.transform(y)
-    y_test = scaler_y.transform(y_test)
-    
-
-    #eliminate feature
-    f_test, p_values = f_regression(XD, y.flatten())
-              
-        
-    if selection == 'p_value':
-        XD_fit = XD[:,p_values<select_value]
-        XD_test_fit = XD_test[:,p_values<select_value]
-        retain_index = p_values<select_value
-        
-    elif selection == 'percentage':
-        number = int(math.ceil(select_value * XD.shape[1]))
-        f_test.sort()
-        value = f_test[-number]
-        XD_fit =  XD[:,f_test>=value]
-        XD_test_fit = XD_test[:,f_test>=value]
-        
-        retain_index = f_test>=value
-        
-    else:
-        f = np.copy(f_test)
-        f.sort()  #descending order
-        f = f[::-1]
-        
-        axis = np.linspace(0,len(f)-1, len(f))
-        AllCord = np.concatenate((axis.reshape(-1,1),f.reshape(-1,1)),axis=1)
-        
-        lineVec = AllCord[-1] - AllCord[0]
-        lineVec = lineVec/ np.sqrt(np.sum(lineVec**2))
-        
-        #find the distance from each point to the line
-        vecFromFirst = AllCord- AllCord[0]
-        #and calculate the distance of each point to the line
-        scalarProduct = np.sum(vecFromFirst * matlib.repmat(lineVec, len(f), 1), axis=1)
-        vecFromFirstParallel = np.outer(scalarProduct, lineVec)
-        vecToLine = vecFromFirst - vecFromFirstParallel
-        distToLine = np.sqrt(np.sum(vecToLine ** 2, axis=1))
-        BestPoint = np.argmax(distToLine)
-        value = f[BestPoint]
-        
-        XD_fit =  XD[:,f_test>=value]
-        XD_test_fit = XD_test[:,f_test>=value]        
-        
-        retain_index = f_test>=value
+    if design is None:
+        design = DALVEN_design(X, y, X_test, y_test, degree, lag, tol = tol, selection = selection, select_value = select_value,
+                               trans_type = trans_type, full_nonlinear = True, block = block, dtype = dtype, memmap = memmap)
+    XD_fit, y, XD_test_fit, y_test, retain_index = design
         
 
     #choose the appropriate alpha in cross_Validation: cv= Ture
@@ -841,55 +1222,27 @@ def DALVEN_testing_kstep_full_nonlinear(X, y, X_test, y_test, ALVEN_model, retai
     model_params: np_array m x 1
     '''
     
-    #lag design matrix first
-    #lag padding for X
-    XD = X[lag:]
-    XD_test = X_test[lag:]
-    for i in range(lag):
-        XD = np.hstack((XD,X[lag-1-i:-i-1]))
-        XD_test = np.hstack((XD_test,X_test[lag-1-i:-i-1]))
-        
-    #lag padding for y in design matrix
-    for i in range(lag):
-        XD = np.hstack((XD,y[lag-1-i:-i-1]))
-        XD_test = np.hstack((XD_test,y_test[lag-1-i:-i-1]))    
-    
-    
+    #lagged design, the nonlinear mapping is only computed for the retained features (nr.feature_terms)
+    XD = lag_design(lag_tensor(X, lag), lag_tensor(y, lag), lag)
+    XD_test = lag_design(lag_tensor(X_test, lag), lag_tensor(y_test, lag), lag)
     
-    #nonliner mapping
-        #feature transformation
-    if trans_type == 'auto':
-        XD, XD_test = nr.feature_trans(XD, XD_test, degree = degree, interaction = 'later')
-    else:
-        XD, XD_test = nr.poly_feature(XD, XD_test, degree = degree, interaction = True, power = True)
+    #0-variance removal and screening of DALVEN_fitting_full_nonlinear
+    mask = design_support(XD, degree, trans_type = trans_type, tol = tol)
+    mask[mask] = retain_index
+    terms = nr.feature_terms(XD.shape[1], degree, trans_type, mask)
     
-  
-    #remove feature with 0 variance
-    sel = VarianceThreshold(threshold=tol).fit(XD)
-    XD=sel.transform(XD)
-    XD_test = sel.transform(XD_test)
-
-   
     #shorterning y
     y = y[lag:]
-    y_test_ori = y_test[:]
     y_test = y_test[lag:]
     
-
-
     #zscore data
     scaler_x = StandardScaler(with_mean=True, with_std=True)
-    scaler_x.fit(XD)
-    XD = scaler_x.transform(XD)
-    XD_test = scaler_x.transform(XD_test)
+    scaler_x.fit(nr.feature_columns(XD, terms))
+    XD_test_fit = scaler_x.transform(nr.feature_columns(XD_test, terms))
     
     scaler_y = StandardScaler(with_mean=True, with_std=True)
     scaler_y.fit(y)
     y_test = scaler_y.transform(y_test)
-#    y_test_ori = scaler_y.transform(y_test_ori)
-
-    #eliminate feature      
-    XD_test_fit = XD_test[:,retain_index]        
         
     #0-step results
     yhat_test_multi = {}
@@ -900,45 +1253,29 @@ def DALVEN_testing_kstep_full_nonlinear(X, y, X_test, y_test, ALVEN_model, retai
     
 
 #    print('starting k step prediction')
-    k_step = k_step -1
     #multi-step prediction######################
-    for k in range(k_step):
-#        print(k+2)
-        #################mapping
-        XD_test = X_test[lag+k+1:]
-        for i in range(lag):
-            XD_test = np.hstack((XD_test,X_test[lag+k-i:-i-1]))
-        
-        position = XD_test.shape[1]
-        #lag padding for y in design matrix
-        for i in range(lag):
-            XD_test = np.hstack((XD_test,y_test_ori[lag+k-i:-i-1]))    
-        
-        for l in range(min(lag,k+1)):
-            y_feed= yhat_test_multi[k-l]
-            y_feed=scaler_y.inverse_transform(y_feed)
-            XD_test[:,position+l] =  y_feed[:-1-l].flatten()        
-        
-        #nonliner mapping
-            #feature transformation
-        if trans_type == 'auto':
-            XD_test,_ = nr.feature_trans(XD_test, degree = degree, interaction = 'later')
-        else:
-            XD_test ,_= nr.poly_feature(XD_test,  degree = degree, interaction = True, power = True)
-        
-      
-        #remove feature with 0 variance
-        XD_test = sel.transform(XD_test)
-     
-        XD_test = scaler_x.transform(XD_test)
-
-
-        XD_test_fit = XD_test[:,retain_index]        
-
-  
-
-        yhat_test_multi[k+1] = ALVEN_model.predict(XD_test_fit).reshape((-1,1))
-        mse_test_multi[k+1] = mse(y_test[k+1:], yhat_test_multi[k+1])
+    #the h-step prediction of the sample t puts the (h-1-l)-step predictions (scored back) in y_t-1-l for l < h,
+    #only the features using one of them are recomputed and the 0-step prediction is corrected by their coefficients
+    position = XD.shape[1] - lag
+    first = np.concatenate([np.where(index >= position, index - position, lag).min(axis = 1) for _, index in terms] + [np.zeros(0, dtype = int)])
+    split = np.cumsum([index.shape[0] for _, index in terms])[:-1]
+    coef = np.ravel(ALVEN_model.coef_)
+    n = XD_test.shape[0]
+    Yhat = np.zeros((max(k_step,1), n))
+    Yhat[0] = yhat_test_multi[0].flatten()
+    for h in range(1, k_step):
+        L = min(lag, h)
+        col = first < L
+        Yhat[h,:n-h] = Yhat[0,h:]
+        if col.any():
+            XD_h = XD_test[h:].copy()
+            XD_h[:,position:position+L] = Yhat[h-1-np.arange(L),:n-h].T*scaler_y.scale_ + scaler_y.mean_
+            sub = [(factors, index[c]) for (factors, index), c in zip(terms, np.split(col, split))]
+            Z = (nr.feature_columns(XD_h, sub) - scaler_x.mean_[col])/scaler_x.scale_[col]
+            Yhat[h,:n-h] += (Z - XD_test_fit[h:,col]) @ coef[col]
+        yhat_test_multi[h] = Yhat[h,:n-h].reshape((-1,1))
+        mse_test_multi[h] = mse(y_test[h:], yhat_test_multi[h])
+    k_step = k_step -1
         
         
         
@@ -453,34 +453,21 @@ elif if_dynamic == 2:
         import cv_final as cv
         
         K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+        adaptive = Nr == 0
+        if adaptive:
+            Nr = 1000
         alpha_num = int(input('Number of penalty weight you want to consider in RR/EN/ALVEN, if not known input 20: '))
         
         
         if not nested_flag:
+            race = False
+            if len(model_name) > 1:
+                race = int(input('Race the candidate models (drop a model once it is significantly worse than the best one on the same folds)? input 1 for yes, 0 for no: ')) == 1
             print('------Model Construction------')
             
-            val_err = np.zeros(len(model_name))
-            index = 0
-            fitting1_result_trial = {}
-            
-            for model_index in model_name:
-            
-                if model_index == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(model_index, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
-                    val_err[index] = MSE_val
-                    
-                elif model_index == 'SVR' or model_index == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
-                    val_err[index] = MSE_val
-                else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
-                    val_err[index] = MSE_val
-                
-                index += 1
+            fitting1_result_trial, val_err = cv.family_CV_mse(model_name, X, y, X_test, y_test, X_scale, y_scale, X_test_scale, y_test_scale, race = race,
+                                                               family_executor = 'thread', cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                 
             if len(model_name) > 1: 
                 print('Select the best model from the small candidate pool based on validation error:')
@@ -512,29 +499,9 @@ elif if_dynamic == 2:
                 num_outter = int(input('How many number of outter loop you want to use in Nested CV? if not known input 10: '))
                 print('------Model Construction------')
 
-                from sklearn.model_selection import train_test_split
-                               
-                test_nest_err = np.zeros((len(model_name),num_outter))
-
-                for index_out in range(num_outter):
-                    X_nest, X_nest_test, y_nest, y_nest_test = train_test_split(X, y, test_size=1/K_fold, random_state= index_out)
-                    X_nest_scale, X_nest_scale_test, y_nest_scale, y_nest_scale_test = train_test_split(X_scale, y_scale, test_size=1/K_fold, random_state= index_out)
-
-                    index = 0
-                    for model_index in model_name:
-        
-                        if model_index == 'ALVEN':
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(model_index, X_nest, y_nest, X_nest_test, y_nest_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                            test_nest_err[index,index_out] = mse_test
-                        
-                        elif model_index == 'SVR' or model_index == 'RF':
-                            model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_nest_scale, y_nest_scale, X_nest_scale_test, y_nest_scale_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                        else:
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_nest_scale, y_nest_scale, X_nest_scale_test, y_nest_scale_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                    
-                        index += 1
+                #outer folds run concurrently, X and X_scale are split by the same indices
+                test_nest_err = cv.nested_CV_mse(model_name, X, y, X_scale, y_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num,
+                                                 num_outter = num_outter, executor = 'thread')
                         
                 print('The nested CV testing MSE result:')
                 import matplotlib.pyplot as plt
@@ -558,14 +525,14 @@ elif if_dynamic == 2:
                 print('Final model fitting')
 
                 if selected_model == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num, label_name=True)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
                         
                 elif selected_model == 'SVR' or selected_model == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
                 else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
                     
                 yhat_test = scaler_y.inverse_transform(yhat_test)
@@ -581,34 +548,12 @@ elif if_dynamic == 2:
 
             
             else:
-                from sklearn.model_selection import LeaveOneGroupOut
                 print('Leave one group out will be used in the outer loop')
                 
                 print('------Model Construction------')
 
-                test_nest_err = np.zeros((len(model_name), len(np.unique(group))))
-                logo = LeaveOneGroupOut()
-
-                index_out = 0
-                for train, test in logo.split(X, y.flatten(), groups=group.flatten()):
-                    
-                    index = 0
-                    for model_index in model_name:
-        
-                        if model_index == 'ALVEN':
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(model_index, X[train], y[train], X[test], y[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                            test_nest_err[index,index_out] = mse_test
-                        
-                        elif model_index == 'SVR' or model_index == 'RF':
-                            model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_scale[train], y_scale[train], X_scale[test], y_scale[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                        else:
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_scale[train], y_scale[train], X_scale[test], y_scale[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                    
-                        index += 1
-                    index_out +=1 
-                    
+                test_nest_err = cv.nested_CV_mse(model_name, X, y, X_scale, y_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num,
+                                                 outer = 'group', executor = 'thread')
                     
                 print('The nested CV testing MSE result:')
                 import matplotlib.pyplot as plt
@@ -634,14 +579,14 @@ elif if_dynamic == 2:
                 print('------Final model fitting-------')
 
                 if selected_model == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num, label_name=True)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
                         
                 elif selected_model == 'SVR' or selected_model == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
                 else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
                     
                 yhat_test = scaler_y.inverse_transform(yhat_test)
@@ -662,34 +607,21 @@ elif if_dynamic == 2:
         import cv_final_onestd as cv_std
         
         K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+        adaptive = Nr == 0
+        if adaptive:
+            Nr = 1000
         alpha_num = int(input('Number of penalty weight you want to consider in RR/EN/ALVEN, if not known input 20: '))
         
         
         if not nested_flag:
+            race = False
+            if len(model_name) > 1:
+                race = int(input('Race the candidate models (drop a model once it is significantly worse than the best one on the same folds)? input 1 for yes, 0 for no: ')) == 1
             print('------Model Construction------')
 
-            val_err = np.zeros(len(model_name))
-            index = 0
-            fitting1_result_trial = {}
-            
-            for model_index in model_name:
-            
-                if model_index == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(model_index, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
-                    val_err[index] = MSE_val
-                    
-                elif model_index == 'SVR' or model_index == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
-                    val_err[index] = MSE_val
-                else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
-                    val_err[index] = MSE_val
-                
-                index += 1
+            fitting1_result_trial, val_err = cv_std.family_CV_mse(model_name, X, y, X_test, y_test, X_scale, y_scale, X_test_scale, y_test_scale, race = race,
+                                                                   family_executor = 'thread', cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                 
             if len(model_name) > 1: 
                 print('Select the best model from the small candidate pool based on validation error:')
@@ -718,29 +650,9 @@ elif if_dynamic == 2:
                 num_outter = int(input('How many number of outter loop you want to use in Nested CV? if not known input 10: '))
                 print('------Model Construction------')
 
-                from sklearn.model_selection import train_test_split
-                               
-                test_nest_err = np.zeros((len(model_name),num_outter))
-
-                for index_out in range(num_outter):
-                    X_nest, X_nest_test, y_nest, y_nest_test = train_test_split(X, y, test_size=1/K_fold, random_state= index_out)
-                    X_nest_scale, X_nest_scale_test, y_nest_scale, y_nest_scale_test = train_test_split(X_scale, y_scale, test_size=1/K_fold, random_state= index_out)
-
-                    index = 0
-                    for model_index in model_name:
-        
-                        if model_index == 'ALVEN':
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(model_index, X_nest, y_nest, X_nest_test, y_nest_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                            test_nest_err[index,index_out] = mse_test
-                        
-                        elif model_index == 'SVR' or model_index == 'RF':
-                            model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_nest_scale, y_nest_scale, X_nest_scale_test, y_nest_scale_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                        else:
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_nest_scale, y_nest_scale, X_nest_scale_test, y_nest_scale_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                    
-                        index += 1
+                #outer folds run concurrently, X and X_scale are split by the same indices
+                test_nest_err = cv_std.nested_CV_mse(model_name, X, y, X_scale, y_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num,
+                                                     num_outter = num_outter, executor = 'thread')
                         
                 print('The nested CV testing MSE result:')
                 import matplotlib.pyplot as plt
@@ -764,14 +676,14 @@ elif if_dynamic == 2:
                 print('Final model fitting')
 
                 if selected_model == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num, label_name=True)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
                         
                 elif selected_model == 'SVR' or selected_model == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
                 else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
                     
                 yhat_test = scaler_y.inverse_transform(yhat_test)
@@ -787,34 +699,12 @@ elif if_dynamic == 2:
 
             
             else:
-                from sklearn.model_selection import LeaveOneGroupOut
                 print('Leave one group out will be used in the outer loop')
                 
                 print('------Model Construction------')
 
-                test_nest_err = np.zeros((len(model_name), len(np.unique(group))))
-                logo = LeaveOneGroupOut()
-
-                index_out = 0
-                for train, test in logo.split(X, y.flatten(), groups=group.flatten()):
-                    
-                    index = 0
-                    for model_index in model_name:
-        
-                        if model_index == 'ALVEN':
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(model_index, X[train], y[train], X[test], y[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                            test_nest_err[index,index_out] = mse_test
-                        
-                        elif model_index == 'SVR' or model_index == 'RF':
-                            model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_scale[train], y_scale[train], X_scale[test], y_scale[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                        else:
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_scale[train], y_scale[train], X_scale[test], y_scale[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                    
-                        index += 1
-                    index_out +=1 
-                    
+                test_nest_err = cv_std.nested_CV_mse(model_name, X, y, X_scale, y_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num,
+                                                     outer = 'group', executor = 'thread')
                     
                 print('The nested CV testing MSE result:')
                 import matplotlib.pyplot as plt
@@ -840,14 +730,14 @@ elif if_dynamic == 2:
                 print('------Final model fitting-------')
 
                 if selected_model == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num, label_name=True)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
                         
                 elif selected_model == 'SVR' or selected_model == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
                 else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
                     
                 yhat_test = scaler_y.inverse_transform(yhat_test)
@@ -872,34 +762,21 @@ elif if_dynamic == 0:
         import cv_final as cv
         
         K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+        adaptive = Nr == 0
+        if adaptive:
+            Nr = 1000
         alpha_num = int(input('Number of penalty weight you want to consider in RR/EN/ALVEN, if not known input 20: '))
         
         
         if not nested_flag:
+            race = False
+            if len(model_name) > 1:
+                race = int(input('Race the candidate models (drop a model once it is significantly worse than the best one on the same folds)? input 1 for yes, 0 for no: ')) == 1
             print('------Model Construction------')
 
-            val_err = np.zeros(len(model_name))
-            index = 0
-            fitting1_result_trial = {}
-            
-            for model_index in model_name:
-            
-                if model_index == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(model_index, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
-                    val_err[index] = MSE_val
-                    
-                elif model_index == 'SVR' or model_index == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
-                    val_err[index] = MSE_val
-                else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
-                    val_err[index] = MSE_val
-                
-                index += 1
+            fitting1_result_trial, val_err = cv.family_CV_mse(model_name, X, y, X_test, y_test, X_scale, y_scale, X_test_scale, y_test_scale, race = race,
+                                                               family_executor = 'thread', cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                 
             if len(model_name) > 1: 
                 print('Select the best model from the small candidate pool based on validation error:')
@@ -924,29 +801,9 @@ elif if_dynamic == 0:
                
                 print('------Model Construction------')
 
-                from sklearn.model_selection import train_test_split
-                               
-                test_nest_err = np.zeros((len(model_name),num_outter))
-
-                for index_out in range(num_outter):
-                    X_nest, X_nest_test, y_nest, y_nest_test = train_test_split(X, y, test_size=1/K_fold, random_state= index_out)
-                    X_nest_scale, X_nest_scale_test, y_nest_scale, y_nest_scale_test = train_test_split(X_scale, y_scale, test_size=1/K_fold, random_state= index_out)
-
-                    index = 0
-                    for model_index in model_name:
-        
-                        if model_index == 'ALVEN':
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(model_index, X_nest, y_nest, X_nest_test, y_nest_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                            test_nest_err[index,index_out] = mse_test
-                        
-                        elif model_index == 'SVR' or model_index == 'RF':
-                            model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_nest_scale, y_nest_scale, X_nest_scale_test, y_nest_scale_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                        else:
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_nest_scale, y_nest_scale, X_nest_scale_test, y_nest_scale_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                    
-                        index += 1
+                #outer folds run concurrently, X and X_scale are split by the same indices
+                test_nest_err = cv.nested_CV_mse(model_name, X, y, X_scale, y_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num,
+                                                 num_outter = num_outter, executor = 'thread')
                         
                 print('The nested CV testing MSE result:')
                 import matplotlib.pyplot as plt
@@ -970,14 +827,14 @@ elif if_dynamic == 0:
                 print('Final model fitting')
 
                 if selected_model == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num, label_name=True)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
                         
                 elif selected_model == 'SVR' or selected_model == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
                 else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
                     
                 yhat_test = scaler_y.inverse_transform(yhat_test)
@@ -988,34 +845,12 @@ elif if_dynamic == 0:
 
             
             else:
-                from sklearn.model_selection import LeaveOneGroupOut
                 print('Leave one group out will be used in the outer loop')
                 
                 print('------Model Construction------')
 
-                test_nest_err = np.zeros((len(model_name), len(np.unique(group))))
-                logo = LeaveOneGroupOut()
-
-                index_out = 0
-                for train, test in logo.split(X, y.flatten(), groups=group.flatten()):
-                    
-                    index = 0
-                    for model_index in model_name:
-        
-                        if model_index == 'ALVEN':
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(model_index, X[train], y[train], X[test], y[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                            test_nest_err[index,index_out] = mse_test
-                        
-                        elif model_index == 'SVR' or model_index == 'RF':
-                            model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_scale[train], y_scale[train], X_scale[test], y_scale[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                        else:
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(model_index, X_scale[train], y_scale[train], X_scale[test], y_scale[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                    
-                        index += 1
-                    index_out +=1 
-                    
+                test_nest_err = cv.nested_CV_mse(model_name, X, y, X_scale, y_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num,
+                                                 outer = 'group', executor = 'thread')
                     
                 print('The nested CV testing MSE result:')
                 import matplotlib.pyplot as plt
@@ -1041,14 +876,14 @@ elif if_dynamic == 0:
                 print('------Final model fitting-------')
 
                 if selected_model == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num, label_name=True)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
                         
                 elif selected_model == 'SVR' or selected_model == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
                 else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
                     
                 yhat_test = scaler_y.inverse_transform(yhat_test)
@@ -1064,34 +899,21 @@ elif if_dynamic == 0:
         import cv_final_onestd as cv_std
         
         K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+        adaptive = Nr == 0
+        if adaptive:
+            Nr = 1000
         alpha_num = int(input('Number of penalty weight you want to consider in RR/EN/ALVEN, if not known input 20: '))
         
         
         if not nested_flag:
+            race = False
+            if len(model_name) > 1:
+                race = int(input('Race the candidate models (drop a model once it is significantly worse than the best one on the same folds)? input 1 for yes, 0 for no: ')) == 1
             print('------Model Construction------')
 
-            val_err = np.zeros(len(model_name))
-            index = 0
-            fitting1_result_trial = {}
-            
-            for model_index in model_name:
-            
-                if model_index == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(model_index, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
-                    val_err[index] = MSE_val
-                    
-                elif model_index == 'SVR' or model_index == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
-                    val_err[index] = MSE_val
-                else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                    fitting1_result_trial[model_index] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
-                    val_err[index] = MSE_val
-                
-                index += 1
+            fitting1_result_trial, val_err = cv_std.family_CV_mse(model_name, X, y, X_test, y_test, X_scale, y_scale, X_test_scale, y_test_scale, race = race,
+                                                                   family_executor = 'thread', cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                 
             if len(model_name) > 1: 
                 print('Select the best model from the small candidate pool based on validation error:')
@@ -1116,29 +938,9 @@ elif if_dynamic == 0:
                 
                 print('------Model Construction------')
 
-                from sklearn.model_selection import train_test_split
-                               
-                test_nest_err = np.zeros((len(model_name),num_outter))
-
-                for index_out in range(num_outter):
-                    X_nest, X_nest_test, y_nest, y_nest_test = train_test_split(X, y, test_size=1/K_fold, random_state= index_out)
-                    X_nest_scale, X_nest_scale_test, y_nest_scale, y_nest_scale_test = train_test_split(X_scale, y_scale, test_size=1/K_fold, random_state= index_out)
-
-                    index = 0
-                    for model_index in model_name:
-        
-                        if model_index == 'ALVEN':
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(model_index, X_nest, y_nest, X_nest_test, y_nest_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                            test_nest_err[index,index_out] = mse_test
-                        
-                        elif model_index == 'SVR' or model_index == 'RF':
-                            model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_nest_scale, y_nest_scale, X_nest_scale_test, y_nest_scale_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                        else:
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_nest_scale, y_nest_scale, X_nest_scale_test, y_nest_scale_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                    
-                        index += 1
+                #outer folds run concurrently, X and X_scale are split by the same indices
+                test_nest_err = cv_std.nested_CV_mse(model_name, X, y, X_scale, y_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num,
+                                                     num_outter = num_outter, executor = 'thread')
                         
                 print('The nested CV testing MSE result:')
                 import matplotlib.pyplot as plt
@@ -1162,14 +964,14 @@ elif if_dynamic == 0:
                 print('Final model fitting')
 
                 if selected_model == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num, label_name=True)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
                         
                 elif selected_model == 'SVR' or selected_model == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
                 else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
                     
                 yhat_test = scaler_y.inverse_transform(yhat_test)
@@ -1180,34 +982,12 @@ elif if_dynamic == 0:
 
             
             else:
-                from sklearn.model_selection import LeaveOneGroupOut
                 print('Leave one group out will be used in the outer loop')
                 
                 print('------Model Construction------')
 
-                test_nest_err = np.zeros((len(model_name), len(np.unique(group))))
-                logo = LeaveOneGroupOut()
-
-                index_out = 0
-                for train, test in logo.split(X, y.flatten(), groups=group.flatten()):
-                    
-                    index = 0
-                    for model_index in model_name:
-        
-                        if model_index == 'ALVEN':
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(model_index, X[train], y[train], X[test], y[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
-                            test_nest_err[index,index_out] = mse_test
-                        
-                        elif model_index == 'SVR' or model_index == 'RF':
-                            model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_scale[train], y_scale[train], X_scale[test], y_scale[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                        else:
-                            model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(model_index, X_scale[train], y_scale[train], X_scale[test], y_scale[test], cv_type = cv_method, group = group[train], K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
-                            test_nest_err[index,index_out] = mse_test
-                    
-                        index += 1
-                    index_out +=1 
-                    
+                test_nest_err = cv_std.nested_CV_mse(model_name, X, y, X_scale, y_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num,
+                                                     outer = 'group', executor = 'thread')
                     
                 print('The nested CV testing MSE result:')
                 import matplotlib.pyplot as plt
@@ -1232,14 +1012,14 @@ elif if_dynamic == 0:
                 print('------Final model fitting-------')
 
                 if selected_model == 'ALVEN':
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num, label_name=True)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val, final_list = cv_std.CV_mse(selected_model, X, y, X_test, y_test, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num, label_name=True)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val, 'final_list':final_list}
                         
                 elif selected_model == 'SVR' or selected_model == 'RF':
-                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val':MSE_val}
                 else:
-                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, alpha_num=alpha_num)
+                    model_hyper,final_model, model_params, mse_train, mse_test, yhat_train, yhat_test, MSE_val = cv_std.CV_mse(selected_model, X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, group = group, K_fold = K_fold, Nr= Nr, adaptive = adaptive, alpha_num=alpha_num)
                     fitting_result[selected_model] = {'model_hyper':model_hyper,'final_model':final_model, 'model_params':model_params, 'mse_train':mse_train, 'mse_test':mse_test, 'yhat_train':yhat_train, 'yhat_test':yhat_test, 'MSE_val': MSE_val}
                     
                 yhat_test = scaler_y.inverse_transform(yhat_test)
@@ -1299,7 +1079,10 @@ else:  #use dynamic model in the first round
 
             else:
                 K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-                Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+                Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+                adaptive = Nr == 0
+                if adaptive:
+                    Nr = 1000
                 
                 print('------Model Construction------')
 
@@ -1307,7 +1090,7 @@ else:  #use dynamic model in the first round
                     
                     import cv_final as cv
         
-                    RNN_hyper, RNN_model, yhat_train_RNN, yhat_val_RNN, yhat_test_RNN, mse_train_RNN, mse_val_RNN, mse_test_RNN= cv.CV_mse('RNN', X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, K_fold = K_fold, Nr= Nr, cell_type = cell_type,group=group,\
+                    RNN_hyper, RNN_model, yhat_train_RNN, yhat_val_RNN, yhat_test_RNN, mse_train_RNN, mse_val_RNN, mse_test_RNN= cv.CV_mse('RNN', X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, cell_type = cell_type,group=group,\
                                                                                                                                             activation = activation, num_layers=num_layers,state_size=state_size,num_steps=num_steps, \
                                                                                                                                             batch_size=batch_size,epoch_overlap= epoch_overlap, learning_rate=learning_rate, lambda_l2_reg=lambda_l2_reg,\
                                                                                                                                             num_epochs=num_epochs, max_checks_without_progress = max_checks_without_progress,round_number = str(round_number))
@@ -1316,7 +1099,7 @@ else:  #use dynamic model in the first round
                     print('CV with ons-std rule is used for RNN model')
 
         
-                    RNN_hyper, RNN_model, yhat_train_RNN, yhat_val_RNN, yhat_test_RNN, mse_train_RNN, mse_val_RNN, mse_test_RNN= cv_std.CV_mse('RNN', X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, K_fold = K_fold, Nr= Nr, cell_type = cell_type,group=group,\
+                    RNN_hyper, RNN_model, yhat_train_RNN, yhat_val_RNN, yhat_test_RNN, mse_train_RNN, mse_val_RNN, mse_test_RNN= cv_std.CV_mse('RNN', X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, cell_type = cell_type,group=group,\
                                                                                                                                             activation = activation, num_layers=num_layers,state_size=state_size,num_steps=num_steps, \
                                                                                                                                             batch_size=batch_size,epoch_overlap= epoch_overlap, learning_rate=learning_rate, lambda_l2_reg=lambda_l2_reg,\
                                                                                                                                             num_epochs=num_epochs, max_checks_without_progress = max_checks_without_progress,round_number = str(round_number))
@@ -1353,7 +1136,7 @@ else:  #use dynamic model in the first round
             import regression_models as rm
             
             alpha_num = int(input('Number of penalty weight you want to consider in DALVEN, if not known input 20: '))
-            lag = list(map(int,input("Lists of numbers of lags you want to consider in DALVEN: (e.g. 1 2 3) ").strip().split()))
+            lag = list(map(int,input("Lists of numbers of lags you want to consider in DALVEN: (e.g. 1 2 3), if not known press enter to use the lags suggested by the ACF/PACF/CCF of the data ").strip().split())) or None
             degree = list(map(int,input("Orders of nonlinear mapping considered in DALVEN: (choose to include 1 2 3) ").strip().split()))
 
             if int(input('Do you want to test both DALVEN-full/DALVEN? (Yes: 1, No: 0): ')):
@@ -1367,8 +1150,8 @@ else:  #use dynamic model in the first round
 
                     print('------Model Construction------')
                     
-                    DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = IC.IC_mse('DALVEN', X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto')
-                    DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = IC.IC_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto')
+                    DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = IC.IC_mse('DALVEN', X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto', path = True)
+                    DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = IC.IC_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto', path = True)
     
                 else:
                     #using validation set
@@ -1376,14 +1159,17 @@ else:  #use dynamic model in the first round
                         import cv_final as cv
     
                         K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-                        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+                        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+                        adaptive = Nr == 0
+                        if adaptive:
+                            Nr = 1000
 
                         print('------Model Construction------')
 
      
-                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv.CV_mse('DALVEN', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv.CV_mse('DALVEN', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)
-                        DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = cv.CV_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = cv.CV_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)                       
                         
                     
@@ -1392,13 +1178,16 @@ else:  #use dynamic model in the first round
                         import cv_final_onestd as cv_std    
                         
                         K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-                        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+                        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+                        adaptive = Nr == 0
+                        if adaptive:
+                            Nr = 1000
 
                         print('------Model Construction------')
      
-                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv_std.CV_mse('DALVEN', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv_std.CV_mse('DALVEN', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)
-                        DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = cv_std.CV_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = cv_std.CV_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)
                 
                 ##select the method
@@ -1465,21 +1254,24 @@ else:  #use dynamic model in the first round
 
                     print('------Model Construction------')
 
-                    DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = IC.IC_mse(DALVEN_method, X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto')
+                    DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = IC.IC_mse(DALVEN_method, X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto', path = True)
     
                     
                     
                 else:
                     #using validation set
                     K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-                    Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+                    Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+                    adaptive = Nr == 0
+                    if adaptive:
+                        Nr = 1000
 
                     print('------Model Construction------')
                     
                     if not one_std:
                         import cv_final as cv
          
-                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv.CV_mse(DALVEN_method, X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv.CV_mse(DALVEN_method, X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)
                        
                                         
@@ -1488,7 +1280,7 @@ else:  #use dynamic model in the first round
                         import cv_final_onestd as cv_std    
                         
      
-                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv_std.CV_mse(DALVEN_method, X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv_std.CV_mse(DALVEN_method, X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)
                 
                 
@@ -1711,7 +1503,10 @@ Start 2nd-Round Model Fitting
 
             else:
                 K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-                Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+                Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+                adaptive = Nr == 0
+                if adaptive:
+                    Nr = 1000
                 
                 print('------Model Construction------')
 
@@ -1719,7 +1514,7 @@ Start 2nd-Round Model Fitting
                     
                     import cv_final as cv
         
-                    RNN_hyper, RNN_model, yhat_train_RNN, yhat_val_RNN, yhat_test_RNN, mse_train_RNN, mse_val_RNN, mse_test_RNN= cv.CV_mse('RNN', X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, K_fold = K_fold, Nr= Nr, cell_type = cell_type,group=group,\
+                    RNN_hyper, RNN_model, yhat_train_RNN, yhat_val_RNN, yhat_test_RNN, mse_train_RNN, mse_val_RNN, mse_test_RNN= cv.CV_mse('RNN', X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, cell_type = cell_type,group=group,\
                                                                                                                                             activation = activation, num_layers=num_layers,state_size=state_size,num_steps=num_steps, \
                                                                                                                                             batch_size=batch_size,epoch_overlap= epoch_overlap, learning_rate=learning_rate, lambda_l2_reg=lambda_l2_reg,\
                                                                                                                                             num_epochs=num_epochs, max_checks_without_progress = max_checks_without_progress,round_number = str(round_number))
@@ -1728,7 +1523,7 @@ Start 2nd-Round Model Fitting
                     print('CV with ons-std rule is used for RNN model')
 
         
-                    RNN_hyper, RNN_model, yhat_train_RNN, yhat_val_RNN, yhat_test_RNN, mse_train_RNN, mse_val_RNN, mse_test_RNN= cv_std.CV_mse('RNN', X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, K_fold = K_fold, Nr= Nr, cell_type = cell_type,group=group,\
+                    RNN_hyper, RNN_model, yhat_train_RNN, yhat_val_RNN, yhat_test_RNN, mse_train_RNN, mse_val_RNN, mse_test_RNN= cv_std.CV_mse('RNN', X_scale, y_scale, X_test_scale, y_test_scale, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, cell_type = cell_type,group=group,\
                                                                                                                                             activation = activation, num_layers=num_layers,state_size=state_size,num_steps=num_steps, \
                                                                                                                                             batch_size=batch_size,epoch_overlap= epoch_overlap, learning_rate=learning_rate, lambda_l2_reg=lambda_l2_reg,\
                                                                                                                                             num_epochs=num_epochs, max_checks_without_progress = max_checks_without_progress,round_number = str(round_number))
@@ -1763,7 +1558,7 @@ Start 2nd-Round Model Fitting
             import regression_models as rm
 
             alpha_num = int(input('Number of penalty weight you want to consider in DALVEN, if not known input 20: '))
-            lag = list(map(int,input("Lists of numbers of lags you want to consider in DALVEN: (e.g. 1 2 3) ").strip().split()))
+            lag = list(map(int,input("Lists of numbers of lags you want to consider in DALVEN: (e.g. 1 2 3), if not known press enter to use the lags suggested by the ACF/PACF/CCF of the data ").strip().split())) or None
             degree = list(map(int,input("Orders of nonlinear mapping considered in DALVEN: (choose to include 1 2 3) ").strip().split()))
 
             if int(input('Do you want to test both DALVEN-full/DALVEN? (Yes: 1, No: 0): ')):
@@ -1777,8 +1572,8 @@ Start 2nd-Round Model Fitting
 
                     print('------Model Construction------')
                     
-                    DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = IC.IC_mse('DALVEN', X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto')
-                    DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = IC.IC_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto')
+                    DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = IC.IC_mse('DALVEN', X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto', path = True)
+                    DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = IC.IC_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto', path = True)
     
                 else:
                     #using validation set
@@ -1786,14 +1581,17 @@ Start 2nd-Round Model Fitting
                         import cv_final as cv
     
                         K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-                        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+                        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+                        adaptive = Nr == 0
+                        if adaptive:
+                            Nr = 1000
 
                         print('------Model Construction------')
 
      
-                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv.CV_mse('DALVEN', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv.CV_mse('DALVEN', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)
-                        DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = cv.CV_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = cv.CV_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)                       
                         
                     
@@ -1802,13 +1600,16 @@ Start 2nd-Round Model Fitting
                         import cv_final_onestd as cv_std    
                         
                         K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-                        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+                        Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+                        adaptive = Nr == 0
+                        if adaptive:
+                            Nr = 1000
 
                         print('------Model Construction------')
      
-                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv_std.CV_mse('DALVEN', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv_std.CV_mse('DALVEN', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)
-                        DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = cv_std.CV_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_full_hyper,DALVEN_full_model, DALVEN_full_params, mse_train_DALVEN_full, mse_test_DALVEN_full, yhat_train_DALVEN_full, yhat_test_DALVEN_full, MSE_v_DALVEN_full, final_list_full = cv_std.CV_mse('DALVEN_full_nonlinear', X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)
                 
                 ##select the method
@@ -1873,21 +1674,24 @@ Start 2nd-Round Model Fitting
 
                     print('------Model Construction------')
 
-                    DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = IC.IC_mse(DALVEN_method, X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto')
+                    DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = IC.IC_mse(DALVEN_method, X, y, X_test, y_test, cv_type = IC_method, alpha_num=alpha_num, lag=lag, degree=degree, label_name=True, trans_type= 'auto', path = True)
     
                     
                     
                 else:
                     #using validation set
                     K_fold = int(input('Number of K-fold you want to use, or the fold number you want to use in single validation 1/K, if not known input 5: '))
-                    Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10: '))     
+                    Nr = int(input('Number of repetition (if have in CV) you want to use, if not known input 10, or input 0 to stop adaptively (at most 1000): '))     
+                    adaptive = Nr == 0
+                    if adaptive:
+                        Nr = 1000
 
                     print('------Model Construction------')
                     
                     if not one_std:
                         import cv_final as cv
          
-                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv.CV_mse(DALVEN_method, X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv.CV_mse(DALVEN_method, X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)
                        
                                         
@@ -1896,7 +1700,7 @@ Start 2nd-Round Model Fitting
                         import cv_final_onestd as cv_std    
                         
      
-                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv_std.CV_mse(DALVEN_method, X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, \
+                        DALVEN_hyper,DALVEN_model, DALVEN_params, mse_train_DALVEN, mse_test_DALVEN, yhat_train_DALVEN, yhat_test_DALVEN, MSE_v_DALVEN, final_list = cv_std.CV_mse(DALVEN_method, X, y, X_test, y_test, cv_type = cv_method, K_fold = K_fold, Nr= Nr, adaptive = adaptive, \
                                                                                                                                                                                alpha_num=alpha_num, label_name=True, trans_type= 'auto',degree=degree,lag = lag)
                 
                 fitting_result[selected_model] = {'model_hyper':DALVEN_hyper,'final_model':DALVEN_model, 'model_params':DALVEN_params , 'mse_train':mse_train_DALVEN, 'mse_val':MSE_v_DALVEN, 'mse_test':mse_test_DALVEN, 'yhat_train':yhat_train_DALVEN, 'yhat_test':yhat_test_DALVEN, 'final_list': final_list}
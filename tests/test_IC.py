@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the information criteria search in IC
+"""
+
+import numpy as np
+import pytest
+
+IC = pytest.importorskip('IC')
+
+
+
+def _series(N = 120, seed = 0):
+    rng = np.random.RandomState(seed)
+    X = rng.rand(N, 2) + 1
+    y = np.zeros((N, 1))
+    for t in range(1, N):
+        y[t] = 0.5*y[t-1] + X[t-1, 0] - 0.5*X[t, 1] + 0.05*rng.randn()
+    return X, y
+
+
+
+def test_checkpoint_resumes_after_interrupt(monkeypatch, tmp_path):
+    X, y = _series()
+    grid = dict(cv_type = 'AIC', alpha_num = 5, degree = [1, 2], lag = [1, 2], l1_ratio = [0.5])
+    expected = IC.IC_mse('DALVEN', X, y, X, y, **grid)
+
+    #the checkpoint is only written when the search ends or is interrupted
+    monkeypatch.setattr(IC.cc, 'checkpoint_interval', np.inf)
+    design = IC.rm.DALVEN_design
+    calls = []
+    interrupt = [3]
+
+    def interrupted_design(*args, **kwargs):
+        calls.append((args[4], args[5]))
+        if len(calls) == interrupt[0]:
+            raise KeyboardInterrupt
+        return design(*args, **kwargs)
+    monkeypatch.setattr(IC.rm, 'DALVEN_design', interrupted_design)
+    checkpoint = str(tmp_path / 'ic')
+    with pytest.raises(KeyboardInterrupt):
+        IC.IC_mse('DALVEN', X, y, X, y, checkpoint = checkpoint, **grid)
+
+    #only the two blocks of degree 2 are computed again
+    del calls[:]
+    interrupt[0] = 0
+    result = IC.IC_mse('DALVEN', X, y, X, y, checkpoint = checkpoint, **grid)
+    assert calls[:2] == [(2, 1), (2, 2)]
+    assert result[0]['degree'] == expected[0]['degree'] and result[0]['lag'] == expected[0]['lag']
+    assert result[0]['alpha'] == expected[0]['alpha']
+    assert result[4] == expected[4]
+
+
+
+def test_lag_round_checkpoint_keyed_by_its_lags(monkeypatch, tmp_path, capsys):
+    X, y = _series()
+    grid = dict(cv_type = 'AIC', alpha_num = 5, degree = [1], lag = [1, 2], l1_ratio = [0.5], lag_expand = True)
+    checkpoint = str(tmp_path / 'ic')
+    
+    def expand(extra):
+        return lambda X, y, lag, best, **kwargs: [] if extra in lag else [extra]
+    
+    #the round 1 file holds lag 3
+    monkeypatch.setattr(IC.rm, 'DALVEN_lag_expand', expand(3))
+    IC.IC_mse('DALVEN', X, y, X, y, checkpoint = checkpoint, **grid)
+    capsys.readouterr()
+    
+    #the base file is resumed, the round with lag 4 is computed again
+    monkeypatch.setattr(IC.rm, 'DALVEN_lag_expand', expand(4))
+    result = IC.IC_mse('DALVEN', X, y, X, y, checkpoint = checkpoint, **grid)
+    assert capsys.readouterr().out.count('Resumed from the checkpoint') == 1
+    expected = IC.IC_mse('DALVEN', X, y, X, y, **grid)
+    assert result[0]['lag'] == expected[0]['lag']
+    assert result[7] == expected[7]
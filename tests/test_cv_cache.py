@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the disk cache of the cross-validation results in cv_cache
+"""
+
+import numpy as np
+import pytest
+
+cc = pytest.importorskip('cv_cache')
+
+
+
+def test_other_version_is_a_miss(monkeypatch, tmp_path):
+    directory = str(tmp_path)
+    parts = ('RR', np.arange(6.0), {'alpha': [0.1, 1.0]})
+    key = cc.cache_key(*parts)
+    cc.cache_put(key, {'MSE_mean': np.ones(2)}, directory = directory)
+    assert cc.cache_get(key, directory = directory)['MSE_mean'].shape == (2,)
+
+    #the results of another version are neither found under the new key nor served under the old one
+    monkeypatch.setattr(cc, 'cache_version', cc.cache_version + 1)
+    assert cc.cache_key(*parts) != key
+    assert cc.cache_get(key, directory = directory) is None
+
+
+
+def test_entry_without_version_is_a_miss(tmp_path):
+    directory = str(tmp_path)
+    key = cc.cache_key('RR')
+    cc._dump(cc._path(key, directory), {'MSE_mean': np.ones(2), 'label': 'RR'})
+    assert cc.cache_get(key, directory = directory) is None
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the cross-validation in cv_final
+"""
+
+import time
+import threading
+import numpy as np
+import pytest
+
+cv = pytest.importorskip('cv_final')
+
+
+
+def _data(N = 60, m = 4, seed = 0):
+    rng = np.random.RandomState(seed)
+    X = rng.randn(N, m)
+    y = X @ rng.randn(m, 1) + 0.1*rng.randn(N, 1)
+    return X, y
+
+
+
+def test_cv_result_reused_only_for_same_data_and_grid():
+    X, y = _data()
+    y2 = np.random.RandomState(1).randn(*y.shape)
+    cv_result = {}
+    cv.CV_mse('RR', X, y, X, y, cv_type = 'Re_KFold', K_fold = 5, Nr = 3, cv_result = cv_result)
+
+    #another y of the same shape is cross-validated again
+    hyper, _, _, _, _, _, _, MSE_val = cv.CV_mse('RR', X, y2, X, y2, cv_type = 'Re_KFold', K_fold = 5, Nr = 3, cv_result = cv_result)
+    fresh = cv.CV_mse('RR', X, y2, X, y2, cv_type = 'Re_KFold', K_fold = 5, Nr = 3)
+    assert hyper['alpha'] == fresh[0]['alpha']
+    assert MSE_val == fresh[-1]
+
+    #another alpha grid is cross-validated again
+    hyper, _, _, _, _, _, _, MSE_val = cv.CV_mse('RR', X, y, X, y, cv_type = 'Re_KFold', K_fold = 5, Nr = 3, cv_result = cv_result, alpha = [0.1, 1.0])
+    assert hyper['alpha'] in [0.1, 1.0]
+    assert cv_result['MSE_mean'].shape == (2,)
+
+    #same data and grid, the statistics are reused
+    MSE_mean = cv_result['MSE_mean']
+    cv.CV_mse('RR', X, y, X, y, cv_type = 'Re_KFold', K_fold = 5, Nr = 3, cv_result = cv_result, alpha = [0.1, 1.0], selection = 'one_std')
+    assert cv_result['MSE_mean'] is MSE_mean
+
+
+
+def test_family_budget_sets_fold_workers(monkeypatch):
+    X, y = _data()
+    calls = []
+    
+    def _RF_fold_mse(X_train, y_train, X_val, y_val, max_depth, n_estimators, min_samples_leaf, tree_jobs = None):
+        calls.append((threading.get_ident(), tree_jobs))
+        time.sleep(0.01)
+        return np.ones((len(max_depth), len(n_estimators), len(min_samples_leaf)))
+    monkeypatch.setattr(cv, '_RF_fold_mse', _RF_fold_mse)
+    grid = dict(cv_type = 'Re_KFold', K_fold = 4, Nr = 2, max_depth = [2, 3], n_estimators = [10], min_samples_leaf = [0.0001])
+    
+    #the folds of a model with a budget run in a thread pool of that size, each tree on one core
+    cv.family_CV_mse(['RF'], X, y, X, y, X, y, X, y, budget = {'RF': 2}, **grid)
+    assert len(calls) == 8*2
+    assert len(set(ident for ident, _ in calls)) == 2
+    assert set(tree_jobs for _, tree_jobs in calls) == {1}
+    
+    #a budget of one core runs the folds serially and caps the trees to it
+    del calls[:]
+    cv.family_CV_mse(['RF'], X, y, X, y, X, y, X, y, budget = {'RF': 1}, **grid)
+    assert set(calls) == {(threading.get_ident(), 1)}
+    
+    #concurrent models share the cores instead of building their trees on all of them
+    del calls[:]
+    monkeypatch.setattr(cv.os, 'cpu_count', lambda: 4)
+    cv.family_CV_mse(['RF', 'RR'], X, y, X, y, X, y, X, y, family_executor = 'thread', **grid)
+    assert 1 < len(set(ident for ident, _ in calls)) <= 2
+    assert set(tree_jobs for _, tree_jobs in calls) == {1}
+
+
+
+def test_nested_random_outer_splits_group():
+    X, y = _data(N = 48)
+    group = np.repeat(np.arange(8), 6).reshape(-1, 1)
+    test_nest_err = cv.nested_CV_mse(['RR', 'LASSO'], X, y, X, y, cv_type = 'Group', group = group, outer = 'random', num_outter = 3, K_fold = 4, alpha_num = 10)
+    
+    #the inner Group CV of each outer fold sees the labels of its own training rows
+    for index_out in range(3):
+        train, test = cv.train_test_split(np.arange(48), test_size = 1/4, random_state = index_out)
+        for i, model in enumerate(['RR', 'LASSO']):
+            result = cv.CV_mse(model, X[train], y[train], X[test], y[test], cv_type = 'Group', group = group[train], K_fold = 4, alpha_num = 10)
+            assert test_nest_err[i, index_out] == result[4]
+
+
+
+@pytest.mark.parametrize('gram', [False, True])
+def test_LASSO_path_keeps_order_of_alpha(gram):
+    X, y = _data()
+    alpha = [1e-4, 1e-3, 1e-2, 1e-1, 0.5]
+    settings = dict(cv_type = 'Re_KFold', K_fold = 5, Nr = 2, alpha = alpha, gram = gram)
+    path_result, fit_result = {}, {}
+    hyper, _, _, _, _, _, _, MSE_val = cv.CV_mse('LASSO', X, y, X, y, path = True, cv_result = path_result, **settings)
+    fit = cv.CV_mse('LASSO', X, y, X, y, cv_result = fit_result, **settings)
+    
+    #the mse of each alpha is the one of its own fit, whatever the order of the list
+    assert np.allclose(path_result['MSE_mean'], fit_result['MSE_mean'], rtol = 1e-3)
+    assert np.all(np.diff(path_result['nonzero']) <= 0)
+    assert hyper['alpha'] == fit[0]['alpha']
+
+
+
+def test_checkpoint_key_includes_default_grid(monkeypatch, tmp_path):
+    rng = np.random.RandomState(0)
+    X = rng.rand(90, 2) + 1
+    y = X[:, :1] + 0.1*rng.randn(90, 1)
+    settings = dict(cv_type = 'Re_KFold', K_fold = 3, Nr = 2, alpha_num = 4, degree = [1], l1_ratio = [0.5], lag_expand = False)
+    monkeypatch.setattr(cv.cc, 'checkpoint_interval', np.inf)
+    checkpoint = str(tmp_path / 'cv')
+    
+    #interrupted search over the generated lags [1, 2]
+    monkeypatch.setattr(cv.rm, 'DALVEN_lag_candidates', lambda *args, **kwargs: [1, 2])
+    score_fold = cv._DALVEN_fold_mse
+    calls = []
+    
+    def interrupted_fold(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return score_fold(*args, **kwargs)
+    monkeypatch.setattr(cv, '_DALVEN_fold_mse', interrupted_fold)
+    with pytest.raises(KeyboardInterrupt):
+        cv.CV_mse('DALVEN', X, y, X, y, checkpoint = checkpoint, **settings)
+    
+    #the lags generated by the resumed call differ, so the saved folds are not reused
+    monkeypatch.setattr(cv, '_DALVEN_fold_mse', score_fold)
+    monkeypatch.setattr(cv.rm, 'DALVEN_lag_candidates', lambda *args, **kwargs: [1, 3])
+    resumed, fresh = {}, {}
+    cv.CV_mse('DALVEN', X, y, X, y, checkpoint = checkpoint, cv_result = resumed, **settings)
+    cv.CV_mse('DALVEN', X, y, X, y, cv_result = fresh, **settings)
+    assert np.array_equal(resumed['MSE_mean'], fresh['MSE_mean'])